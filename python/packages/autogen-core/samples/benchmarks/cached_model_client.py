@@ -0,0 +1,122 @@
+"""Answering repeated requests from :class:`CachedChatCompletionClient`.
+
+Wraps a model client that answers after a fixed latency, as a remote model
+would, and for each cache store and chat history length reports:
+
+- ``miss (ms)``: the time of a request that is forwarded to the model client.
+- ``hit (ms)``: the time of the same request answered from the cache, the cost
+  of hashing the request and reading the store.
+
+Usage::
+
+    python cached_model_client.py --latency 0.5 --messages 10 100
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, AsyncGenerator, List, Mapping, Optional, Sequence, Union
+
+from autogen_core.base import CancellationToken
+from autogen_core.components.models import (
+    AssistantMessage,
+    CachedChatCompletionClient,
+    ChatCompletionCacheStore,
+    ChatCompletionClient,
+    CreateResult,
+    InMemoryChatCompletionCacheStore,
+    LLMMessage,
+    ModelCapabilities,
+    RequestUsage,
+    SqliteChatCompletionCacheStore,
+    UserMessage,
+)
+from autogen_core.components.tools import Tool, ToolSchema
+
+
+class SlowChatCompletionClient(ChatCompletionClient):
+    def __init__(self, latency: float) -> None:
+        self._latency = latency
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        tools: Sequence[Tool | ToolSchema] = [],
+        json_output: Optional[bool] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> CreateResult:
+        await asyncio.sleep(self._latency)
+        return CreateResult(
+            finish_reason="stop", content="response " * 100, usage=RequestUsage(1000, 200), cached=False
+        )
+
+    async def create_stream(
+        self,
+        messages: Sequence[LLMMessage],
+        tools: Sequence[Tool | ToolSchema] = [],
+        json_output: Optional[bool] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> AsyncGenerator[Union[str, CreateResult], None]:
+        yield await self.create(messages, tools, json_output, extra_create_args, cancellation_token)
+
+    def actual_usage(self) -> RequestUsage:
+        return RequestUsage(0, 0)
+
+    def total_usage(self) -> RequestUsage:
+        return RequestUsage(0, 0)
+
+    def count_tokens(self, messages: Sequence[LLMMessage], tools: Sequence[Tool | ToolSchema] = []) -> int:
+        return 0
+
+    def remaining_tokens(self, messages: Sequence[LLMMessage], tools: Sequence[Tool | ToolSchema] = []) -> int:
+        return 0
+
+    @property
+    def capabilities(self) -> ModelCapabilities:
+        return ModelCapabilities(vision=False, function_calling=False, json_output=False)
+
+
+async def measure(store: ChatCompletionCacheStore, latency: float, message_count: int) -> tuple[float, float]:
+    client = CachedChatCompletionClient(SlowChatCompletionClient(latency), store)
+    messages: List[LLMMessage] = []
+    for i in range(0, message_count, 2):
+        messages.append(UserMessage(content=f"question {i} " * 50, source="user"))
+        messages.append(AssistantMessage(content=f"answer {i} " * 50, source="assistant"))
+
+    start = time.perf_counter()
+    await client.create(messages)
+    miss = time.perf_counter() - start
+
+    repeats = 100
+    start = time.perf_counter()
+    for _ in range(repeats):
+        await client.create(messages)
+    hit = (time.perf_counter() - start) / repeats
+    return miss, hit
+
+
+async def main(latency: float, message_counts: List[int]) -> None:
+    print(f"{'store':>7} {'messages':>9} {'miss (ms)':>10} {'hit (ms)':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for message_count in message_counts:
+            sqlite_store = SqliteChatCompletionCacheStore(Path(directory) / f"cache{message_count}.db")
+            stores: List[tuple[str, ChatCompletionCacheStore]] = [
+                ("memory", InMemoryChatCompletionCacheStore()),
+                ("sqlite", sqlite_store),
+            ]
+            for name, store in stores:
+                miss, hit = await measure(store, latency, message_count)
+                print(f"{name:>7} {message_count:>9} {miss * 1e3:>10.1f} {hit * 1e3:>9.3f}")
+            sqlite_store.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure answering repeated model requests from a cache.")
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--messages", type=int, nargs="+", default=[10, 100])
+    args = parser.parse_args()
+    asyncio.run(main(args.latency, args.messages))
@@ -0,0 +1,112 @@
+"""Cost of fanning out large events from :class:`WorkerAgentRuntimeHost` to many workers.
+
+Two measurements are reported:
+
+- ``encode``: the host-side work of producing the frames for one event sent to every
+  worker, serializing the event once per client stream versus serializing it once
+  and sharing the bytes, as the host does.
+- ``end to end``: events published through a host to workers running in this
+  process, until every worker has received every event.
+
+Usage::
+
+    python host_event_fanout.py --workers 50 --payload-bytes 1000000 --events 10
+"""
+
+import argparse
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import List
+
+from autogen_core.application import WorkerAgentRuntime, WorkerAgentRuntimeHost
+from autogen_core.application._message_batching import SerializedMessage, serialize_frame
+from autogen_core.application.protos import agent_worker_pb2
+from autogen_core.base import MessageContext, try_get_known_serializers_for_type
+from autogen_core.components import DefaultTopicId, RoutedAgent, default_subscription, message_handler
+
+
+@dataclass
+class Blob:
+    data: str
+
+
+@default_subscription
+class ReceiverAgent(RoutedAgent):
+    received = 0
+
+    def __init__(self) -> None:
+        super().__init__("A receiver agent.")
+
+    @message_handler
+    async def on_blob(self, message: Blob, ctx: MessageContext) -> None:
+        ReceiverAgent.received += 1
+
+
+def measure_encode(workers: int, payload_bytes: int, repeats: int) -> None:
+    event = agent_worker_pb2.Event(
+        topic_type="default",
+        topic_source="default",
+        payload=agent_worker_pb2.Payload(data_type="Blob", data=b"x" * payload_bytes),
+    )
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        message = agent_worker_pb2.Message(event=event)
+        for _ in range(workers):
+            message.SerializeToString()
+    per_client = (time.perf_counter() - start) / repeats
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        shared = SerializedMessage.from_message(agent_worker_pb2.Message(event=event))
+        for _ in range(workers):
+            serialize_frame(shared.data)
+    shared_bytes = (time.perf_counter() - start) / repeats
+
+    print(f"{'encode':>12} {'per event (ms)':>15}")
+    print(f"{'per client':>12} {per_client * 1e3:>15.2f}")
+    print(f"{'shared':>12} {shared_bytes * 1e3:>15.2f}")
+
+
+async def measure_end_to_end(workers: int, payload_bytes: int, events: int) -> None:
+    host_address = "localhost:50151"
+    # Batches of large events can exceed gRPC's default 4 MB message limit.
+    grpc_config = [("grpc.max_send_message_length", -1), ("grpc.max_receive_message_length", -1)]
+    host = WorkerAgentRuntimeHost(address=host_address, extra_grpc_config=grpc_config)
+    host.start()
+    runtimes: List[WorkerAgentRuntime] = []
+    for i in range(workers + 1):
+        runtime = WorkerAgentRuntime(host_address=host_address, extra_grpc_config=grpc_config)
+        runtime.start()
+        runtimes.append(runtime)
+        if i > 0:
+            await ReceiverAgent.register(runtime, f"receiver{i}", ReceiverAgent)
+    publisher = runtimes[0]
+    publisher.add_message_serializer(try_get_known_serializers_for_type(Blob))
+
+    try:
+        blob = Blob(data="x" * payload_bytes)
+        start = time.perf_counter()
+        for _ in range(events):
+            await publisher.publish_message(blob, topic_id=DefaultTopicId())
+        while ReceiverAgent.received < events * workers:
+            await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - start
+
+        print(f"{'end to end':>12} {'per event (ms)':>15}")
+        print(f"{workers:>4} workers {elapsed / events * 1e3:>15.2f}")
+    finally:
+        for runtime in runtimes:
+            await runtime.stop()
+        await host.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the cost of fanning out large events from the host.")
+    parser.add_argument("--workers", type=int, default=50)
+    parser.add_argument("--payload-bytes", type=int, default=1_000_000)
+    parser.add_argument("--events", type=int, default=10)
+    args = parser.parse_args()
+    measure_encode(args.workers, args.payload_bytes, repeats=20)
+    asyncio.run(measure_end_to_end(args.workers, args.payload_bytes, args.events))
@@ -0,0 +1,96 @@
+"""Encoding the images of a chat history with :class:`Image`.
+
+An image is added to the chat history of an agent, and the history is
+converted to the OpenAI format before every model call, as a web surfer does
+with its screenshots. For a screenshot of a text page and a photo, in each
+format, the benchmark reports:
+
+- ``first (ms)``: the time of the first conversion of the image.
+- ``history (ms)``: the time spent converting the image over all the turns.
+- ``size (KB)``: the size of the base64 encoding of the image.
+
+It also reports the time of an image created from base64 and converted back.
+
+Usage::
+
+    python image_encoding.py --width 1280 --height 720 --turns 30
+"""
+
+import argparse
+import base64
+import random
+import time
+from io import BytesIO
+from typing import List, Literal
+
+from autogen_core.components import Image
+from PIL import Image as PILImage
+from PIL import ImageDraw, ImageFilter
+
+
+def screenshot(width: int, height: int) -> PILImage.Image:
+    # Text-like rows on a page with a few colored blocks.
+    image = PILImage.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(image)
+    for y in range(10, height - 20, 24):
+        draw.text((20, y), f"Line {y} of a page with some text, links and buttons " * 4, fill="black")
+    for i in range(6):
+        draw.rectangle(
+            (i * width // 6, height // 2, (i + 1) * width // 6 - 20, height // 2 + 120), fill=(i * 40, 120, 200)
+        )
+    return image
+
+
+def photo(width: int, height: int) -> PILImage.Image:
+    # Smooth gradients with noise, which PNG compresses poorly.
+    gradient = PILImage.linear_gradient("L").resize((width, height))
+    noise = PILImage.frombytes("L", (width, height), random.Random(0).randbytes(width * height))
+    return PILImage.merge("RGB", (gradient, gradient.rotate(90).resize((width, height)), noise)).filter(
+        ImageFilter.GaussianBlur(2)
+    )
+
+
+def measure(
+    pil_image: PILImage.Image, turns: int, format: Literal["PNG", "JPEG", "WEBP"], quality: int
+) -> tuple[float, float, int]:
+    image = Image(pil_image, format=format, quality=quality)
+    start = time.perf_counter()
+    url = image.to_openai_format()["image_url"]["url"]
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(turns):
+        image.to_openai_format()
+    history = first + time.perf_counter() - start
+    return first, history, len(url)
+
+
+def measure_round_trip(pil_image: PILImage.Image, iterations: int) -> float:
+    buffered = BytesIO()
+    pil_image.save(buffered, format="PNG")
+    data = base64.b64encode(buffered.getvalue()).decode("utf-8")
+    start = time.perf_counter()
+    for _ in range(iterations):
+        Image.from_base64(data).to_base64()
+    return (time.perf_counter() - start) / iterations
+
+
+def main(width: int, height: int, turns: int, quality: int) -> None:
+    images = {"screenshot": screenshot(width, height), "photo": photo(width, height)}
+    formats: List[Literal["PNG", "JPEG", "WEBP"]] = ["PNG", "JPEG", "WEBP"]
+    print(f"{'image':>11} {'format':>7} {'first (ms)':>11} {'history (ms)':>13} {'size (KB)':>10}")
+    for name, pil_image in images.items():
+        for format in formats:
+            first, history, size = measure(pil_image, turns, format, quality)
+            print(f"{name:>11} {format:>7} {first * 1e3:>11.2f} {history * 1e3:>13.2f} {size / 1024:>10.1f}")
+    round_trip = measure_round_trip(images["screenshot"], 20)
+    print(f"from_base64 and to_base64 of the screenshot: {round_trip * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure encoding the images of a chat history.")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--quality", type=int, default=80, help="Quality of the JPEG and WebP encodings.")
+    args = parser.parse_args()
+    main(args.width, args.height, args.turns, args.quality)
@@ -0,0 +1,123 @@
+"""Cost of forwarding messages through an agent with and without lazy deserialization.
+
+A worker sends large Pydantic messages to an agent on a second worker, which
+forwards them to an echo agent on a third worker, all through a host running in
+this process. The forwarding agent runs with ``lazy_deserialization`` off and
+on, and the benchmark reports:
+
+- ``forward (us)``: the time the forwarding worker spends decoding and encoding
+  one message.
+- ``round trip (ms)``: the average ``send_message`` latency through the forwarder.
+
+Usage::
+
+    python lazy_deserialization.py --items 1000 --requests 50
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Any, List, Type
+
+from autogen_core.application import WorkerAgentRuntime, WorkerAgentRuntimeHost
+from autogen_core.base import AgentId, BaseAgent, MessageContext, try_get_known_serializers_for_type
+from autogen_core.components import RoutedAgent, message_handler
+from pydantic import BaseModel
+
+HOST_ADDRESS = "localhost:50155"
+
+
+class ChatMessage(BaseModel):
+    source: str
+    content: str
+    scores: List[float]
+
+
+class ChatHistory(BaseModel):
+    messages: List[ChatMessage]
+
+
+class EchoAgent(RoutedAgent):
+    def __init__(self) -> None:
+        super().__init__("An echo agent.")
+
+    @message_handler
+    async def on_history(self, message: ChatHistory, ctx: MessageContext) -> ChatHistory:
+        return message
+
+
+class ForwardingAgent(BaseAgent):
+    def __init__(self) -> None:
+        super().__init__("An agent forwarding messages to the echo agent.")
+
+    async def on_message(self, message: Any, ctx: MessageContext) -> Any:
+        return await self.send_message(message, AgentId("echo", "default"))
+
+
+class LazyForwardingAgent(ForwardingAgent):
+    lazy_deserialization = True
+
+
+async def measure_forward(forwarder: WorkerAgentRuntime, history: ChatHistory, repeats: int) -> float:
+    caller = WorkerAgentRuntime(host_address=HOST_ADDRESS)
+    caller.add_message_serializer(try_get_known_serializers_for_type(ChatHistory))
+    payload = await caller._serialize_payload(history, "ChatHistory")  # type: ignore[reportPrivateUsage]
+    start = time.perf_counter()
+    for _ in range(repeats):
+        message = forwarder._deserialize_payload(payload, "forwarder")  # type: ignore[reportPrivateUsage]
+        await forwarder._serialize_payload(message, forwarder._serialization_registry.type_name(message))  # type: ignore[reportPrivateUsage]
+    return (time.perf_counter() - start) / repeats
+
+
+async def measure(history: ChatHistory, requests: int, forwarder_class: Type[ForwardingAgent]) -> tuple[float, float]:
+    caller = WorkerAgentRuntime(host_address=HOST_ADDRESS)
+    forwarder = WorkerAgentRuntime(host_address=HOST_ADDRESS)
+    callee = WorkerAgentRuntime(host_address=HOST_ADDRESS)
+    caller.start()
+    forwarder.start()
+    callee.start()
+    try:
+        caller.add_message_serializer(try_get_known_serializers_for_type(ChatHistory))
+        # The forwarding worker knows the type, as it would if another agent on it handled it.
+        forwarder.add_message_serializer(try_get_known_serializers_for_type(ChatHistory))
+        await forwarder_class.register(forwarder, "forwarder", forwarder_class)
+        await EchoAgent.register(callee, "echo", EchoAgent)
+        recipient = AgentId("forwarder", "default")
+
+        forward = await measure_forward(forwarder, history, requests)
+        await caller.send_message(history, recipient)
+        start = time.perf_counter()
+        for _ in range(requests):
+            await caller.send_message(history, recipient)
+        round_trip = (time.perf_counter() - start) / requests
+        return forward, round_trip
+    finally:
+        await caller.stop()
+        await forwarder.stop()
+        await callee.stop()
+
+
+async def main(items: int, requests: int) -> None:
+    history = ChatHistory(
+        messages=[
+            ChatMessage(source="assistant", content=f"message {i} " + "lorem ipsum " * 20, scores=[i / 3] * 5)
+            for i in range(items)
+        ]
+    )
+    host = WorkerAgentRuntimeHost(address=HOST_ADDRESS)
+    host.start()
+    try:
+        print(f"{'lazy':>6} {'forward (us)':>13} {'round trip (ms)':>16}")
+        for forwarder_class in [ForwardingAgent, LazyForwardingAgent]:
+            forward, round_trip = await measure(history, requests, forwarder_class)
+            print(f"{str(forwarder_class.lazy_deserialization):>6} {forward * 1e6:>13.1f} {round_trip * 1e3:>16.2f}")
+    finally:
+        await host.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure forwarding messages with and without lazy deserialization.")
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.items, args.requests))
@@ -0,0 +1,88 @@
+"""Encode and decode cost of the JSON and msgpack message serializers.
+
+Serializes a large structured message as a dataclass and as a Pydantic model
+with each content type, and reports the average time per round trip and the
+payload size. Requires the ``msgpack`` extra.
+
+Usage::
+
+    python message_serialization.py --items 1000 --repeats 200
+"""
+
+import argparse
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+from autogen_core.base import (
+    JSON_DATA_CONTENT_TYPE,
+    MSGPACK_DATA_CONTENT_TYPE,
+    SerializationRegistry,
+    try_get_known_serializers_for_type,
+)
+from autogen_core.base._serialization import PydanticMsgpackMessageSerializer
+from pydantic import BaseModel
+
+
+@dataclass
+class DataclassDocument:
+    title: str
+    scores: List[float]
+    tags: List[str]
+    attributes: Dict[str, int]
+
+
+class Section(BaseModel):
+    heading: str
+    body: str
+    scores: List[float]
+
+
+class PydanticDocument(BaseModel):
+    title: str
+    sections: List[Section]
+
+
+def measure(registry: SerializationRegistry, message: Any, content_type: str, repeats: int) -> tuple[float, int]:
+    type_name = registry.type_name(message)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        payload = registry.serialize(message, type_name=type_name, data_content_type=content_type)
+        registry.deserialize(payload, type_name=type_name, data_content_type=content_type)
+    return (time.perf_counter() - start) / repeats, len(payload)
+
+
+def main(items: int, repeats: int) -> None:
+    registry = SerializationRegistry()
+    registry.add_serializer(try_get_known_serializers_for_type(DataclassDocument))
+    registry.add_serializer(try_get_known_serializers_for_type(PydanticDocument))
+    # Pydantic models are only serialized to msgpack if the serializer is registered explicitly.
+    registry.add_serializer(PydanticMsgpackMessageSerializer(PydanticDocument))
+    messages = {
+        "dataclass": DataclassDocument(
+            title="benchmark",
+            scores=[i / 3 for i in range(items)],
+            tags=[f"tag{i}" for i in range(items)],
+            attributes={f"key{i}": i for i in range(items)},
+        ),
+        "pydantic": PydanticDocument(
+            title="benchmark",
+            sections=[
+                Section(heading=f"section {i}", body="lorem ipsum " * 10, scores=[i / 3] * 5) for i in range(items)
+            ],
+        ),
+    }
+
+    print(f"{'message':>10} {'content type':>24} {'round trip (us)':>16} {'size (bytes)':>13}")
+    for name, message in messages.items():
+        for content_type in [JSON_DATA_CONTENT_TYPE, MSGPACK_DATA_CONTENT_TYPE]:
+            per_round_trip, size = measure(registry, message, content_type, repeats)
+            print(f"{name:>10} {content_type:>24} {per_round_trip * 1e6:>16.1f} {size:>13}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the cost of the JSON and msgpack message serializers.")
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+    main(args.items, args.repeats)
@@ -0,0 +1,130 @@
+"""Bytes on the wire and latency of :class:`WorkerAgentRuntime` payload compression.
+
+Sends chat-history-like messages of increasing size between two workers through
+a host running in this process, with payloads uncompressed and compressed with
+each available algorithm, and reports:
+
+- ``wire (bytes)``: the size of the payload sent to the host.
+- ``encode (ms)``: the time to serialize and compress the payload and decompress
+  it again.
+- ``round trip (ms)``: the average ``send_message`` latency to an echo agent,
+  which sends the message back, so both directions are compressed. Over
+  loopback there is no bandwidth to save, so this is the cost of compression.
+
+Compression with ``zstd`` requires the ``zstd`` extra.
+
+Usage::
+
+    python payload_compression.py --sizes 10000 100000 1000000 5000000 --requests 20
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from typing import List
+
+from autogen_core.application import PayloadCompressionConfig, WorkerAgentRuntime, WorkerAgentRuntimeHost
+from autogen_core.application._payload_compression import decompress, get_available_content_encodings
+from autogen_core.base import AgentId, MessageContext, try_get_known_serializers_for_type
+from autogen_core.components import RoutedAgent, message_handler
+
+MAX_MESSAGE_LENGTH = 64 * 1024 * 1024
+GRPC_CONFIG = [
+    ("grpc.max_send_message_length", MAX_MESSAGE_LENGTH),
+    ("grpc.max_receive_message_length", MAX_MESSAGE_LENGTH),
+]
+WORDS = (
+    "the agent said that it would review the code and report back with a summary of the changes "
+    "user assistant tool call result please can you find the file function test error because"
+).split()
+
+
+@dataclass
+class ChatMessage:
+    source: str
+    content: str
+
+
+@dataclass
+class ChatHistory:
+    messages: List[ChatMessage]
+
+
+class EchoAgent(RoutedAgent):
+    def __init__(self) -> None:
+        super().__init__("An echo agent.")
+
+    @message_handler
+    async def on_history(self, message: ChatHistory, ctx: MessageContext) -> ChatHistory:
+        return message
+
+
+def make_history(size: int) -> ChatHistory:
+    rng = random.Random(size)
+    messages: List[ChatMessage] = []
+    length = 0
+    while length < size:
+        content = " ".join(rng.choice(WORDS) for _ in range(rng.randint(10, 80)))
+        messages.append(ChatMessage(source=rng.choice(["user", "assistant"]), content=content))
+        length += len(content) + 40
+    return ChatHistory(messages=messages)
+
+
+async def measure(history: ChatHistory, algorithm: str, requests: int, host_address: str) -> tuple[int, float, float]:
+    compression = None if algorithm == "none" else PayloadCompressionConfig(algorithm=algorithm, threshold=0)  # type: ignore[arg-type]
+    callee = WorkerAgentRuntime(
+        host_address=host_address, extra_grpc_config=GRPC_CONFIG, payload_compression=compression
+    )
+    caller = WorkerAgentRuntime(
+        host_address=host_address, extra_grpc_config=GRPC_CONFIG, payload_compression=compression
+    )
+    callee.start()
+    caller.start()
+    try:
+        await EchoAgent.register(callee, "echo", EchoAgent)
+        caller.add_message_serializer(try_get_known_serializers_for_type(ChatHistory))
+        recipient = AgentId("echo", "default")
+        # Wait for the host to announce the content encodings every client accepts.
+        await asyncio.sleep(0.5)
+
+        start = time.perf_counter()
+        payload = await caller._serialize_payload(history, "ChatHistory")  # type: ignore[reportPrivateUsage]
+        if payload.content_encoding:
+            decompress(payload.data, payload.content_encoding)
+        codec = time.perf_counter() - start
+
+        await caller.send_message(history, recipient)
+        start = time.perf_counter()
+        for _ in range(requests):
+            await caller.send_message(history, recipient)
+        round_trip = (time.perf_counter() - start) / requests
+        return len(payload.data), codec, round_trip
+    finally:
+        await caller.stop()
+        await callee.stop()
+
+
+async def main(sizes: List[int], requests: int) -> None:
+    host_address = "localhost:50153"
+    host = WorkerAgentRuntimeHost(address=host_address, extra_grpc_config=GRPC_CONFIG)
+    host.start()
+    algorithms = ["none", *get_available_content_encodings()]
+    try:
+        print(f"{'size (bytes)':>13} {'encoding':>9} {'wire (bytes)':>13} {'encode (ms)':>12} {'round trip (ms)':>16}")
+        for size in sizes:
+            history = make_history(size)
+            for algorithm in algorithms:
+                wire, codec, round_trip = await measure(history, algorithm, requests, host_address)
+                print(f"{size:>13} {algorithm:>9} {wire:>13} {codec * 1e3:>12.2f} {round_trip * 1e3:>16.2f}")
+    finally:
+        await host.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the payload size and latency of payload compression.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000, 5_000_000])
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.requests))
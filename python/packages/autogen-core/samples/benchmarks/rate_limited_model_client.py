@@ -0,0 +1,119 @@
+"""Priority lanes of :class:`ChatCompletionRateLimiter` under a backlog of bulk requests.
+
+Workers queue a backlog of requests to a deployment that allows a fixed number
+of requests in flight, and an orchestrator sends one request in the middle of
+the backlog. For the orchestrator at the same priority as the workers and at a
+higher one, the benchmark reports:
+
+- ``orchestrator (ms)``: the time until the orchestrator got its response.
+- ``backlog (ms)``: the time until every request was answered.
+
+It also reports the cost of an uncontended ``acquire`` and ``release`` pair.
+
+Usage::
+
+    python rate_limited_model_client.py --requests 200 --max-in-flight 4 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Any, AsyncGenerator, List, Mapping, Optional, Sequence, Union
+
+from autogen_core.base import CancellationToken
+from autogen_core.components.models import (
+    ChatCompletionClient,
+    ChatCompletionRateLimiter,
+    CreateResult,
+    LLMMessage,
+    ModelCapabilities,
+    RateLimitedChatCompletionClient,
+    RequestUsage,
+    UserMessage,
+)
+from autogen_core.components.tools import Tool, ToolSchema
+
+
+class DeploymentChatCompletionClient(ChatCompletionClient):
+    def __init__(self, latency: float) -> None:
+        self._latency = latency
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        tools: Sequence[Tool | ToolSchema] = [],
+        json_output: Optional[bool] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> CreateResult:
+        await asyncio.sleep(self._latency)
+        return CreateResult(finish_reason="stop", content="response", usage=RequestUsage(100, 10), cached=False)
+
+    async def create_stream(
+        self,
+        messages: Sequence[LLMMessage],
+        tools: Sequence[Tool | ToolSchema] = [],
+        json_output: Optional[bool] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> AsyncGenerator[Union[str, CreateResult], None]:
+        yield await self.create(messages, tools, json_output, extra_create_args, cancellation_token)
+
+    def actual_usage(self) -> RequestUsage:
+        return RequestUsage(0, 0)
+
+    def total_usage(self) -> RequestUsage:
+        return RequestUsage(0, 0)
+
+    def count_tokens(self, messages: Sequence[LLMMessage], tools: Sequence[Tool | ToolSchema] = []) -> int:
+        return 100
+
+    def remaining_tokens(self, messages: Sequence[LLMMessage], tools: Sequence[Tool | ToolSchema] = []) -> int:
+        return 0
+
+    @property
+    def capabilities(self) -> ModelCapabilities:
+        return ModelCapabilities(vision=False, function_calling=False, json_output=False)
+
+
+async def measure(requests: int, max_in_flight: int, latency: float, priority: int) -> tuple[float, float]:
+    deployment = DeploymentChatCompletionClient(latency)
+    limiter = ChatCompletionRateLimiter(tokens_per_minute=10_000_000, max_in_flight=max_in_flight)
+    workers = RateLimitedChatCompletionClient(deployment, limiter)
+    orchestrator = RateLimitedChatCompletionClient(deployment, limiter, priority=priority)
+    messages: List[LLMMessage] = [UserMessage(content="hello", source="user")]
+
+    start = time.perf_counter()
+    backlog = [asyncio.create_task(workers.create(messages)) for _ in range(requests)]
+    await asyncio.sleep(latency)
+    orchestrator_start = time.perf_counter()
+    await orchestrator.create(messages)
+    orchestrator_time = time.perf_counter() - orchestrator_start
+    await asyncio.gather(*backlog)
+    return orchestrator_time, time.perf_counter() - start
+
+
+async def measure_overhead(iterations: int) -> float:
+    limiter = ChatCompletionRateLimiter(requests_per_minute=10**9, tokens_per_minute=10**9, max_in_flight=16)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await limiter.acquire(100)
+        limiter.release(10)
+    return (time.perf_counter() - start) / iterations
+
+
+async def main(requests: int, max_in_flight: int, latency: float) -> None:
+    print(f"{'orchestrator priority':>21} {'orchestrator (ms)':>18} {'backlog (ms)':>13}")
+    for priority in [0, 1]:
+        orchestrator_time, backlog_time = await measure(requests, max_in_flight, latency, priority)
+        print(f"{priority:>21} {orchestrator_time * 1e3:>18.1f} {backlog_time * 1e3:>13.1f}")
+    print(f"acquire and release: {await measure_overhead(100_000) * 1e6:.2f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure priority lanes of the model client rate limiter.")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--max-in-flight", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.max_in_flight, args.latency))
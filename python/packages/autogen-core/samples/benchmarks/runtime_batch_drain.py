@@ -0,0 +1,76 @@
+"""Throughput benchmark for the batch drain mode of :class:`SingleThreadedAgentRuntime`.
+
+Each workload is run against runtimes created with different ``message_batch_size``
+values and reports the number of envelopes dispatched per second:
+
+- ``publish``: messages published to a topic with one subscriber.
+- ``send``: concurrent RPCs, each producing a send and a response envelope.
+- ``mixed``: half publishes, half RPCs.
+
+Usage::
+
+    python runtime_batch_drain.py --messages 20000 --batch-sizes 1 8 32 128
+"""
+
+import argparse
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Awaitable, List
+
+from autogen_core.application import SingleThreadedAgentRuntime
+from autogen_core.base import AgentId, MessageContext
+from autogen_core.components import DefaultTopicId, RoutedAgent, default_subscription, message_handler
+
+
+@dataclass
+class Ping:
+    pass
+
+
+@default_subscription
+class EchoAgent(RoutedAgent):
+    def __init__(self) -> None:
+        super().__init__("An echo agent.")
+
+    @message_handler
+    async def on_ping(self, message: Ping, ctx: MessageContext) -> Ping:
+        return message
+
+
+async def run_workload(workload: str, messages: int, batch_size: int) -> float:
+    runtime = SingleThreadedAgentRuntime(message_batch_size=batch_size)
+    await EchoAgent.register(runtime, "echo", EchoAgent)
+    recipient = AgentId("echo", "default")
+    runtime.start()
+
+    start = time.perf_counter()
+    calls: List[Awaitable[object]] = []
+    envelopes = 0
+    for i in range(messages):
+        if workload == "publish" or (workload == "mixed" and i % 2 == 0):
+            calls.append(runtime.publish_message(Ping(), topic_id=DefaultTopicId()))
+            envelopes += 1
+        else:
+            calls.append(runtime.send_message(Ping(), recipient))
+            envelopes += 2
+    await asyncio.gather(*calls)
+    await runtime.stop_when_idle()
+    elapsed = time.perf_counter() - start
+    return envelopes / elapsed
+
+
+async def main(messages: int, batch_sizes: List[int]) -> None:
+    print(f"{'workload':>10} {'batch size':>10} {'envelopes/s':>12}")
+    for workload in ["publish", "send", "mixed"]:
+        for batch_size in batch_sizes:
+            throughput = await run_workload(workload, messages, batch_size)
+            print(f"{workload:>10} {batch_size:>10} {throughput:>12.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure throughput of the single threaded runtime batch drain mode.")
+    parser.add_argument("--messages", type=int, default=20_000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 128])
+    args = parser.parse_args()
+    asyncio.run(main(args.messages, args.batch_sizes))
@@ -0,0 +1,76 @@
+"""Per-message logging overhead of :class:`SingleThreadedAgentRuntime`.
+
+Runs the same send and publish workload with the ``autogen_core`` logger
+disabled (WARNING) and enabled (INFO, formatted into an in-memory stream),
+and reports the average time per message.
+
+Usage::
+
+    python runtime_logging_overhead.py --messages 20000
+"""
+
+import argparse
+import asyncio
+import io
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from autogen_core.application import SingleThreadedAgentRuntime
+from autogen_core.application.logging import ROOT_LOGGER_NAME
+from autogen_core.base import AgentId, MessageContext
+from autogen_core.components import DefaultTopicId, RoutedAgent, default_subscription, message_handler
+
+
+@dataclass
+class Document:
+    title: str = "benchmark"
+    body: str = "lorem ipsum " * 100
+    tags: List[str] = field(default_factory=lambda: ["a", "b", "c"])
+    extra: Dict[str, int] = field(default_factory=lambda: {str(i): i for i in range(20)})
+
+
+@default_subscription
+class SinkAgent(RoutedAgent):
+    def __init__(self) -> None:
+        super().__init__("A sink agent.")
+
+    @message_handler
+    async def on_document(self, message: Document, ctx: MessageContext) -> Document:
+        return message
+
+
+async def run(messages: int) -> float:
+    runtime = SingleThreadedAgentRuntime()
+    await SinkAgent.register(runtime, "sink", SinkAgent)
+    recipient = AgentId("sink", "default")
+    message = Document()
+    runtime.start()
+
+    start = time.perf_counter()
+    for _ in range(messages // 2):
+        await runtime.publish_message(message, topic_id=DefaultTopicId())
+        await runtime.send_message(message, recipient)
+    await runtime.stop_when_idle()
+    return (time.perf_counter() - start) / messages
+
+
+async def main(messages: int) -> None:
+    logger = logging.getLogger(ROOT_LOGGER_NAME)
+    handler = logging.StreamHandler(io.StringIO())
+    logger.addHandler(handler)
+    logger.propagate = False
+
+    print(f"{'logging':>8} {'per message (us)':>18}")
+    for level, name in [(logging.WARNING, "off"), (logging.INFO, "on")]:
+        logger.setLevel(level)
+        per_message = await run(messages)
+        print(f"{name:>8} {per_message * 1e6:>18.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the logging overhead of the single threaded runtime.")
+    parser.add_argument("--messages", type=int, default=20_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.messages))
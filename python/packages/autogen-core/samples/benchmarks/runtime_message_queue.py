@@ -0,0 +1,55 @@
+"""Micro-benchmark for the message queue of :class:`SingleThreadedAgentRuntime`.
+
+The runtime is filled with ``N`` queued publish envelopes and then drained with
+:meth:`SingleThreadedAgentRuntime.process_next`. The per-message dequeue cost
+should stay flat as ``N`` grows.
+
+Usage::
+
+    python runtime_message_queue.py --sizes 100000 1000000
+"""
+
+import argparse
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import List
+
+from autogen_core.application import SingleThreadedAgentRuntime
+from autogen_core.base import TopicId
+
+
+@dataclass
+class Ping:
+    pass
+
+
+async def drain(size: int) -> float:
+    runtime = SingleThreadedAgentRuntime()
+    topic_id = TopicId("benchmark", "default")
+    for _ in range(size):
+        await runtime.publish_message(Ping(), topic_id=topic_id)
+
+    start = time.perf_counter()
+    while len(runtime.unprocessed_messages) > 0:
+        await runtime.process_next()
+    elapsed = time.perf_counter() - start
+
+    # Let the publish tasks finish before the next round.
+    runtime.start()
+    await runtime.stop_when_idle()
+    return elapsed
+
+
+async def main(sizes: List[int]) -> None:
+    print(f"{'queued':>10} {'total (s)':>10} {'per message (us)':>18}")
+    for size in sizes:
+        elapsed = await drain(size)
+        print(f"{size:>10} {elapsed:>10.3f} {elapsed / size * 1e6:>18.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure dequeue cost of the single threaded runtime.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes))
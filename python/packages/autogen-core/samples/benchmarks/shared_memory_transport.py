@@ -0,0 +1,106 @@
+"""Latency of :class:`WorkerAgentRuntime` payloads passed inline versus in shared memory.
+
+Sends messages of increasing size from a worker to an echo agent on a worker
+running in another process, through a host running in this process, and reports
+the average ``send_message`` round trip with payloads sent inline over gRPC and
+written to shared memory, with only their handle sent over gRPC.
+
+Usage::
+
+    python shared_memory_transport.py --sizes 100000 1000000 10000000 --requests 20
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import multiprocessing.synchronize
+import time
+from dataclasses import dataclass
+from typing import List
+
+from autogen_core.application import SharedMemoryConfig, WorkerAgentRuntime, WorkerAgentRuntimeHost
+from autogen_core.base import AgentId, MessageContext, try_get_known_serializers_for_type
+from autogen_core.components import RoutedAgent, message_handler
+
+HOST_ADDRESS = "localhost:50154"
+MAX_MESSAGE_LENGTH = 64 * 1024 * 1024
+GRPC_CONFIG = [
+    ("grpc.max_send_message_length", MAX_MESSAGE_LENGTH),
+    ("grpc.max_receive_message_length", MAX_MESSAGE_LENGTH),
+]
+
+
+@dataclass
+class Blob:
+    data: str
+
+
+class EchoAgent(RoutedAgent):
+    def __init__(self) -> None:
+        super().__init__("An echo agent.")
+
+    @message_handler
+    async def on_blob(self, message: Blob, ctx: MessageContext) -> Blob:
+        return message
+
+
+async def run_callee(shared_memory: SharedMemoryConfig | None, ready: "multiprocessing.synchronize.Event") -> None:
+    callee = WorkerAgentRuntime(host_address=HOST_ADDRESS, extra_grpc_config=GRPC_CONFIG, shared_memory=shared_memory)
+    callee.start()
+    await EchoAgent.register(callee, "echo", EchoAgent)
+    ready.set()
+    await callee.stop_when_signal()
+
+
+def callee_process(shared_memory: SharedMemoryConfig | None, ready: "multiprocessing.synchronize.Event") -> None:
+    asyncio.run(run_callee(shared_memory, ready))
+
+
+async def measure(sizes: List[int], requests: int, shared_memory: SharedMemoryConfig | None) -> List[float]:
+    # gRPC does not support forking a process that uses it.
+    context = multiprocessing.get_context("spawn")
+    ready = context.Event()
+    process = context.Process(target=callee_process, args=(shared_memory, ready))
+    process.start()
+    caller = WorkerAgentRuntime(host_address=HOST_ADDRESS, extra_grpc_config=GRPC_CONFIG, shared_memory=shared_memory)
+    caller.start()
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, ready.wait)
+        caller.add_message_serializer(try_get_known_serializers_for_type(Blob))
+        recipient = AgentId("echo", "default")
+        # Wait for the host to announce that every client runs on this machine.
+        await asyncio.sleep(0.5)
+        round_trips: List[float] = []
+        for size in sizes:
+            message = Blob(data="x" * size)
+            await caller.send_message(message, recipient)
+            start = time.perf_counter()
+            for _ in range(requests):
+                await caller.send_message(message, recipient)
+            round_trips.append((time.perf_counter() - start) / requests)
+        return round_trips
+    finally:
+        await caller.stop()
+        process.terminate()
+        process.join()
+
+
+async def main(sizes: List[int], requests: int) -> None:
+    host = WorkerAgentRuntimeHost(address=HOST_ADDRESS, extra_grpc_config=GRPC_CONFIG)
+    host.start()
+    try:
+        inline = await measure(sizes, requests, None)
+        shared = await measure(sizes, requests, SharedMemoryConfig(threshold=1))
+    finally:
+        await host.stop()
+    print(f"{'size (bytes)':>13} {'inline (ms)':>12} {'shared memory (ms)':>19}")
+    for size, inline_round_trip, shared_round_trip in zip(sizes, inline, shared, strict=True):
+        print(f"{size:>13} {inline_round_trip * 1e3:>12.2f} {shared_round_trip * 1e3:>19.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure payloads passed inline versus in shared memory.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.requests))
@@ -0,0 +1,102 @@
+"""Bursts of identical model requests through :class:`SingleFlightChatCompletionClient`.
+
+Agents of a team send the same request to a model client at the same time, as
+they do when they share a system prompt and history. For each burst size,
+without and with single flight, the benchmark reports:
+
+- ``upstream``: the requests the model client received, which are the tokens
+  spent.
+- ``time (ms)``: the time until every agent got its response.
+
+Usage::
+
+    python single_flight_model_client.py --latency 0.2 --agents 2 8 32
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Any, AsyncGenerator, List, Mapping, Optional, Sequence, Union
+
+from autogen_core.base import CancellationToken
+from autogen_core.components.models import (
+    ChatCompletionClient,
+    CreateResult,
+    LLMMessage,
+    ModelCapabilities,
+    RequestUsage,
+    SingleFlightChatCompletionClient,
+    SystemMessage,
+    UserMessage,
+)
+from autogen_core.components.tools import Tool, ToolSchema
+
+
+class CountingChatCompletionClient(ChatCompletionClient):
+    def __init__(self, latency: float) -> None:
+        self._latency = latency
+        self.calls = 0
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        tools: Sequence[Tool | ToolSchema] = [],
+        json_output: Optional[bool] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> CreateResult:
+        self.calls += 1
+        await asyncio.sleep(self._latency)
+        return CreateResult(finish_reason="stop", content="response", usage=RequestUsage(1000, 10), cached=False)
+
+    async def create_stream(
+        self,
+        messages: Sequence[LLMMessage],
+        tools: Sequence[Tool | ToolSchema] = [],
+        json_output: Optional[bool] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> AsyncGenerator[Union[str, CreateResult], None]:
+        yield await self.create(messages, tools, json_output, extra_create_args, cancellation_token)
+
+    def actual_usage(self) -> RequestUsage:
+        return RequestUsage(0, 0)
+
+    def total_usage(self) -> RequestUsage:
+        return RequestUsage(0, 0)
+
+    def count_tokens(self, messages: Sequence[LLMMessage], tools: Sequence[Tool | ToolSchema] = []) -> int:
+        return 0
+
+    def remaining_tokens(self, messages: Sequence[LLMMessage], tools: Sequence[Tool | ToolSchema] = []) -> int:
+        return 0
+
+    @property
+    def capabilities(self) -> ModelCapabilities:
+        return ModelCapabilities(vision=False, function_calling=False, json_output=False)
+
+
+async def measure(latency: float, agents: int, single_flight: bool) -> tuple[int, float]:
+    upstream = CountingChatCompletionClient(latency)
+    client: ChatCompletionClient = SingleFlightChatCompletionClient(upstream) if single_flight else upstream
+    messages: List[LLMMessage] = [SystemMessage(content="Select the next speaker.")]
+    messages += [UserMessage(content=f"message {i} " * 50, source="user") for i in range(20)]
+    start = time.perf_counter()
+    await asyncio.gather(*(client.create(messages) for _ in range(agents)))
+    return upstream.calls, time.perf_counter() - start
+
+
+async def main(latency: float, agent_counts: List[int]) -> None:
+    print(f"{'agents':>7} {'single flight':>14} {'upstream':>9} {'time (ms)':>10}")
+    for agents in agent_counts:
+        for single_flight in [False, True]:
+            calls, elapsed = await measure(latency, agents, single_flight)
+            print(f"{agents:>7} {str(single_flight):>14} {calls:>9} {elapsed * 1e3:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure bursts of identical model requests.")
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--agents", type=int, nargs="+", default=[2, 8, 32])
+    args = parser.parse_args()
+    asyncio.run(main(args.latency, args.agents))
@@ -0,0 +1,108 @@
+"""Checkpointing the states of many agents to :class:`WorkerAgentRuntimeHost`.
+
+For each host state store, saves the state of every agent of a worker to the
+host with one ``SaveState`` call per agent, and with one batched ``SaveStates``
+call through :meth:`WorkerAgentRuntime.checkpoint`, and reports the time of a
+whole checkpoint.
+
+Usage::
+
+    python state_checkpoint.py --agents 1000 5000
+"""
+
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, List, Mapping
+
+from autogen_core.application import (
+    FileHostStateStore,
+    HostStateStore,
+    InMemoryHostStateStore,
+    SqliteHostStateStore,
+    WorkerAgentRuntime,
+    WorkerAgentRuntimeHost,
+)
+from autogen_core.application._worker_runtime import HostConnection
+from autogen_core.application.protos import agent_worker_pb2
+from autogen_core.base import AgentId, BaseAgent, MessageContext
+
+HOST_ADDRESS = "localhost:50156"
+
+
+class ChatAgent(BaseAgent):
+    def __init__(self) -> None:
+        super().__init__("An agent with a chat history.")
+        self.history = [f"message {i}" for i in range(20)]
+
+    async def on_message(self, message: Any, ctx: MessageContext) -> Any:
+        return None
+
+    def save_state(self) -> Mapping[str, Any]:
+        return {"history": self.history}
+
+    def load_state(self, state: Mapping[str, Any]) -> None:
+        self.history = state["history"]
+
+
+async def measure(store: HostStateStore, agents: int) -> tuple[float, float]:
+    host = WorkerAgentRuntimeHost(address=HOST_ADDRESS, state_store=store)
+    host.start()
+    worker = WorkerAgentRuntime(host_address=HOST_ADDRESS)
+    worker.start()
+    connection = HostConnection.from_host_address(HOST_ADDRESS)
+    try:
+        await ChatAgent.register(worker, "chat", ChatAgent)
+        agent_ids = [AgentId("chat", str(i)) for i in range(agents)]
+        for agent_id in agent_ids:
+            await worker.try_get_underlying_agent_instance(agent_id, ChatAgent)
+
+        start = time.perf_counter()
+        for agent_id in agent_ids:
+            state = await worker.agent_save_state(agent_id)
+            response = await connection._stub.SaveState(  # type: ignore[reportPrivateUsage]
+                agent_worker_pb2.AgentState(
+                    agent_id=agent_worker_pb2.AgentId(type=agent_id.type, key=agent_id.key),
+                    text_data=json.dumps(dict(state)),
+                )
+            )
+            assert response.success
+        per_agent = time.perf_counter() - start
+
+        start = time.perf_counter()
+        await worker.checkpoint()
+        batched = time.perf_counter() - start
+        return per_agent, batched
+    finally:
+        try:
+            await connection.close()
+        except asyncio.CancelledError:
+            pass
+        await worker.stop()
+        await host.stop()
+
+
+async def main(agent_counts: List[int]) -> None:
+    print(f"{'store':>8} {'agents':>7} {'per agent (ms)':>15} {'batched (ms)':>13}")
+    with tempfile.TemporaryDirectory() as directory:
+        for agents in agent_counts:
+            stores: List[tuple[str, HostStateStore]] = [
+                ("memory", InMemoryHostStateStore()),
+                ("sqlite", SqliteHostStateStore(Path(directory) / f"states{agents}.db")),
+                ("file", FileHostStateStore(Path(directory) / f"states{agents}.log")),
+            ]
+            for name, store in stores:
+                per_agent, batched = await measure(store, agents)
+                print(f"{name:>8} {agents:>7} {per_agent * 1e3:>15.1f} {batched * 1e3:>13.1f}")
+                if isinstance(store, (SqliteHostStateStore, FileHostStateStore)):
+                    store.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure checkpointing agent states to the host.")
+    parser.add_argument("--agents", type=int, nargs="+", default=[1000, 5000])
+    args = parser.parse_args()
+    asyncio.run(main(args.agents))
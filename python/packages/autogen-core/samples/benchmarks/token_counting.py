@@ -0,0 +1,79 @@
+"""Counting the tokens of a growing chat history with ``OpenAIChatCompletionClient.count_tokens``.
+
+Agents count the tokens of their whole history before each request, with one
+message more each time. For each history length the benchmark reports:
+
+- ``first (ms)``: the first count, which encodes every message and tool.
+- ``repeated (ms)``: a count of the same history and tools.
+- ``appended (ms)``: a count after one more message was appended.
+
+Requires AutoGen Extensions, and the tiktoken encoding of the model, which is
+downloaded on first use.
+
+Usage::
+
+    python token_counting.py --model gpt-4o --messages 10 100 1000
+"""
+
+import argparse
+import time
+from typing import List
+
+from autogen_core.components.models import AssistantMessage, LLMMessage, SystemMessage, UserMessage
+from autogen_core.components.tools import FunctionTool
+from autogen_ext.models import OpenAIChatCompletionClient
+
+
+def search(query: str, max_results: int) -> str:
+    return query
+
+
+def fetch(url: str) -> str:
+    return url
+
+
+def history(length: int) -> List[LLMMessage]:
+    messages: List[LLMMessage] = [SystemMessage(content="You are a helpful assistant.")]
+    for i in range(length - 1):
+        if i % 2 == 0:
+            messages.append(UserMessage(content=f"question {i} " * 50, source="user"))
+        else:
+            messages.append(AssistantMessage(content=f"answer {i} " * 50, source="assistant"))
+    return messages
+
+
+def measure(model: str, length: int) -> tuple[float, float, float]:
+    client = OpenAIChatCompletionClient(model=model, api_key="api_key")
+    tools = [FunctionTool(search, description="Search the web."), FunctionTool(fetch, description="Fetch a page.")]
+    # Load the encoding outside of the measurements.
+    client.count_tokens([])
+    messages = history(length)
+
+    start = time.perf_counter()
+    client.count_tokens(messages, tools)
+    first = time.perf_counter() - start
+
+    start = time.perf_counter()
+    client.count_tokens(messages, tools)
+    repeated = time.perf_counter() - start
+
+    messages.append(UserMessage(content="one more question " * 50, source="user"))
+    start = time.perf_counter()
+    client.count_tokens(messages, tools)
+    appended = time.perf_counter() - start
+    return first, repeated, appended
+
+
+def main(model: str, lengths: List[int]) -> None:
+    print(f"{'messages':>9} {'first (ms)':>11} {'repeated (ms)':>14} {'appended (ms)':>14}")
+    for length in lengths:
+        first, repeated, appended = measure(model, length)
+        print(f"{length:>9} {first * 1e3:>11.2f} {repeated * 1e3:>14.2f} {appended * 1e3:>14.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure token counting of growing chat histories.")
+    parser.add_argument("--model", default="gpt-4o")
+    parser.add_argument("--messages", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+    main(args.model, args.messages)
@@ -0,0 +1,133 @@
+"""Requests to a :class:`WorkerAgentRuntime` whose channel to the host keeps breaking.
+
+A worker serves an echo agent through a TCP proxy to a host running in this
+process, and a second worker sends it requests directly. The proxy breaks its
+connections at a fixed interval, as a flaky network would. For the serving
+worker with and without reconnecting, the benchmark reports:
+
+- ``round trip (us)``: the average ``send_message`` latency before any break,
+  the cost of numbering and buffering messages for replay.
+- ``answered``: the requests answered while the channel kept breaking, out of
+  the requests sent. The others timed out.
+
+Usage::
+
+    python worker_reconnect.py --requests 2000 --breaks 5
+"""
+
+import argparse
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import List
+
+import grpc
+from autogen_core.application import ReconnectConfig, WorkerAgentRuntime, WorkerAgentRuntimeHost
+from autogen_core.base import AgentId, MessageContext, try_get_known_serializers_for_type
+from autogen_core.components import RoutedAgent, message_handler
+
+HOST_PORT = 50157
+PROXY_PORT = 50158
+
+
+@dataclass
+class Ping:
+    sequence: int
+
+
+class EchoAgent(RoutedAgent):
+    def __init__(self) -> None:
+        super().__init__("An echo agent.")
+
+    @message_handler
+    async def on_ping(self, message: Ping, ctx: MessageContext) -> Ping:
+        return message
+
+
+class FlakyProxy:
+    """Forwards connections to the host, and breaks them when asked to."""
+
+    def __init__(self) -> None:
+        self._writers: List[asyncio.StreamWriter] = []
+
+    def break_connections(self) -> None:
+        for writer in self._writers:
+            writer.transport.abort()
+        self._writers.clear()
+
+    async def handle(self, client_reader: asyncio.StreamReader, client_writer: asyncio.StreamWriter) -> None:
+        host_reader, host_writer = await asyncio.open_connection("localhost", HOST_PORT)
+        self._writers += [client_writer, host_writer]
+
+        async def pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            try:
+                while data := await reader.read(65536):
+                    writer.write(data)
+                    await writer.drain()
+            except ConnectionError:
+                pass
+            writer.transport.abort()
+
+        await asyncio.gather(pipe(client_reader, host_writer), pipe(host_reader, client_writer))
+
+
+async def measure(requests: int, breaks: int, reconnect: ReconnectConfig | None) -> tuple[float, int, int]:
+    proxy = FlakyProxy()
+    server = await asyncio.start_server(proxy.handle, "localhost", PROXY_PORT)
+    callee = WorkerAgentRuntime(host_address=f"localhost:{PROXY_PORT}", reconnect=reconnect)
+    caller = WorkerAgentRuntime(host_address=f"localhost:{HOST_PORT}", rpc_timeout=1.0)
+    callee.start()
+    caller.start()
+    try:
+        caller.add_message_serializer(try_get_known_serializers_for_type(Ping))
+        await EchoAgent.register(callee, "echo", EchoAgent)
+        recipient = AgentId("echo", "default")
+        await caller.send_message(Ping(0), recipient)
+
+        start = time.perf_counter()
+        for i in range(requests):
+            await caller.send_message(Ping(i), recipient)
+        round_trip = (time.perf_counter() - start) / requests
+
+        async def break_periodically() -> None:
+            for _ in range(breaks):
+                await asyncio.sleep(0.5)
+                proxy.break_connections()
+
+        breaking = asyncio.create_task(break_periodically())
+        sent = answered = 0
+        while not breaking.done():
+            sent += 10
+            for response in await asyncio.gather(
+                *(caller.send_message(Ping(i), recipient) for i in range(10)), return_exceptions=True
+            ):
+                answered += not isinstance(response, BaseException)
+        return round_trip, sent, answered
+    finally:
+        await caller.stop()
+        try:
+            await callee.stop()
+        except grpc.aio.AioRpcError:
+            # The channel of a worker that does not reconnect stays broken.
+            pass
+        server.close()
+
+
+async def main(requests: int, breaks: int) -> None:
+    host = WorkerAgentRuntimeHost(address=f"localhost:{HOST_PORT}")
+    host.start()
+    try:
+        print(f"{'reconnect':>9} {'round trip (us)':>16} {'sent':>6} {'answered':>9}")
+        for reconnect in [None, ReconnectConfig(initial_backoff=0.05)]:
+            round_trip, sent, answered = await measure(requests, breaks, reconnect)
+            print(f"{str(reconnect is not None):>9} {round_trip * 1e6:>16.1f} {sent:>6} {answered:>9}")
+    finally:
+        await host.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure requests to a worker whose channel keeps breaking.")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--breaks", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.breaks))
@@ -0,0 +1,113 @@
+"""Request round trips through :class:`WorkerAgentRuntimeHost`.
+
+Two measurements are reported:
+
+- ``request ids``: the cost of allocating one request id, with the lock the
+  runtime used to take on every request versus the counter it uses now.
+- ``round trips``: ``send_message`` calls per second from one worker to an
+  echo agent on another worker, through a host running in this process, with
+  a number of requests in flight at a time.
+
+Usage::
+
+    python worker_rpc_roundtrip.py --requests 5000 --concurrency 1 16 64
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from dataclasses import dataclass
+from itertools import count
+from typing import Iterator, List
+
+from autogen_core.application import WorkerAgentRuntime, WorkerAgentRuntimeHost
+from autogen_core.base import AgentId, MessageContext, try_get_known_serializers_for_type
+from autogen_core.components import RoutedAgent, message_handler
+
+
+@dataclass
+class Ping:
+    sequence: int
+
+
+class EchoAgent(RoutedAgent):
+    def __init__(self) -> None:
+        super().__init__("An echo agent.")
+
+    @message_handler
+    async def on_ping(self, message: Ping, ctx: MessageContext) -> Ping:
+        return message
+
+
+async def measure_request_ids(ids: int) -> None:
+    lock = asyncio.Lock()
+    next_id = 0
+
+    async def locked_id() -> str:
+        nonlocal next_id
+        async with lock:
+            next_id += 1
+            return str(next_id)
+
+    start = time.perf_counter()
+    for _ in range(ids):
+        await locked_id()
+    locked = (time.perf_counter() - start) / ids
+
+    prefix = uuid.uuid4().hex[:12]
+    counter = count(1)
+    start = time.perf_counter()
+    for _ in range(ids):
+        f"{prefix}-{next(counter)}"
+    lock_free = (time.perf_counter() - start) / ids
+
+    print(f"{'request ids':>12} {'per id (ns)':>12}")
+    print(f"{'lock':>12} {locked * 1e9:>12.0f}")
+    print(f"{'counter':>12} {lock_free * 1e9:>12.0f}")
+
+
+async def send_requests(caller: WorkerAgentRuntime, recipient: AgentId, sequence: Iterator[int], requests: int) -> None:
+    for number in sequence:
+        if number >= requests:
+            break
+        await caller.send_message(Ping(sequence=number), recipient)
+
+
+async def measure_round_trips(requests: int, concurrencies: List[int]) -> None:
+    host_address = "localhost:50152"
+    host = WorkerAgentRuntimeHost(address=host_address)
+    host.start()
+    callee = WorkerAgentRuntime(host_address=host_address)
+    caller = WorkerAgentRuntime(host_address=host_address)
+    callee.start()
+    caller.start()
+    try:
+        await EchoAgent.register(callee, "echo", EchoAgent)
+        caller.add_message_serializer(try_get_known_serializers_for_type(Ping))
+        recipient = AgentId("echo", "default")
+
+        print(f"{'in flight':>12} {'round trips/s':>14}")
+        for concurrency in concurrencies:
+            sequence = count()
+            start = time.perf_counter()
+            await asyncio.gather(*[send_requests(caller, recipient, sequence, requests) for _ in range(concurrency)])
+            elapsed = time.perf_counter() - start
+            print(f"{concurrency:>12} {requests / elapsed:>14.0f}")
+    finally:
+        await caller.stop()
+        await callee.stop()
+        await host.stop()
+
+
+async def main(requests: int, concurrencies: List[int]) -> None:
+    await measure_request_ids(100_000)
+    await measure_round_trips(requests, concurrencies)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure request round trips through the worker runtime host.")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
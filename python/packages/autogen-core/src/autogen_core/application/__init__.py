@@ -2,8 +2,42 @@
 The :mod:`autogen_core.application` module provides implementations of core components that are used to compose an application
 """
 
+from ._agent_passivation import AgentPassivationPolicy, AgentStateStore, InMemoryAgentStateStore
+from ._helpers import SubscriptionCacheStats
+from ._host_state_store import (
+    AgentStateUpdate,
+    ETagMismatchError,
+    FileHostStateStore,
+    HostStateStore,
+    InMemoryHostStateStore,
+    SqliteHostStateStore,
+    StoredAgentState,
+)
+from ._message_batching import MessageBatchingConfig
+from ._payload_compression import PayloadCompressionConfig
+from ._reconnect import ReconnectConfig
+from ._shared_memory import SharedMemoryConfig
 from ._single_threaded_agent_runtime import SingleThreadedAgentRuntime
 from ._worker_runtime import WorkerAgentRuntime
 from ._worker_runtime_host import WorkerAgentRuntimeHost
 
-__all__ = ["SingleThreadedAgentRuntime", "WorkerAgentRuntime", "WorkerAgentRuntimeHost"]
+__all__ = [
+    "SingleThreadedAgentRuntime",
+    "WorkerAgentRuntime",
+    "WorkerAgentRuntimeHost",
+    "SubscriptionCacheStats",
+    "AgentPassivationPolicy",
+    "AgentStateStore",
+    "InMemoryAgentStateStore",
+    "MessageBatchingConfig",
+    "PayloadCompressionConfig",
+    "SharedMemoryConfig",
+    "ReconnectConfig",
+    "HostStateStore",
+    "InMemoryHostStateStore",
+    "SqliteHostStateStore",
+    "FileHostStateStore",
+    "StoredAgentState",
+    "AgentStateUpdate",
+    "ETagMismatchError",
+]
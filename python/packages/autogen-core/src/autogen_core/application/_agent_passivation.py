@@ -0,0 +1,220 @@
+import logging
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Mapping, Protocol, Set, runtime_checkable
+
+from ..base import Agent, AgentId
+
+logger = logging.getLogger("autogen_core")
+
+
+@runtime_checkable
+class AgentStateStore(Protocol):
+    """Stores the state of agents that were passivated by a runtime."""
+
+    async def save(self, agent_id: AgentId, state: Mapping[str, Any]) -> None:
+        """Save the state of an agent, replacing any previously saved state.
+
+        Args:
+            agent_id (AgentId): The agent the state belongs to.
+            state (Mapping[str, Any]): The state returned by the agent's ``save_state``.
+        """
+        ...
+
+    async def load(self, agent_id: AgentId) -> Mapping[str, Any] | None:
+        """Load the saved state of an agent.
+
+        Args:
+            agent_id (AgentId): The agent to load the state of.
+
+        Returns:
+            Mapping[str, Any] | None: The saved state, or None if there is no saved state for the agent.
+        """
+        ...
+
+
+class InMemoryAgentStateStore(AgentStateStore):
+    """An :class:`AgentStateStore` that keeps the saved states in a dictionary."""
+
+    def __init__(self) -> None:
+        self._states: Dict[AgentId, Mapping[str, Any]] = {}
+
+    async def save(self, agent_id: AgentId, state: Mapping[str, Any]) -> None:
+        self._states[agent_id] = state
+
+    async def load(self, agent_id: AgentId) -> Mapping[str, Any] | None:
+        return self._states.get(agent_id)
+
+
+@dataclass(kw_only=True)
+class AgentPassivationPolicy:
+    """Bounds the number of agent instances a runtime keeps alive.
+
+    When an agent instance is passivated, its ``save_state`` result is written to ``state_store`` and the
+    instance is released. The next message for the agent creates a new instance using the agent factory and
+    restores the saved state with ``load_state``. Agents that are handling a message are never passivated. The
+    ``save_state`` of a runtime includes the states of its passivated agents.
+
+    The limits are enforced when the runtime gets an agent instance, that is when it delivers a message or an agent
+    is looked up. Idle agents of a runtime that receives no messages are not passivated until it receives one.
+
+    Args:
+        max_live_agents (int, optional): The maximum number of live agent instances. The least recently used
+            agents are passivated first. Defaults to None, no limit.
+        idle_ttl (float, optional): The number of seconds an agent can stay unused before it is passivated.
+            Defaults to None, no limit.
+        state_store (AgentStateStore, optional): Where the state of passivated agents is kept. Defaults to
+            an :class:`InMemoryAgentStateStore`.
+    """
+
+    max_live_agents: int | None = None
+    idle_ttl: float | None = None
+    state_store: AgentStateStore = field(default_factory=InMemoryAgentStateStore)
+
+    def __post_init__(self) -> None:
+        if self.max_live_agents is not None and self.max_live_agents < 1:
+            raise ValueError("max_live_agents must be at least 1.")
+        if self.idle_ttl is not None and self.idle_ttl <= 0:
+            raise ValueError("idle_ttl must be positive.")
+
+
+class AgentInstanceCache:
+    """The live agent instances of a runtime, passivated according to an optional :class:`AgentPassivationPolicy`."""
+
+    def __init__(self, passivation_policy: AgentPassivationPolicy | None = None) -> None:
+        self._policy = passivation_policy
+        # Agent instances ordered from least to most recently used, with their last use time.
+        self._agents: OrderedDict[AgentId, Agent] = OrderedDict()
+        self._last_used: Dict[AgentId, float] = {}
+        self._in_use: Dict[AgentId, int] = {}
+        # States of passivated agents that are still being written to the state store.
+        self._saving: Dict[AgentId, Mapping[str, Any]] = {}
+        # Agents passivated and not activated again since.
+        self._passivated: Set[AgentId] = set()
+
+    def __contains__(self, agent_id: AgentId) -> bool:
+        return agent_id in self._agents
+
+    def __iter__(self) -> Iterator[AgentId]:
+        return iter(self._agents)
+
+    def __len__(self) -> int:
+        return len(self._agents)
+
+    def known_agents(self) -> List[AgentId]:
+        """The live and passivated agents."""
+        return [*self._agents, *(agent_id for agent_id in self._passivated if agent_id not in self._agents)]
+
+    async def saved_state(self, agent_id: AgentId) -> Mapping[str, Any] | None:
+        """The state of a live agent, or the saved state of a passivated one, without activating it.
+
+        Returns:
+            Mapping[str, Any] | None: The state, or None if the agent is neither live nor passivated.
+        """
+        agent = self._agents.get(agent_id)
+        if agent is not None:
+            return agent.save_state()
+        if self._policy is None or agent_id not in self._passivated:
+            return None
+        state = self._saving.get(agent_id)
+        if state is None:
+            state = await self._policy.state_store.load(agent_id)
+        return state
+
+    def get(self, agent_id: AgentId) -> Agent | None:
+        agent = self._agents.get(agent_id)
+        if agent is not None and self._policy is not None:
+            self._touch(agent_id)
+        return agent
+
+    async def activate(self, agent_id: AgentId, agent: Agent) -> None:
+        """Add a newly created agent instance, restoring its state if it was passivated before."""
+        self._agents[agent_id] = agent
+        if self._policy is None:
+            return
+        self._touch(agent_id)
+        self._passivated.discard(agent_id)
+        # Loading the state yields, the agent must not be passivated by another delivery meanwhile.
+        with self.in_use(agent_id):
+            state = self._saving.get(agent_id)
+            if state is None:
+                state = await self._policy.state_store.load(agent_id)
+            if state is not None:
+                agent.load_state(state)
+
+    @contextmanager
+    def in_use(self, agent_id: AgentId) -> Iterator[None]:
+        """Prevent an agent from being passivated while it handles a message."""
+        if self._policy is None:
+            yield
+            return
+        self._in_use[agent_id] = self._in_use.get(agent_id, 0) + 1
+        try:
+            yield
+        finally:
+            count = self._in_use.pop(agent_id) - 1
+            if count > 0:
+                self._in_use[agent_id] = count
+            if agent_id in self._agents:
+                self._touch(agent_id)
+
+    async def passivate(self, keep: AgentId | None = None) -> None:
+        """Passivate the agents that exceed the policy's limits, except ``keep``."""
+        if self._policy is None:
+            return
+        if keep is None or keep not in self._agents:
+            await self._passivate_over_limits(keep)
+            return
+        # Saving states yields, so other deliveries passivating agents meanwhile must keep it too.
+        with self.in_use(keep):
+            await self._passivate_over_limits(keep)
+
+    async def _passivate_over_limits(self, keep: AgentId | None) -> None:
+        assert self._policy is not None
+        if self._policy.idle_ttl is not None:
+            deadline = time.monotonic() - self._policy.idle_ttl
+            expired: List[AgentId] = []
+            # Agents are ordered by last use, so the scan stops at the first agent that is not idle for too long.
+            for agent_id in self._agents:
+                if self._last_used[agent_id] >= deadline:
+                    break
+                if agent_id not in self._in_use and agent_id != keep:
+                    expired.append(agent_id)
+            for agent_id in expired:
+                # Passivating the previous agents yielded, the agent may have been used or passivated since.
+                if (
+                    agent_id in self._agents
+                    and agent_id not in self._in_use
+                    and agent_id != keep
+                    and self._last_used[agent_id] < deadline
+                ):
+                    await self._passivate_agent(agent_id)
+        if self._policy.max_live_agents is not None:
+            while len(self._agents) > self._policy.max_live_agents:
+                candidate: AgentId | None = next(
+                    (agent_id for agent_id in self._agents if agent_id not in self._in_use and agent_id != keep), None
+                )
+                if candidate is None:
+                    # Every other agent is busy, allow the limit to be exceeded for now.
+                    break
+                await self._passivate_agent(candidate)
+
+    def _touch(self, agent_id: AgentId) -> None:
+        self._agents.move_to_end(agent_id)
+        self._last_used[agent_id] = time.monotonic()
+
+    async def _passivate_agent(self, agent_id: AgentId) -> None:
+        assert self._policy is not None
+        agent = self._agents.pop(agent_id)
+        del self._last_used[agent_id]
+        logger.info(f"Passivating agent {agent_id}")
+        state = agent.save_state()
+        self._saving[agent_id] = state
+        self._passivated.add(agent_id)
+        try:
+            await self._policy.state_store.save(agent_id, state)
+        finally:
+            if self._saving.get(agent_id) is state:
+                del self._saving[agent_id]
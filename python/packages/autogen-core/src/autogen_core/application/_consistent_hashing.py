@@ -0,0 +1,72 @@
+import hashlib
+from bisect import bisect
+from typing import ClassVar, Dict, List
+
+
+def _hash(value: str) -> int:
+    # A stable hash, unlike hash(), which is salted per process.
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class ConsistentHashRing:
+    """Assigns keys to nodes so that adding or removing a node only moves the keys of that node.
+
+    Each node is placed on the ring at ``virtual_nodes`` points, and a key is assigned to the node owning
+    the first point at or after the hash of the key. Keys assigned to the remaining nodes stay where they are
+    when a node joins or leaves.
+
+    Args:
+        virtual_nodes (int, optional): The number of points each node is placed at, more points spread the keys
+            more evenly. Defaults to 100.
+    """
+
+    DEFAULT_VIRTUAL_NODES: ClassVar[int] = 100
+
+    def __init__(self, virtual_nodes: int = DEFAULT_VIRTUAL_NODES) -> None:
+        if virtual_nodes < 1:
+            raise ValueError("virtual_nodes must be at least 1.")
+        self._virtual_nodes = virtual_nodes
+        self._nodes: List[int] = []
+        self._points: List[int] = []
+        self._owners: List[int] = []
+
+    @property
+    def nodes(self) -> List[int]:
+        """The nodes on the ring, in the order they were added."""
+        return list(self._nodes)
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, node: int) -> bool:
+        return node in self._nodes
+
+    def add(self, node: int) -> None:
+        if node in self._nodes:
+            raise ValueError(f"Node {node} is already on the ring.")
+        self._nodes.append(node)
+        self._rebuild()
+
+    def remove(self, node: int) -> None:
+        if node not in self._nodes:
+            raise ValueError(f"Node {node} is not on the ring.")
+        self._nodes.remove(node)
+        self._rebuild()
+
+    def get(self, key: str) -> int | None:
+        """Returns the node a key is assigned to, or None if the ring is empty."""
+        if not self._nodes:
+            return None
+        if len(self._nodes) == 1:
+            return self._nodes[0]
+        index = bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[index]
+
+    def _rebuild(self) -> None:
+        ring: Dict[int, int] = {}
+        for node in self._nodes:
+            for replica in range(self._virtual_nodes):
+                # On the unlikely collision of two points, the first node keeps it.
+                ring.setdefault(_hash(f"{node}-{replica}"), node)
+        self._points = sorted(ring)
+        self._owners = [ring[point] for point in self._points]
@@ -0,0 +1,64 @@
+from typing import AbstractSet, FrozenSet, Iterable, Sequence, Tuple
+
+from ..base import JSON_DATA_CONTENT_TYPE
+
+CONTENT_TYPES_METADATA_KEY = "agent-content-types"
+"""The gRPC metadata key a peer sends when opening a channel to advertise the payload content types it accepts."""
+
+CONTENT_ENCODINGS_METADATA_KEY = "agent-content-encodings"
+"""The gRPC metadata key a peer sends when opening a channel to advertise the payload content encodings, that is
+the compression algorithms, it accepts."""
+
+DEFAULT_CONTENT_TYPES: FrozenSet[str] = frozenset([JSON_DATA_CONTENT_TYPE])
+"""The content types accepted by peers that do not advertise any."""
+
+
+def content_types_metadata(content_types: Iterable[str]) -> Sequence[Tuple[str, str]]:
+    """Returns the channel metadata advertising the content types a peer accepts."""
+    return ((CONTENT_TYPES_METADATA_KEY, ",".join(content_types)),)
+
+
+def content_encodings_metadata(content_encodings: Iterable[str]) -> Sequence[Tuple[str, str]]:
+    """Returns the channel metadata advertising the content encodings a peer accepts."""
+    return ((CONTENT_ENCODINGS_METADATA_KEY, ",".join(content_encodings)),)
+
+
+def _get_values(metadata: Iterable[Tuple[str, str | bytes]] | None, metadata_key: str) -> FrozenSet[str] | None:
+    if metadata is None:
+        return None
+    for key, value in metadata:
+        if key == metadata_key:
+            if isinstance(value, bytes):
+                value = value.decode("utf-8")
+            return frozenset(filter(None, value.split(",")))
+    return None
+
+
+def get_content_types(metadata: Iterable[Tuple[str, str | bytes]] | None) -> FrozenSet[str] | None:
+    """Returns the content types advertised in the metadata received from a peer, or None if it advertised none."""
+    content_types = _get_values(metadata, CONTENT_TYPES_METADATA_KEY)
+    if content_types is None:
+        return None
+    return DEFAULT_CONTENT_TYPES | content_types
+
+
+def get_content_encodings(metadata: Iterable[Tuple[str, str | bytes]] | None) -> FrozenSet[str]:
+    """Returns the content encodings advertised in the metadata received from a peer."""
+    return _get_values(metadata, CONTENT_ENCODINGS_METADATA_KEY) or frozenset()
+
+
+def common_content_types(accepted: Iterable[AbstractSet[str]]) -> FrozenSet[str]:
+    """Returns the content types accepted by all peers, JSON is always accepted."""
+    return DEFAULT_CONTENT_TYPES | _intersection(accepted)
+
+
+def common_content_encodings(accepted: Iterable[AbstractSet[str]]) -> FrozenSet[str]:
+    """Returns the content encodings accepted by all peers."""
+    return _intersection(accepted)
+
+
+def _intersection(sets: Iterable[AbstractSet[str]]) -> FrozenSet[str]:
+    common: FrozenSet[str] | None = None
+    for values in sets:
+        common = frozenset(values) if common is None else common & values
+    return common or frozenset()
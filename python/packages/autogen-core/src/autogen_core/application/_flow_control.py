@@ -0,0 +1,242 @@
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Iterable, Literal, Sequence, Tuple
+
+from ._message_batching import OutgoingMessage, message_kind
+from ._reconnect import ReplayBuffer, is_replayable
+from .protos import agent_worker_pb2
+
+logger = logging.getLogger("autogen_core")
+
+FLOW_CONTROL_METADATA_KEY = "agent-flow-control"
+"""The gRPC metadata key a peer sends when opening a channel to advertise that it grants send credits."""
+
+SendQueueOverflowPolicy = Literal["block", "drop_oldest", "disconnect"]
+"""What the host does when a message is delivered to a client whose send queue is full:
+
+- ``"block"``: the delivery waits until the queue has room.
+- ``"drop_oldest"``: the oldest queued request or event is dropped to make room. The sender of a dropped request
+  receives an error response.
+- ``"disconnect"``: the client is disconnected with ``RESOURCE_EXHAUSTED``.
+"""
+
+
+def flow_control_metadata() -> Sequence[Tuple[str, str]]:
+    """Returns the channel metadata advertising credit-based flow control."""
+    return ((FLOW_CONTROL_METADATA_KEY, "1"),)
+
+
+def supports_flow_control(metadata: Iterable[Tuple[str, str | bytes]] | None) -> bool:
+    """Whether the metadata received from a peer advertises credit-based flow control."""
+    if metadata is None:
+        return False
+    return any(key == FLOW_CONTROL_METADATA_KEY for key, _ in metadata)
+
+
+def is_flow_controlled(message: OutgoingMessage) -> bool:
+    """Whether sending the message uses a credit. Responses and control messages are always sent, since
+    holding them back could keep the receiver from finishing the work that frees up credits."""
+    return message_kind(message) in ("request", "event")
+
+
+class SendQueueClosedError(Exception):
+    """Raised when getting a message from a :class:`SendQueue` that was closed."""
+
+
+@dataclass(frozen=True)
+class SendQueueStats:
+    """Statistics of the send queue of a client connected to the host.
+
+    Args:
+        depth (int): The number of messages waiting to be sent.
+        capacity (int | None): The maximum number of queued requests and events, or None if unbounded.
+        dropped (int): The number of messages dropped because the queue was full.
+        credits (int | None): The number of requests and events the client accepts before granting more
+            credits, or None if the client does not use flow control.
+    """
+
+    depth: int
+    capacity: int | None
+    dropped: int
+    credits: int | None
+
+
+class SendQueue:
+    """A queue of messages to send to a client, bounded by a capacity and gated by the credits the client granted.
+
+    Requests and events count against the capacity and use one credit each when sent. Responses and control
+    messages are not limited and are sent ahead of queued requests and events.
+
+    ``on_drop`` is called with every request or event dropped because the queue was full or closed.
+
+    With a ``replay_buffer``, the messages taken from the queue are recorded in it, so that the ones a reconnecting
+    client did not receive are sent again with :meth:`resend_unreceived`.
+    """
+
+    def __init__(
+        self,
+        maxsize: int | None = None,
+        overflow_policy: SendQueueOverflowPolicy = "block",
+        *,
+        on_drop: Callable[[OutgoingMessage], None] | None = None,
+        replay_buffer: ReplayBuffer[OutgoingMessage] | None = None,
+    ) -> None:
+        self._maxsize = maxsize
+        self._overflow_policy = overflow_policy
+        self._on_drop = on_drop
+        self._replay_buffer = replay_buffer
+        self._resend: Deque[OutgoingMessage] = deque()
+        self._control: Deque[OutgoingMessage] = deque()
+        self._data: Deque[OutgoingMessage] = deque()
+        self._credits: int | None = None
+        self._dropped = 0
+        self._closed = False
+        self._overflowed = False
+        self._readable = asyncio.Event()
+        self._writable = asyncio.Event()
+        self._writable.set()
+
+    @property
+    def overflowed(self) -> bool:
+        """Whether the queue was closed because it overflowed with the ``"disconnect"`` policy."""
+        return self._overflowed
+
+    @property
+    def stats(self) -> SendQueueStats:
+        return SendQueueStats(
+            depth=len(self._resend) + len(self._control) + len(self._data),
+            capacity=self._maxsize,
+            dropped=self._dropped,
+            credits=self._credits,
+        )
+
+    def enable_flow_control(self) -> None:
+        """Hold back requests and events until the client grants credits. The credits start over from none when a
+        client reconnects, as it grants its window again."""
+        self._credits = 0
+
+    def grant(self, credits: int) -> None:
+        """Add credits granted by the client."""
+        self._credits = (self._credits or 0) + credits
+        self._notify()
+
+    def resend_unreceived(self, received: int) -> None:
+        """Send the messages taken from the queue that the client did not receive again, ahead of the others.
+
+        Args:
+            received (int): The number of messages of the session the client received, except flow control credits.
+        """
+        if self._replay_buffer is None:
+            raise RuntimeError("The send queue has no replay buffer.")
+        # They are not recorded again, and do not use credits since they used some on the broken channel.
+        self._resend = deque(self._replay_buffer.unreceived(received))
+        self._notify()
+
+    async def put(self, message: OutgoingMessage) -> None:
+        if self._closed:
+            logger.warning("Send queue is closed, dropping message.")
+            self._drop(message)
+            return
+        if not is_flow_controlled(message):
+            self._control.append(message)
+            self._notify()
+            return
+        if self._maxsize is not None and len(self._data) >= self._maxsize:
+            match self._overflow_policy:
+                case "block":
+                    while len(self._data) >= self._maxsize and not self._closed:
+                        self._writable.clear()
+                        await self._writable.wait()
+                    if self._closed:
+                        logger.warning("Send queue is closed, dropping message.")
+                        self._drop(message)
+                        return
+                case "drop_oldest":
+                    self._dropped += 1
+                    self._drop(self._data.popleft())
+                case "disconnect":
+                    self._dropped += 1
+                    self._overflowed = True
+                    self.close()
+                    self._drop(message)
+                    return
+        self._data.append(message)
+        self._notify()
+
+    def empty(self) -> bool:
+        """Whether there is no message that can be sent right now."""
+        return not self._resend and not self._control and (not self._data or self._credits == 0)
+
+    def get_nowait(self) -> OutgoingMessage:
+        if self._resend:
+            return self._resend.popleft()
+        if self._control:
+            message = self._control.popleft()
+        elif self._data and self._credits != 0:
+            if self._credits is not None:
+                self._credits -= 1
+            message = self._data.popleft()
+            self._writable.set()
+        else:
+            raise asyncio.QueueEmpty()
+        if self._replay_buffer is not None and is_replayable(message):
+            self._replay_buffer.append(message)
+        return message
+
+    async def get(self) -> OutgoingMessage:
+        while self.empty():
+            if self._closed:
+                raise SendQueueClosedError()
+            self._readable.clear()
+            await self._readable.wait()
+        return self.get_nowait()
+
+    def close(self) -> None:
+        """Close the queue, waking up the tasks waiting to put or get messages."""
+        self._closed = True
+        self._readable.set()
+        self._writable.set()
+
+    def _notify(self) -> None:
+        if not self.empty():
+            self._readable.set()
+
+    def _drop(self, message: OutgoingMessage) -> None:
+        if self._on_drop is not None and is_flow_controlled(message):
+            self._on_drop(message)
+
+
+class CreditGrantor:
+    """Grants the host credits for requests and events as the worker finishes processing them.
+
+    The host is granted ``window`` credits when the channel opens. Credits are granted back in chunks of
+    half the window, so at most ``window`` requests and events are in flight to the worker at a time.
+    """
+
+    def __init__(self, window: int, send_queue: asyncio.Queue[agent_worker_pb2.Message]) -> None:
+        if window < 1:
+            raise ValueError("The flow control window must be at least 1.")
+        self._window = window
+        self._send_queue = send_queue
+        self._enabled = False
+        self._released = 0
+
+    def start(self) -> None:
+        """Grant the initial window once the host acknowledged flow control, again on every new channel."""
+        self._enabled = True
+        self._released = 0
+        self._grant(self._window)
+
+    def release(self) -> None:
+        """Release the credit used by a request or event that was processed."""
+        if not self._enabled:
+            return
+        self._released += 1
+        if self._released >= max(1, self._window // 2):
+            self._grant(self._released)
+            self._released = 0
+
+    def _grant(self, credits: int) -> None:
+        self._send_queue.put_nowait(agent_worker_pb2.Message(flowControl=agent_worker_pb2.FlowControl(credits=credits)))
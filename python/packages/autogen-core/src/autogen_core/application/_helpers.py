@@ -1,11 +1,14 @@
-from collections import defaultdict
-from typing import Awaitable, Callable, DefaultDict, List, Set
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from itertools import chain
+from typing import Awaitable, Callable, ClassVar, DefaultDict, Dict, Iterable, List, Set
 
 from ..base._agent import Agent
 from ..base._agent_id import AgentId
 from ..base._agent_type import AgentType
 from ..base._subscription import Subscription
 from ..base._topic import TopicId
+from ..components import TypeSubscription
 
 
 async def get_impl(
@@ -29,46 +32,139 @@ async def get_impl(
     return id
 
 
+@dataclass(frozen=True)
+class SubscriptionCacheStats:
+    """A snapshot of the statistics of the cache of subscribed recipients per topic, returned by the
+    ``subscription_cache_stats`` property of the runtimes and the host."""
+
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    capacity: int
+
+
 class SubscriptionManager:
-    def __init__(self) -> None:
+    """Resolves the recipients of a topic from the registered subscriptions.
+
+    :class:`~autogen_core.components.TypeSubscription` (and therefore
+    :class:`~autogen_core.components.DefaultSubscription`) instances are indexed by topic type, so
+    resolving a topic only looks at the subscriptions for its type. Other subscriptions are matched
+    against every topic. Resolved recipients are kept in a least recently used cache of at most
+    ``max_cached_topics`` topics, and adding or removing a subscription only invalidates the cached
+    topics it matches. Cache hits, misses and evictions are reported by :attr:`cache_stats`.
+
+    Args:
+        max_cached_topics (int, optional): The maximum number of topics whose recipients are cached. Defaults to 10000.
+    """
+
+    DEFAULT_MAX_CACHED_TOPICS: ClassVar[int] = 10000
+
+    def __init__(self, max_cached_topics: int = DEFAULT_MAX_CACHED_TOPICS) -> None:
+        if max_cached_topics < 1:
+            raise ValueError("max_cached_topics must be at least 1.")
+        self._max_cached_topics = max_cached_topics
         self._subscriptions: List[Subscription] = []
-        self._seen_topics: Set[TopicId] = set()
-        self._subscribed_recipients: DefaultDict[TopicId, List[AgentId]] = defaultdict(list)
+        self._subscriptions_by_id: Dict[str, Subscription] = {}
+        # topic type -> type subscriptions for that topic type
+        self._type_subscriptions: DefaultDict[str, List[TypeSubscription]] = defaultdict(list)
+        # Subscriptions that are not indexed and are checked against every topic.
+        self._other_subscriptions: List[Subscription] = []
+        # Resolved recipients, ordered from least to most recently used.
+        self._subscribed_recipients: OrderedDict[TopicId, List[AgentId]] = OrderedDict()
+        # topic type -> cached topics of that type
+        self._seen_topics: DefaultDict[str, Set[TopicId]] = defaultdict(set)
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._cache_evictions = 0
+
+    @property
+    def cache_stats(self) -> SubscriptionCacheStats:
+        return SubscriptionCacheStats(
+            hits=self._cache_hits,
+            misses=self._cache_misses,
+            evictions=self._cache_evictions,
+            size=len(self._subscribed_recipients),
+            capacity=self._max_cached_topics,
+        )
 
     async def add_subscription(self, subscription: Subscription) -> None:
         # Check if the subscription already exists
-        if any(sub == subscription for sub in self._subscriptions):
+        if isinstance(subscription, TypeSubscription):
+            candidates: Iterable[Subscription] = chain(
+                self._type_subscriptions.get(subscription.topic_type, []), self._other_subscriptions
+            )
+            if subscription.id in self._subscriptions_by_id or any(sub == subscription for sub in candidates):
+                raise ValueError("Subscription already exists")
+        elif any(sub == subscription for sub in self._subscriptions):
             raise ValueError("Subscription already exists")
 
         self._subscriptions.append(subscription)
-        self._rebuild_subscriptions(self._seen_topics)
+        self._subscriptions_by_id[subscription.id] = subscription
+        if isinstance(subscription, TypeSubscription):
+            self._type_subscriptions[subscription.topic_type].append(subscription)
+        else:
+            self._other_subscriptions.append(subscription)
+        self._invalidate_topics(subscription)
 
     async def remove_subscription(self, id: str) -> None:
         # Check if the subscription exists
-        if not any(sub.id == id for sub in self._subscriptions):
+        subscription = self._subscriptions_by_id.pop(id, None)
+        if subscription is None:
             raise ValueError("Subscription does not exist")
 
         def is_not_sub(x: Subscription) -> bool:
             return x.id != id
 
         self._subscriptions = list(filter(is_not_sub, self._subscriptions))
-
-        # Rebuild the subscriptions
-        self._rebuild_subscriptions(self._seen_topics)
+        if isinstance(subscription, TypeSubscription):
+            remaining = list(filter(is_not_sub, self._type_subscriptions[subscription.topic_type]))
+            if remaining:
+                self._type_subscriptions[subscription.topic_type] = remaining
+            else:
+                del self._type_subscriptions[subscription.topic_type]
+        else:
+            self._other_subscriptions = list(filter(is_not_sub, self._other_subscriptions))
+        self._invalidate_topics(subscription)
 
     async def get_subscribed_recipients(self, topic: TopicId) -> List[AgentId]:
-        if topic not in self._seen_topics:
-            self._build_for_new_topic(topic)
-        return self._subscribed_recipients[topic]
-
-    # TODO: optimize this...
-    def _rebuild_subscriptions(self, topics: Set[TopicId]) -> None:
-        self._subscribed_recipients.clear()
-        for topic in topics:
-            self._build_for_new_topic(topic)
-
-    def _build_for_new_topic(self, topic: TopicId) -> None:
-        self._seen_topics.add(topic)
-        for subscription in self._subscriptions:
+        recipients = self._subscribed_recipients.get(topic)
+        if recipients is not None:
+            self._cache_hits += 1
+            self._subscribed_recipients.move_to_end(topic)
+            return recipients
+
+        self._cache_misses += 1
+        recipients = self._resolve_recipients(topic)
+        self._subscribed_recipients[topic] = recipients
+        self._seen_topics[topic.type].add(topic)
+        if len(self._subscribed_recipients) > self._max_cached_topics:
+            evicted, _ = self._subscribed_recipients.popitem(last=False)
+            self._forget_topic(evicted)
+            self._cache_evictions += 1
+        return recipients
+
+    def _resolve_recipients(self, topic: TopicId) -> List[AgentId]:
+        recipients: List[AgentId] = [
+            subscription.map_to_agent(topic) for subscription in self._type_subscriptions.get(topic.type, [])
+        ]
+        for subscription in self._other_subscriptions:
             if subscription.is_match(topic):
-                self._subscribed_recipients[topic].append(subscription.map_to_agent(topic))
+                recipients.append(subscription.map_to_agent(topic))
+        return recipients
+
+    def _invalidate_topics(self, subscription: Subscription) -> None:
+        # Only cached topics the subscription matches are affected, they are resolved again on next use.
+        if isinstance(subscription, TypeSubscription):
+            affected = list(self._seen_topics.get(subscription.topic_type, []))
+        else:
+            affected = [topic for topic in self._subscribed_recipients if subscription.is_match(topic)]
+        for topic in affected:
+            del self._subscribed_recipients[topic]
+            self._forget_topic(topic)
+
+    def _forget_topic(self, topic: TopicId) -> None:
+        topics = self._seen_topics[topic.type]
+        topics.discard(topic)
+        if not topics:
+            del self._seen_topics[topic.type]
@@ -0,0 +1,323 @@
+import asyncio
+import io
+import os
+import sqlite3
+import struct
+import threading
+import zlib
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Protocol, Sequence, Tuple, runtime_checkable
+
+from ..base import AgentId
+
+
+class ETagMismatchError(Exception):
+    """Raised when states are saved with an eTag that does not match the eTag of the saved state.
+
+    Args:
+        agent_ids (Sequence[AgentId]): The agents whose eTag did not match.
+    """
+
+    def __init__(self, agent_ids: Sequence[AgentId]) -> None:
+        super().__init__(f"The eTag of the state of {', '.join(map(str, agent_ids))} does not match.")
+        self.agent_ids = list(agent_ids)
+
+
+@dataclass(frozen=True)
+class StoredAgentState:
+    """A state saved in a :class:`HostStateStore`.
+
+    Args:
+        data (bytes): The serialized state.
+        etag (str): Changes every time the state is saved.
+    """
+
+    data: bytes
+    etag: str
+
+
+@dataclass(frozen=True)
+class AgentStateUpdate:
+    """A state to save in a :class:`HostStateStore`.
+
+    Args:
+        agent_id (AgentId): The agent the state belongs to.
+        data (bytes): The serialized state.
+        etag (str, optional): The eTag of the state the update was made from. The update is only saved if it matches
+            the eTag of the saved state. Defaults to an empty string, saving the update unconditionally.
+    """
+
+    agent_id: AgentId
+    data: bytes
+    etag: str = ""
+
+
+@runtime_checkable
+class HostStateStore(Protocol):
+    """Stores the states of agents saved through :class:`WorkerAgentRuntimeHost`, with optimistic concurrency."""
+
+    async def get(self, agent_ids: Sequence[AgentId]) -> List[StoredAgentState | None]:
+        """Get the saved states of agents.
+
+        Args:
+            agent_ids (Sequence[AgentId]): The agents to get the states of.
+
+        Returns:
+            List[StoredAgentState | None]: The state of each agent, or None if it has no saved state.
+        """
+        ...
+
+    async def save(self, updates: Sequence[AgentStateUpdate]) -> List[str]:
+        """Save the states of agents, all or none of them.
+
+        Args:
+            updates (Sequence[AgentStateUpdate]): The states to save, at most one per agent.
+
+        Returns:
+            List[str]: The new eTag of each state.
+
+        Raises:
+            ETagMismatchError: If the eTag of an update does not match the eTag of the saved state.
+        """
+        ...
+
+
+def _next_versions(updates: Sequence[AgentStateUpdate], get_version: Callable[[AgentId], int]) -> List[int]:
+    # The eTag of a state is its version, which starts at 1. Version 0 means there is no saved state.
+    if len({update.agent_id for update in updates}) != len(updates):
+        raise ValueError("The state of an agent can only be saved once per call.")
+    versions = [get_version(update.agent_id) for update in updates]
+    mismatched = [
+        update.agent_id
+        for update, version in zip(updates, versions, strict=True)
+        if update.etag and (version == 0 or update.etag != str(version))
+    ]
+    if mismatched:
+        raise ETagMismatchError(mismatched)
+    return [version + 1 for version in versions]
+
+
+class InMemoryHostStateStore(HostStateStore):
+    """A :class:`HostStateStore` that keeps the states in a dictionary, they are lost when the host stops."""
+
+    def __init__(self) -> None:
+        self._states: Dict[AgentId, Tuple[bytes, int]] = {}
+
+    async def get(self, agent_ids: Sequence[AgentId]) -> List[StoredAgentState | None]:
+        states: List[StoredAgentState | None] = []
+        for agent_id in agent_ids:
+            state = self._states.get(agent_id)
+            states.append(None if state is None else StoredAgentState(state[0], str(state[1])))
+        return states
+
+    async def save(self, updates: Sequence[AgentStateUpdate]) -> List[str]:
+        versions = _next_versions(updates, lambda agent_id: self._states.get(agent_id, (b"", 0))[1])
+        for update, version in zip(updates, versions, strict=True):
+            self._states[update.agent_id] = (update.data, version)
+        return [str(version) for version in versions]
+
+
+class SqliteHostStateStore(HostStateStore):
+    """A :class:`HostStateStore` that keeps the states in a SQLite database.
+
+    Each call runs in one transaction on a worker thread, so that the event loop is not blocked on disk writes.
+
+    Args:
+        path (str | os.PathLike[str]): The path of the database file, created if it does not exist.
+    """
+
+    # Stays below the limit on the number of parameters of a statement of older SQLite versions.
+    _MAX_PARAMETERS = 500
+
+    def __init__(self, path: str | os.PathLike[str]) -> None:
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS agent_states (agent_id TEXT PRIMARY KEY, data BLOB NOT NULL, version INTEGER NOT NULL)"
+        )
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            self._connection.close()
+
+    async def get(self, agent_ids: Sequence[AgentId]) -> List[StoredAgentState | None]:
+        return await asyncio.to_thread(self._get, agent_ids)
+
+    async def save(self, updates: Sequence[AgentStateUpdate]) -> List[str]:
+        return await asyncio.to_thread(self._save, updates)
+
+    def _select(self, agent_ids: Sequence[AgentId]) -> Dict[str, Tuple[bytes, int]]:
+        rows: Dict[str, Tuple[bytes, int]] = {}
+        keys = [str(agent_id) for agent_id in agent_ids]
+        for start in range(0, len(keys), self._MAX_PARAMETERS):
+            chunk = keys[start : start + self._MAX_PARAMETERS]
+            cursor = self._connection.execute(
+                f"SELECT agent_id, data, version FROM agent_states WHERE agent_id IN ({', '.join('?' * len(chunk))})",
+                chunk,
+            )
+            for key, data, version in cursor:
+                rows[key] = (data, version)
+        return rows
+
+    def _get(self, agent_ids: Sequence[AgentId]) -> List[StoredAgentState | None]:
+        with self._lock:
+            rows = self._select(agent_ids)
+        states: List[StoredAgentState | None] = []
+        for agent_id in agent_ids:
+            row = rows.get(str(agent_id))
+            states.append(None if row is None else StoredAgentState(row[0], str(row[1])))
+        return states
+
+    def _save(self, updates: Sequence[AgentStateUpdate]) -> List[str]:
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._select([update.agent_id for update in updates])
+                versions = _next_versions(updates, lambda agent_id: rows.get(str(agent_id), (b"", 0))[1])
+                self._connection.executemany(
+                    "INSERT INTO agent_states (agent_id, data, version) VALUES (?, ?, ?) "
+                    "ON CONFLICT (agent_id) DO UPDATE SET data = excluded.data, version = excluded.version",
+                    [
+                        (str(update.agent_id), update.data, version)
+                        for update, version in zip(updates, versions, strict=True)
+                    ],
+                )
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+        return [str(version) for version in versions]
+
+
+class FileHostStateStore(HostStateStore):
+    """A :class:`HostStateStore` that appends the saved states to a log file, and keeps the latest states in memory.
+
+    Each call to :meth:`save` appends one checksummed frame, so a batch of states is saved with one write, and a
+    frame torn by a crash is discarded when the log is opened again. A frame that failed to be written is removed
+    before the error is raised. Use :meth:`compact` to drop the states that were saved again since.
+
+    Args:
+        path (str | os.PathLike[str]): The path of the log file, created if it does not exist.
+        fsync (bool, optional): Whether to wait for the frames to reach the disk before returning from
+            :meth:`save`. Defaults to True.
+    """
+
+    # Frame: payload length and CRC32 of the payload. Record: key length, key, version, data length, data.
+    _FRAME_HEADER = struct.Struct("<II")
+    _RECORD_HEADER = struct.Struct("<H")
+    _RECORD_VERSION = struct.Struct("<QI")
+
+    def __init__(self, path: str | os.PathLike[str], fsync: bool = True) -> None:
+        self._path = os.fspath(path)
+        self._fsync = fsync
+        self._states: Dict[AgentId, Tuple[bytes, int]] = {}
+        self._lock = threading.Lock()
+        self._file = self._open()
+
+    def close(self) -> None:
+        """Close the log file."""
+        with self._lock:
+            self._file.close()
+
+    async def get(self, agent_ids: Sequence[AgentId]) -> List[StoredAgentState | None]:
+        # Waits for a save in progress on a worker thread, so that a batch is never seen half saved.
+        return await asyncio.to_thread(self._get, agent_ids)
+
+    async def save(self, updates: Sequence[AgentStateUpdate]) -> List[str]:
+        return await asyncio.to_thread(self._save, updates)
+
+    async def compact(self) -> None:
+        """Rewrite the log with only the latest state of each agent."""
+        await asyncio.to_thread(self._compact)
+
+    def _open(self) -> io.BufferedWriter:
+        valid_length = 0
+        if os.path.exists(self._path):
+            with open(self._path, "rb") as log_file:
+                log = log_file.read()
+            while len(log) - valid_length >= self._FRAME_HEADER.size:
+                length, checksum = self._FRAME_HEADER.unpack_from(log, valid_length)
+                start = valid_length + self._FRAME_HEADER.size
+                payload = log[start : start + length]
+                if len(payload) < length or zlib.crc32(payload) != checksum:
+                    if start + length < len(log):
+                        # Only the last frame can be torn, dropping the frames after this one would lose them.
+                        raise ValueError(f"The state log {self._path} has an invalid frame at offset {valid_length}.")
+                    break
+                for agent_id, data, version in self._decode_records(payload):
+                    self._states[agent_id] = (data, version)
+                valid_length = start + length
+        f = open(self._path, "ab")
+        # Drop a frame torn by a crash, so that the next frames are appended after the last complete one.
+        f.truncate(valid_length)
+        return f
+
+    def _get(self, agent_ids: Sequence[AgentId]) -> List[StoredAgentState | None]:
+        states: List[StoredAgentState | None] = []
+        with self._lock:
+            for agent_id in agent_ids:
+                state = self._states.get(agent_id)
+                states.append(None if state is None else StoredAgentState(state[0], str(state[1])))
+        return states
+
+    def _save(self, updates: Sequence[AgentStateUpdate]) -> List[str]:
+        with self._lock:
+            versions = _next_versions(updates, lambda agent_id: self._states.get(agent_id, (b"", 0))[1])
+            records = [
+                (update.agent_id, update.data, version) for update, version in zip(updates, versions, strict=True)
+            ]
+            length = os.fstat(self._file.fileno()).st_size
+            try:
+                self._write_frame(self._file, records)
+            except BaseException:
+                # Remove what was written of the frame, so that the next frames are not appended after it.
+                self._truncate(length)
+                raise
+            for agent_id, data, version in records:
+                self._states[agent_id] = (data, version)
+        return [str(version) for version in versions]
+
+    def _truncate(self, length: int) -> None:
+        try:
+            self._file.close()
+        except OSError:
+            # The rest of the frame could not be written either, it is dropped with the file buffer.
+            pass
+        os.truncate(self._path, length)
+        self._file = open(self._path, "ab")
+
+    def _compact(self) -> None:
+        with self._lock:
+            compacted_path = f"{self._path}.compact"
+            with open(compacted_path, "wb") as f:
+                self._write_frame(f, [(agent_id, data, version) for agent_id, (data, version) in self._states.items()])
+            self._file.close()
+            os.replace(compacted_path, self._path)
+            self._file = open(self._path, "ab")
+
+    def _write_frame(self, f: io.BufferedWriter, records: Sequence[Tuple[AgentId, bytes, int]]) -> None:
+        parts: List[bytes] = []
+        for agent_id, data, version in records:
+            key = str(agent_id).encode("utf-8")
+            parts += [self._RECORD_HEADER.pack(len(key)), key, self._RECORD_VERSION.pack(version, len(data)), data]
+        payload = b"".join(parts)
+        f.write(self._FRAME_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+        f.flush()
+        if self._fsync:
+            os.fsync(f.fileno())
+
+    def _decode_records(self, payload: bytes) -> List[Tuple[AgentId, bytes, int]]:
+        records: List[Tuple[AgentId, bytes, int]] = []
+        offset = 0
+        while offset < len(payload):
+            (key_length,) = self._RECORD_HEADER.unpack_from(payload, offset)
+            offset += self._RECORD_HEADER.size
+            key = payload[offset : offset + key_length].decode("utf-8")
+            offset += key_length
+            version, data_length = self._RECORD_VERSION.unpack_from(payload, offset)
+            offset += self._RECORD_VERSION.size
+            records.append((AgentId.from_str(key), payload[offset : offset + data_length], version))
+            offset += data_length
+        return records
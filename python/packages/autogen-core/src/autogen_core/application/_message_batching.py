@@ -0,0 +1,206 @@
+import asyncio
+from dataclasses import dataclass
+from typing import AsyncIterable, AsyncIterator, Iterable, List, Protocol, Sequence, Tuple, cast
+
+from .protos import agent_worker_pb2
+
+MESSAGE_BATCHING_METADATA_KEY = "agent-message-batching"
+"""The gRPC metadata key a peer sends when opening a channel to advertise that it accepts batched messages."""
+
+
+@dataclass(frozen=True, kw_only=True)
+class MessageBatchingConfig:
+    """Controls how messages sent over a gRPC channel are packed into batches.
+
+    Batching is only used when the peer on the other end of the channel supports it,
+    so runtimes that do not know about batches keep receiving one message per frame.
+
+    Args:
+        max_batch_size (int, optional): The maximum number of messages packed into one frame. Defaults to 64.
+        max_batch_bytes (int, optional): The maximum serialized size of the messages packed into one frame.
+            A message larger than this is sent on its own. Defaults to 1 MiB.
+        max_batch_delay (float, optional): The number of seconds to wait for more messages before sending a batch.
+            Defaults to 0.0, only messages that are already queued are packed together, which adds no latency.
+    """
+
+    max_batch_size: int = 64
+    max_batch_bytes: int = 1024 * 1024
+    max_batch_delay: float = 0.0
+
+    def __post_init__(self) -> None:
+        if self.max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1.")
+        if self.max_batch_bytes < 1:
+            raise ValueError("max_batch_bytes must be at least 1.")
+        if self.max_batch_delay < 0:
+            raise ValueError("max_batch_delay must not be negative.")
+
+
+DEFAULT_MESSAGE_BATCHING_CONFIG = MessageBatchingConfig()
+
+
+def batching_metadata(config: MessageBatchingConfig | None) -> Sequence[Tuple[str, str]]:
+    """Returns the channel metadata advertising batching support, or no metadata if batching is disabled."""
+    if config is None:
+        return ()
+    return ((MESSAGE_BATCHING_METADATA_KEY, "1"),)
+
+
+def supports_batching(metadata: Iterable[Tuple[str, str | bytes]] | None) -> bool:
+    """Whether the metadata received from a peer advertises batching support."""
+    if metadata is None:
+        return False
+    return any(key == MESSAGE_BATCHING_METADATA_KEY for key, _ in metadata)
+
+
+def unpack_messages(message: agent_worker_pb2.Message) -> Sequence[agent_worker_pb2.Message]:
+    """Returns the messages carried by a received frame, which is either a single message or a batch."""
+    if message.WhichOneof("message") == "messageBatch":
+        return message.messageBatch.messages
+    return (message,)
+
+
+@dataclass(frozen=True)
+class SerializedMessage:
+    """A message that was serialized once to be written to several channels.
+
+    Args:
+        kind (str): The case of the ``message`` oneof that is set, for example ``"event"``.
+        data (bytes): The serialized :class:`agent_worker_pb2.Message`.
+    """
+
+    kind: str
+    data: bytes
+
+    @classmethod
+    def from_message(cls, message: agent_worker_pb2.Message) -> "SerializedMessage":
+        return cls(kind=message.WhichOneof("message") or "", data=message.SerializeToString())
+
+
+OutgoingMessage = agent_worker_pb2.Message | SerializedMessage
+"""A message queued to be sent, either as a message or already serialized."""
+
+
+def message_kind(message: OutgoingMessage) -> str | None:
+    """Returns the case of the ``message`` oneof that is set."""
+    if isinstance(message, SerializedMessage):
+        return message.kind
+    return message.WhichOneof("message")
+
+
+def message_size(message: OutgoingMessage) -> int:
+    if isinstance(message, SerializedMessage):
+        return len(message.data)
+    return message.ByteSize()
+
+
+def serialize_frame(frame: agent_worker_pb2.Message | bytes) -> bytes:
+    """Serializes a frame produced by :class:`CoalescingQueueAsyncIterable`, which may already be serialized."""
+    if isinstance(frame, bytes):
+        return frame
+    return frame.SerializeToString()
+
+
+def _encode_varint(value: int) -> bytes:
+    encoded = bytearray()
+    while value > 0x7F:
+        encoded.append((value & 0x7F) | 0x80)
+        value >>= 7
+    encoded.append(value)
+    return bytes(encoded)
+
+
+def _encode_length_delimited(field_number: int, data: bytes) -> bytes:
+    # Wire type 2 is length-delimited.
+    return _encode_varint(field_number << 3 | 2) + _encode_varint(len(data)) + data
+
+
+def _as_frame(message: OutgoingMessage) -> agent_worker_pb2.Message | bytes:
+    if isinstance(message, SerializedMessage):
+        return message.data
+    return message
+
+
+_MESSAGE_BATCH_FIELD_NUMBER = agent_worker_pb2.Message.DESCRIPTOR.fields_by_name["messageBatch"].number
+_MESSAGES_FIELD_NUMBER = agent_worker_pb2.MessageBatch.DESCRIPTOR.fields_by_name["messages"].number
+
+
+def _encode_batch(batch: Sequence[OutgoingMessage]) -> bytes:
+    # Embedded messages are encoded like bytes fields, so the batch can be assembled from the already
+    # serialized messages without parsing or serializing them again.
+    messages = b"".join(
+        _encode_length_delimited(_MESSAGES_FIELD_NUMBER, serialize_frame(_as_frame(message))) for message in batch
+    )
+    return _encode_length_delimited(_MESSAGE_BATCH_FIELD_NUMBER, messages)
+
+
+class MessageQueue(Protocol):
+    """The part of the :class:`asyncio.Queue` interface a :class:`CoalescingQueueAsyncIterable` reads from."""
+
+    async def get(self) -> OutgoingMessage: ...
+
+    def get_nowait(self) -> OutgoingMessage: ...
+
+    def empty(self) -> bool: ...
+
+
+class CoalescingQueueAsyncIterable(
+    AsyncIterator[agent_worker_pb2.Message | bytes], AsyncIterable[agent_worker_pb2.Message | bytes]
+):
+    """Iterates over the messages of a send queue, packing queued messages into :class:`MessageBatch` frames
+    once :attr:`batching` is enabled.
+
+    Messages queued as :class:`SerializedMessage` are produced as bytes, and batches that contain them are
+    assembled as bytes, so the channel must serialize its frames with :func:`serialize_frame`.
+    """
+
+    def __init__(self, queue: MessageQueue, config: MessageBatchingConfig | None) -> None:
+        self._queue = queue
+        self._config = config
+        self._held: OutgoingMessage | None = None
+        self.batching = False
+
+    def __aiter__(self) -> AsyncIterator[agent_worker_pb2.Message | bytes]:
+        return self
+
+    async def __anext__(self) -> agent_worker_pb2.Message | bytes:
+        if self._held is not None:
+            message, self._held = self._held, None
+        else:
+            message = await self._queue.get()
+        if not self.batching or self._config is None:
+            return _as_frame(message)
+
+        config = self._config
+        size = message_size(message)
+        if size >= config.max_batch_bytes or (self._queue.empty() and config.max_batch_delay == 0):
+            return _as_frame(message)
+        batch: List[OutgoingMessage] = [message]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + config.max_batch_delay
+        while len(batch) < config.max_batch_size:
+            if not self._queue.empty():
+                next_message = self._queue.get_nowait()
+            else:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    next_message = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            next_size = message_size(next_message)
+            if size + next_size > config.max_batch_bytes:
+                # Send it with the next frame.
+                self._held = next_message
+                break
+            batch.append(next_message)
+            size += next_size
+
+        if len(batch) == 1:
+            return _as_frame(batch[0])
+        if any(isinstance(message, SerializedMessage) for message in batch):
+            return _encode_batch(batch)
+        return agent_worker_pb2.Message(
+            messageBatch=agent_worker_pb2.MessageBatch(messages=cast(List[agent_worker_pb2.Message], batch))
+        )
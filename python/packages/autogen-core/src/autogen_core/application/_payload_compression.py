@@ -0,0 +1,75 @@
+import gzip
+import importlib.util
+from dataclasses import dataclass
+from typing import List, Literal
+
+PayloadCompressionAlgorithm = Literal["gzip", "zstd"]
+"""The algorithms payloads can be compressed with. ``"zstd"`` requires the ``zstd`` extra."""
+
+
+@dataclass(frozen=True, kw_only=True)
+class PayloadCompressionConfig:
+    """Controls the compression of the payloads a worker runtime sends.
+
+    A payload is only compressed if every client connected to the host accepts the algorithm, and is sent
+    uncompressed if compressing it does not make it smaller.
+
+    Args:
+        algorithm (PayloadCompressionAlgorithm, optional): The compression algorithm. Defaults to ``"gzip"``.
+        threshold (int, optional): The minimum serialized size in bytes of a payload to compress. Defaults to 64 KiB.
+        level (int | None, optional): The compression level, or None for the default level of the algorithm.
+        offload_threshold (int | None, optional): The minimum serialized size in bytes of a payload to compress in a
+            worker thread instead of the event loop. Set to None to compress every payload on the event loop.
+            Defaults to 256 KiB.
+    """
+
+    algorithm: PayloadCompressionAlgorithm = "gzip"
+    threshold: int = 64 * 1024
+    level: int | None = None
+    offload_threshold: int | None = 256 * 1024
+
+    def __post_init__(self) -> None:
+        if self.algorithm not in ("gzip", "zstd"):
+            raise ValueError(f"Unknown compression algorithm {self.algorithm}.")
+        if self.algorithm == "zstd" and not is_zstd_available():
+            raise RuntimeError(
+                "Missing dependency for zstd compression. Please ensure the autogen-core package was installed with the 'zstd' extra."
+            )
+        if self.threshold < 0:
+            raise ValueError("threshold must not be negative.")
+        if self.offload_threshold is not None and self.offload_threshold < 0:
+            raise ValueError("offload_threshold must not be negative.")
+
+
+def is_zstd_available() -> bool:
+    return importlib.util.find_spec("zstandard") is not None
+
+
+def get_available_content_encodings() -> List[str]:
+    """Returns the content encodings this process can decompress."""
+    if is_zstd_available():
+        return ["gzip", "zstd"]
+    return ["gzip"]
+
+
+def compress(data: bytes, algorithm: PayloadCompressionAlgorithm, level: int | None = None) -> bytes:
+    match algorithm:
+        case "gzip":
+            # A fixed mtime keeps the output deterministic.
+            return gzip.compress(data, compresslevel=6 if level is None else level, mtime=0)
+        case "zstd":
+            import zstandard
+
+            return zstandard.ZstdCompressor(level=3 if level is None else level).compress(data)
+
+
+def decompress(data: bytes, content_encoding: str) -> bytes:
+    match content_encoding:
+        case "gzip":
+            return gzip.decompress(data)
+        case "zstd":
+            import zstandard
+
+            return zstandard.ZstdDecompressor().decompress(data)
+        case _:
+            raise ValueError(f"Unknown content encoding {content_encoding}.")
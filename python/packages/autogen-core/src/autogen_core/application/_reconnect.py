@@ -0,0 +1,168 @@
+import logging
+import random
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Generic, Iterable, List, Sequence, Tuple, TypeVar
+
+from ._message_batching import OutgoingMessage, message_kind
+from ._timer_wheel import TimerHandle
+
+logger = logging.getLogger("autogen_core")
+
+SESSION_METADATA_KEY = "agent-session"
+"""The gRPC metadata key a worker sends when opening a channel with the id of its session, which stays the same
+across the channels it reconnects with."""
+
+SESSION_RECEIVED_METADATA_KEY = "agent-session-received"
+"""The gRPC metadata key with the number of messages of the session received, which a worker sends when opening a
+channel and the host answers a resumed session with."""
+
+MessageT = TypeVar("MessageT")
+
+
+@dataclass(frozen=True, kw_only=True)
+class ReconnectConfig:
+    """Controls how a worker runtime reconnects to the host when its channel breaks.
+
+    The worker opens a new channel, waiting longer after each failed attempt. The host keeps the worker's agent
+    types and subscriptions for a while after the channel broke, and queues the messages for it, so that they are
+    delivered once the worker reconnected. The host tells the worker how many of the messages sent before the channel
+    broke it received, and the worker sends the others again. The same goes the other way: the worker tells the host
+    how many messages of the session it received, and the host sends the others again. If the host no longer knows
+    the worker, because it restarted or the worker was away for too long, the worker registers its agent types and
+    subscriptions again.
+
+    Once ``max_attempts`` failed, the pending requests of the runtime fail with :class:`ConnectionError`, and so do the
+    requests and events sent after.
+
+    Args:
+        initial_backoff (float, optional): The number of seconds to wait before the first attempt to reconnect.
+            Defaults to 0.1.
+        max_backoff (float, optional): The maximum number of seconds to wait between attempts. Defaults to 10.
+        backoff_multiplier (float, optional): The factor the wait grows by after each failed attempt. Defaults to 2.
+        max_attempts (int, optional): The number of consecutive failed attempts after which the worker stops
+            reconnecting. Defaults to None, reconnecting until the runtime is stopped.
+        replay_buffer_size (int, optional): The number of the last messages sent that are kept to be sent again.
+            Messages sent before those are lost if the host did not receive them. Defaults to 1000.
+    """
+
+    initial_backoff: float = 0.1
+    max_backoff: float = 10.0
+    backoff_multiplier: float = 2.0
+    max_attempts: int | None = None
+    replay_buffer_size: int = 1000
+
+    def __post_init__(self) -> None:
+        if self.initial_backoff <= 0:
+            raise ValueError("initial_backoff must be positive.")
+        if self.max_backoff < self.initial_backoff:
+            raise ValueError("max_backoff must be at least initial_backoff.")
+        if self.backoff_multiplier < 1:
+            raise ValueError("backoff_multiplier must be at least 1.")
+        if self.max_attempts is not None and self.max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1.")
+        if self.replay_buffer_size < 1:
+            raise ValueError("replay_buffer_size must be at least 1.")
+
+    def backoff(self, attempt: int) -> float:
+        """Returns the number of seconds to wait before the given attempt, counting from 0."""
+        backoff = min(self.initial_backoff * self.backoff_multiplier**attempt, self.max_backoff)
+        # Spread out the attempts of workers that lost their channel at the same time.
+        return backoff * random.uniform(0.5, 1.0)
+
+
+def session_metadata(session_id: str) -> Sequence[Tuple[str, str]]:
+    """Returns the channel metadata advertising the session of a worker."""
+    return ((SESSION_METADATA_KEY, session_id),)
+
+
+def get_session_id(metadata: Iterable[Tuple[str, str | bytes]] | None) -> str:
+    """Returns the session advertised in the metadata received from a worker, or an empty string."""
+    for key, value in metadata or ():
+        if key == SESSION_METADATA_KEY:
+            return value.decode("utf-8") if isinstance(value, bytes) else value
+    return ""
+
+
+def session_received_metadata(received: int) -> Sequence[Tuple[str, str]]:
+    """Returns the channel metadata telling the peer how many messages of the session were received from it."""
+    return ((SESSION_RECEIVED_METADATA_KEY, str(received)),)
+
+
+def get_session_received(metadata: Iterable[Tuple[str, str | bytes]] | None) -> int | None:
+    """Returns the number of messages of the session the peer received, or None if the peer did not send it, as the
+    host does when it did not resume the session."""
+    for key, value in metadata or ():
+        if key == SESSION_RECEIVED_METADATA_KEY:
+            return int(value)
+    return None
+
+
+def is_replayable(message: OutgoingMessage) -> bool:
+    """Whether the message is sent again after reconnecting if the peer did not receive it. Flow control credits are
+    not, the credits start over on a new channel."""
+    return message_kind(message) != "flowControl"
+
+
+class ReplayBuffer(Generic[MessageT]):
+    """The last messages sent in a session, except flow control credits, in the order they were sent. The worker and
+    the host each keep one for the messages they send to the other.
+
+    The peer counts the messages of the session it received, so the messages it did not receive are the last ones
+    sent. Messages are not acknowledged while the channel is up, which costs nothing on the send path.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self._messages: Deque[MessageT] = deque(maxlen=maxsize)
+        self._sent = 0
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    @property
+    def sent(self) -> int:
+        """The number of messages sent in the session."""
+        return self._sent
+
+    def append(self, message: MessageT) -> None:
+        self._messages.append(message)
+        self._sent += 1
+
+    def unreceived(self, received: int) -> List[MessageT]:
+        """Returns the buffered messages that were sent after the first ``received`` ones."""
+        unreceived = self._sent - received
+        if unreceived <= 0:
+            return []
+        if unreceived > len(self._messages):
+            logger.error(
+                "%d messages the peer did not receive are no longer buffered, they are lost.",
+                unreceived - len(self._messages),
+            )
+            return list(self._messages)
+        return list(self._messages)[-unreceived:]
+
+    def reset(self) -> None:
+        """Start a new session, once the host no longer knew the previous one."""
+        if self._messages:
+            logger.warning("The host did not resume the session, messages sent before reconnecting may be lost.")
+        self._messages.clear()
+        self._sent = 0
+
+
+@dataclass
+class ClientSession:
+    """What the host keeps of a client that advertised a session, while it is disconnected.
+
+    Args:
+        client_id (int): The client id, which the client keeps when it reconnects.
+        received (int): The number of messages of the session the host received, except flow control credits.
+        connected (bool): Whether the client has a channel open.
+        ended (bool): Whether the client ended the session, so that it is not kept once the channel closes.
+        expiration (TimerHandle | None): Removes the client if it did not reconnect in time.
+    """
+
+    client_id: int
+    received: int = 0
+    connected: bool = True
+    ended: bool = False
+    expiration: TimerHandle | None = None
@@ -0,0 +1,185 @@
+import logging
+import mmap
+import os
+import socket
+import sys
+import uuid
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, Iterable, Sequence, Tuple
+
+from ._timer_wheel import TimerHandle, TimerWheel
+from .protos import agent_worker_pb2
+
+logger = logging.getLogger("autogen_core")
+
+SHARED_MEMORY_METADATA_KEY = "agent-shared-memory"
+"""The gRPC metadata key a peer sends when opening a channel to advertise the shared memory namespace it can read
+segments from."""
+
+_SHARED_MEMORY_DIRECTORY = "/dev/shm"
+
+
+@dataclass(frozen=True, kw_only=True)
+class SharedMemoryConfig:
+    """Controls the payloads a worker runtime passes to co-located workers through shared memory.
+
+    A payload is only written to shared memory if every client connected to the host runs on the same machine, as
+    announced by the host. Otherwise it is sent inline over gRPC.
+
+    Args:
+        threshold (int, optional): The minimum serialized size in bytes of a payload to write to shared memory.
+            Defaults to 1 MiB.
+        retention (float, optional): The number of seconds a segment is kept after it was written, after which the
+            receivers can no longer read it. Defaults to 60.
+        max_bytes (int, optional): The maximum total size in bytes of the segments kept at a time. Payloads that
+            would exceed it, or that do not fit in the free shared memory, are sent inline. Defaults to 256 MiB.
+    """
+
+    threshold: int = 1024 * 1024
+    retention: float = 60.0
+    max_bytes: int = 256 * 1024 * 1024
+
+    def __post_init__(self) -> None:
+        if self.threshold < 1:
+            raise ValueError("threshold must be at least 1.")
+        if self.retention <= 0:
+            raise ValueError("retention must be positive.")
+        if self.max_bytes < self.threshold:
+            raise ValueError("max_bytes must be at least the threshold.")
+
+
+def get_shared_memory_namespace() -> str:
+    """Returns an identifier shared by the processes that can read each other's shared memory segments."""
+    try:
+        # The boot id tells apart machines that share a hostname. It is the same for all the containers of a machine.
+        with open("/proc/sys/kernel/random/boot_id") as f:
+            boot_id = f.read().strip()
+    except OSError:
+        boot_id = ""
+    try:
+        # On Linux, segments are kept in /dev/shm, which containers only share if they mount the same one.
+        device = str(os.stat(_SHARED_MEMORY_DIRECTORY).st_dev)
+    except OSError:
+        device = ""
+    return f"{socket.gethostname()}/{boot_id}/{device}"
+
+
+def shared_memory_metadata(namespace: str) -> Sequence[Tuple[str, str]]:
+    """Returns the channel metadata advertising the shared memory namespace of a peer."""
+    return ((SHARED_MEMORY_METADATA_KEY, namespace),)
+
+
+def get_shared_memory_namespace_from_metadata(metadata: Iterable[Tuple[str, str | bytes]] | None) -> str:
+    """Returns the shared memory namespace advertised in the metadata received from a peer, or an empty string."""
+    for key, value in metadata or ():
+        if key == SHARED_MEMORY_METADATA_KEY:
+            return value.decode("utf-8") if isinstance(value, bytes) else value
+    return ""
+
+
+def common_shared_memory_namespace(namespaces: Iterable[str]) -> str:
+    """Returns the shared memory namespace of all peers, or an empty string if they do not all share one."""
+    common = set(namespaces)
+    if len(common) == 1:
+        return common.pop()
+    return ""
+
+
+class SharedMemorySegments:
+    """The shared memory segments written by a worker runtime, each unlinked once its retention passed.
+
+    Segments are not reference counted by the receivers, an event may be read by any number of them, so they are
+    kept for a fixed time instead, up to ``max_bytes`` in total.
+    """
+
+    def __init__(self, retention: float, max_bytes: int | None = None) -> None:
+        self._retention = retention
+        self._max_bytes = max_bytes
+        self._segments: Dict[str, Tuple[SharedMemory, TimerHandle]] = {}
+        self._retained_bytes = 0
+        self._expirations = TimerWheel(tick=min(TimerWheel.DEFAULT_TICK * 10, retention))
+
+    def __len__(self) -> int:
+        return len(self._segments)
+
+    @property
+    def retained_bytes(self) -> int:
+        """The total size in bytes of the segments kept."""
+        return self._retained_bytes
+
+    def write(self, data: bytes) -> agent_worker_pb2.SharedMemoryHandle | None:
+        """Copy ``data`` to a new segment and return its handle, or None if there is no room for it."""
+        size = max(len(data), 1)
+        if self._max_bytes is not None and self._retained_bytes + size > self._max_bytes:
+            return None
+        # Writing to a segment larger than the free space of /dev/shm crashes the process with SIGBUS.
+        if size > _free_shared_memory():
+            return None
+        # The process id tells which process leaked a segment. macOS limits names to 31 characters.
+        name = f"ag{os.getpid()}_{uuid.uuid4().hex[:16]}"
+        try:
+            segment = SharedMemory(name=name, create=True, size=size)
+        except OSError as e:
+            logger.warning("Failed to create a shared memory segment of %d bytes: %s", size, e)
+            return None
+        segment.buf[: len(data)] = data
+        handle = self._expirations.schedule(self._retention, lambda: self._unlink(name))
+        self._segments[name] = (segment, handle)
+        self._retained_bytes += segment.size
+        return agent_worker_pb2.SharedMemoryHandle(name=name, size=len(data))
+
+    def close(self) -> None:
+        """Unlink all segments."""
+        self._expirations.close()
+        for name in list(self._segments):
+            self._unlink(name)
+
+    def _unlink(self, name: str) -> None:
+        segment, handle = self._segments.pop(name)
+        handle.cancel()
+        self._retained_bytes -= segment.size
+        segment.close()
+        segment.unlink()
+
+
+def _free_shared_memory() -> float:
+    try:
+        stats = os.statvfs(_SHARED_MEMORY_DIRECTORY)
+    except (AttributeError, OSError):
+        # The free space of shared memory is not known outside Linux.
+        return float("inf")
+    return stats.f_bavail * stats.f_frsize
+
+
+def read_shared_memory(handle: agent_worker_pb2.SharedMemoryHandle) -> bytes:
+    """Copy the data out of a segment written by a worker runtime on this machine."""
+    try:
+        return _read_segment(handle.name, handle.size)
+    except FileNotFoundError as e:
+        raise RuntimeError(
+            f"Shared memory segment {handle.name} no longer exists, it was read after its retention passed."
+        ) from e
+
+
+def _read_segment(name: str, size: int) -> bytes:
+    # Attaching with SharedMemory registers the segment with the resource tracker, which would unlink it when the
+    # reader exits although the writer owns it, so segments are attached without it where possible.
+    if sys.version_info >= (3, 13):
+        segment = SharedMemory(name=name, track=False)
+    elif os.name == "posix":
+        import _posixshmem
+
+        fd = _posixshmem.shm_open(f"/{name}", os.O_RDONLY, mode=0o600)
+        try:
+            with mmap.mmap(fd, size, access=mmap.ACCESS_READ) as buffer:
+                return buffer[:size]
+        finally:
+            os.close(fd)
+    else:
+        # Segments are not tracked on Windows.
+        segment = SharedMemory(name=name)
+    try:
+        return bytes(segment.buf[:size])
+    finally:
+        segment.close()
@@ -6,10 +6,12 @@
 import threading
 import warnings
 from asyncio import CancelledError, Future, Task
+from collections import deque
 from collections.abc import Sequence
+from contextlib import ExitStack
 from dataclasses import dataclass
 from enum import Enum
-from typing import Any, Awaitable, Callable, Dict, List, Mapping, ParamSpec, Set, Type, TypeVar, cast
+from typing import Any, Awaitable, Callable, Coroutine, Deque, Dict, List, Mapping, ParamSpec, Set, Type, TypeVar, cast
 
 from opentelemetry.trace import TracerProvider
 from typing_extensions import deprecated
@@ -32,8 +34,10 @@
 )
 from ..base.exceptions import MessageDroppedException
 from ..base.intervention import DropMessage, InterventionHandler
-from ._helpers import SubscriptionManager, get_impl
-from .telemetry import EnvelopeMetadata, MessageRuntimeTracingConfig, TraceHelper, get_telemetry_envelope_metadata
+from ._agent_passivation import AgentInstanceCache, AgentPassivationPolicy
+from ._helpers import SubscriptionCacheStats, SubscriptionManager, get_impl
+from .logging.events import DeliveryStage, MessageEvent, MessageKind
+from .telemetry import EnvelopeMetadata, MessageRuntimeTracingConfig, TraceHelper
 
 logger = logging.getLogger("autogen_core")
 event_logger = logging.getLogger("autogen_core.events")
@@ -108,12 +112,20 @@ class RunState(Enum):
         CANCELLED = 1
         UNTIL_IDLE = 2
 
+    # How often a condition given to stop_when is checked while there is nothing to process, since it may depend on
+    # state that changes without a message being queued, such as a deadline or a flag set by another task.
+    CONDITION_POLL_INTERVAL = 0.05
+
     def __init__(self, runtime: SingleThreadedAgentRuntime) -> None:
         self._runtime = runtime
         self._run_state = RunContext.RunState.RUNNING
         self._end_condition: Callable[[], bool] = self._stop_when_cancelled
         self._run_task = asyncio.create_task(self._run())
         self._lock = asyncio.Lock()
+        # Set when a message is queued or a processing task finishes, so the loop
+        # can wait for work instead of polling an empty queue.
+        self._wake_up_event = asyncio.Event()
+        self._poll_interval: float | None = None
 
     async def _run(self) -> None:
         while True:
@@ -121,23 +133,43 @@ async def _run(self) -> None:
                 if self._end_condition():
                     return
 
-                await self._runtime.process_next()
+                if len(self._runtime.unprocessed_messages) > 0:
+                    await self._runtime.process_next()
+                    continue
+
+            # Nothing to process, wait outside the lock until a message is queued
+            # or the state the end condition depends on may have changed.
+            if self._poll_interval is None:
+                await self._wake_up_event.wait()
+            else:
+                try:
+                    await asyncio.wait_for(self._wake_up_event.wait(), self._poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wake_up_event.clear()
+
+    def wake_up(self) -> None:
+        self._wake_up_event.set()
 
     async def stop(self) -> None:
         async with self._lock:
             self._run_state = RunContext.RunState.CANCELLED
             self._end_condition = self._stop_when_cancelled
+        self.wake_up()
         await self._run_task
 
     async def stop_when_idle(self) -> None:
         async with self._lock:
             self._run_state = RunContext.RunState.UNTIL_IDLE
             self._end_condition = self._stop_when_idle
+        self.wake_up()
         await self._run_task
 
     async def stop_when(self, condition: Callable[[], bool]) -> None:
         async with self._lock:
             self._end_condition = condition
+            self._poll_interval = self.CONDITION_POLL_INTERVAL
+        self.wake_up()
         await self._run_task
 
     def _stop_when_cancelled(self) -> bool:
@@ -148,23 +180,49 @@ def _stop_when_idle(self) -> bool:
 
 
 class SingleThreadedAgentRuntime(AgentRuntime):
+    """An agent runtime that processes all messages using a single asyncio queue.
+
+    Args:
+        intervention_handlers (List[InterventionHandler], optional): Handlers that can intercept and modify or drop messages.
+        tracer_provider (TracerProvider, optional): The OpenTelemetry tracer provider used to trace message delivery.
+            Defaults to None, no spans or telemetry metadata are created.
+        tracing_sampling_ratio (float, optional): The fraction of messages that are traced when a tracer provider is
+            given. Messages sent while handling a traced message are traced as well. Defaults to 1.0.
+        message_batch_size (int, optional): The maximum number of queued messages dispatched per
+            :meth:`process_next` call. The run loop acquires its lock, checks the stop condition and yields to the
+            event loop once per batch rather than once per message. Defaults to 1.
+        max_cached_topics (int, optional): The maximum number of topics whose subscribed recipients are cached.
+            Least recently used topics are evicted first. Defaults to 10000.
+        passivation_policy (AgentPassivationPolicy, optional): Limits the number of live agent instances by saving
+            the state of idle agents to a state store and releasing them. Defaults to None, agents are never released.
+    """
+
     def __init__(
         self,
         *,
         intervention_handlers: List[InterventionHandler] | None = None,
         tracer_provider: TracerProvider | None = None,
+        tracing_sampling_ratio: float = 1.0,
+        message_batch_size: int = 1,
+        max_cached_topics: int = SubscriptionManager.DEFAULT_MAX_CACHED_TOPICS,
+        passivation_policy: AgentPassivationPolicy | None = None,
     ) -> None:
-        self._tracer_helper = TraceHelper(tracer_provider, MessageRuntimeTracingConfig("SingleThreadedAgentRuntime"))
-        self._message_queue: List[PublishMessageEnvelope | SendMessageEnvelope | ResponseMessageEnvelope] = []
+        if message_batch_size < 1:
+            raise ValueError("message_batch_size must be at least 1.")
+        self._message_batch_size = message_batch_size
+        self._tracer_helper = TraceHelper(
+            tracer_provider, MessageRuntimeTracingConfig("SingleThreadedAgentRuntime", tracing_sampling_ratio)
+        )
+        self._message_queue: Deque[PublishMessageEnvelope | SendMessageEnvelope | ResponseMessageEnvelope] = deque()
         # (namespace, type) -> List[AgentId]
         self._agent_factories: Dict[
             str, Callable[[], Agent | Awaitable[Agent]] | Callable[[AgentRuntime, AgentId], Agent | Awaitable[Agent]]
         ] = {}
-        self._instantiated_agents: Dict[AgentId, Agent] = {}
+        self._instantiated_agents = AgentInstanceCache(passivation_policy)
         self._intervention_handlers = intervention_handlers
         self._outstanding_tasks = Counter()
         self._background_tasks: Set[Task[Any]] = set()
-        self._subscription_manager = SubscriptionManager()
+        self._subscription_manager = SubscriptionManager(max_cached_topics=max_cached_topics)
         self._run_context: RunContext | None = None
         self._serialization_registry = SerializationRegistry()
 
@@ -178,10 +236,31 @@ def unprocessed_messages(
     def outstanding_tasks(self) -> int:
         return self._outstanding_tasks.get()
 
+    @property
+    def subscription_cache_stats(self) -> SubscriptionCacheStats:
+        """Statistics of the cache of subscribed recipients per topic."""
+        return self._subscription_manager.cache_stats
+
     @property
     def _known_agent_names(self) -> Set[str]:
         return set(self._agent_factories.keys())
 
+    def _enqueue(
+        self, message_envelope: PublishMessageEnvelope | SendMessageEnvelope | ResponseMessageEnvelope
+    ) -> None:
+        self._message_queue.append(message_envelope)
+        self._wake_up_run_context()
+
+    def _wake_up_run_context(self, *args: Any) -> None:
+        if self._run_context is not None:
+            self._run_context.wake_up()
+
+    def _start_background_task(self, coro: Coroutine[Any, Any, None]) -> None:
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        task.add_done_callback(self._wake_up_run_context)
+
     # Returns the response of the message
     async def send_message(
         self,
@@ -194,15 +273,16 @@ async def send_message(
         if cancellation_token is None:
             cancellation_token = CancellationToken()
 
-        # event_logger.info(
-        #     MessageEvent(
-        #         payload=message,
-        #         sender=sender,
-        #         receiver=recipient,
-        #         kind=MessageKind.DIRECT,
-        #         delivery_stage=DeliveryStage.SEND,
-        #     )
-        # )
+        if event_logger.isEnabledFor(logging.INFO):
+            event_logger.info(
+                MessageEvent(
+                    payload=message,
+                    sender=sender,
+                    receiver=recipient,
+                    kind=MessageKind.DIRECT,
+                    delivery_stage=DeliveryStage.SEND,
+                )
+            )
 
         with self._tracer_helper.trace_block(
             "create",
@@ -214,17 +294,14 @@ async def send_message(
             if recipient.type not in self._known_agent_names:
                 future.set_exception(Exception("Recipient not found"))
 
-            content = message.__dict__ if hasattr(message, "__dict__") else message
-            logger.info(f"Sending message of type {type(message).__name__} to {recipient.type}: {content}")
-
-            self._message_queue.append(
+            self._enqueue(
                 SendMessageEnvelope(
                     message=message,
                     recipient=recipient,
                     future=future,
                     cancellation_token=cancellation_token,
                     sender=sender,
-                    metadata=get_telemetry_envelope_metadata(),
+                    metadata=self._tracer_helper.get_envelope_metadata(),
                 )
             )
 
@@ -248,33 +325,34 @@ async def publish_message(
         ):
             if cancellation_token is None:
                 cancellation_token = CancellationToken()
-            content = message.__dict__ if hasattr(message, "__dict__") else message
-            logger.info(f"Publishing message of type {type(message).__name__} to all subscribers: {content}")
-
-            # event_logger.info(
-            #     MessageEvent(
-            #         payload=message,
-            #         sender=sender,
-            #         receiver=None,
-            #         kind=MessageKind.PUBLISH,
-            #         delivery_stage=DeliveryStage.SEND,
-            #     )
-            # )
-
-            self._message_queue.append(
+            if event_logger.isEnabledFor(logging.INFO):
+                event_logger.info(
+                    MessageEvent(
+                        payload=message,
+                        sender=sender,
+                        receiver=None,
+                        kind=MessageKind.PUBLISH,
+                        delivery_stage=DeliveryStage.SEND,
+                        topic_id=str(topic_id),
+                    )
+                )
+
+            self._enqueue(
                 PublishMessageEnvelope(
                     message=message,
                     cancellation_token=cancellation_token,
                     sender=sender,
                     topic_id=topic_id,
-                    metadata=get_telemetry_envelope_metadata(),
+                    metadata=self._tracer_helper.get_envelope_metadata(),
                 )
             )
 
     async def save_state(self) -> Mapping[str, Any]:
         state: Dict[str, Dict[str, Any]] = {}
-        for agent_id in self._instantiated_agents:
-            state[str(agent_id)] = dict((await self._get_agent(agent_id)).save_state())
+        for agent_id in self._instantiated_agents.known_agents():
+            agent_state = await self._instantiated_agents.saved_state(agent_id)
+            if agent_state is not None:
+                state[str(agent_id)] = dict(agent_state)
         return state
 
     async def load_state(self, state: Mapping[str, Any]) -> None:
@@ -290,20 +368,16 @@ async def _process_send(self, message_envelope: SendMessageEnvelope) -> None:
             # assert recipient in self._agents
 
             try:
-                # TODO use id
-                sender_name = message_envelope.sender.type if message_envelope.sender is not None else "Unknown"
-                logger.info(
-                    f"Calling message handler for {recipient} with message type {type(message_envelope.message).__name__} sent by {sender_name}"
-                )
-                # event_logger.info(
-                #     MessageEvent(
-                #         payload=message_envelope.message,
-                #         sender=message_envelope.sender,
-                #         receiver=recipient,
-                #         kind=MessageKind.DIRECT,
-                #         delivery_stage=DeliveryStage.DELIVER,
-                #     )
-                # )
+                if event_logger.isEnabledFor(logging.INFO):
+                    event_logger.info(
+                        MessageEvent(
+                            payload=message_envelope.message,
+                            sender=message_envelope.sender,
+                            receiver=recipient,
+                            kind=MessageKind.DIRECT,
+                            delivery_stage=DeliveryStage.DELIVER,
+                        )
+                    )
                 recipient_agent = await self._get_agent(recipient)
                 message_context = MessageContext(
                     sender=message_envelope.sender,
@@ -311,11 +385,12 @@ async def _process_send(self, message_envelope: SendMessageEnvelope) -> None:
                     is_rpc=True,
                     cancellation_token=message_envelope.cancellation_token,
                 )
-                with MessageHandlerContext.populate_context(recipient_agent.id):
-                    response = await recipient_agent.on_message(
-                        message_envelope.message,
-                        ctx=message_context,
-                    )
+                with self._instantiated_agents.in_use(recipient):
+                    with MessageHandlerContext.populate_context(recipient_agent.id):
+                        response = await recipient_agent.on_message(
+                            message_envelope.message,
+                            ctx=message_context,
+                        )
             except CancelledError as e:
                 if not message_envelope.future.cancelled():
                     message_envelope.future.set_exception(e)
@@ -326,13 +401,23 @@ async def _process_send(self, message_envelope: SendMessageEnvelope) -> None:
                 self._outstanding_tasks.decrement()
                 return
 
-            self._message_queue.append(
+            if event_logger.isEnabledFor(logging.INFO):
+                event_logger.info(
+                    MessageEvent(
+                        payload=response,
+                        sender=message_envelope.recipient,
+                        receiver=message_envelope.sender,
+                        kind=MessageKind.RESPOND,
+                        delivery_stage=DeliveryStage.SEND,
+                    )
+                )
+            self._enqueue(
                 ResponseMessageEnvelope(
                     message=response,
                     future=message_envelope.future,
                     sender=message_envelope.recipient,
                     recipient=message_envelope.sender,
-                    metadata=get_telemetry_envelope_metadata(),
+                    metadata=self._tracer_helper.get_envelope_metadata(),
                 )
             )
             self._outstanding_tasks.decrement()
@@ -342,47 +427,45 @@ async def _process_publish(self, message_envelope: PublishMessageEnvelope) -> No
             try:
                 responses: List[Awaitable[Any]] = []
                 recipients = await self._subscription_manager.get_subscribed_recipients(message_envelope.topic_id)
-                for agent_id in recipients:
-                    # Avoid sending the message back to the sender
-                    if message_envelope.sender is not None and agent_id == message_envelope.sender:
-                        continue
-
-                    sender_agent = (
-                        await self._get_agent(message_envelope.sender) if message_envelope.sender is not None else None
-                    )
-                    sender_name = str(sender_agent.id) if sender_agent is not None else "Unknown"
-                    logger.info(
-                        f"Calling message handler for {agent_id.type} with message type {type(message_envelope.message).__name__} published by {sender_name}"
-                    )
-                    # event_logger.info(
-                    #     MessageEvent(
-                    #         payload=message_envelope.message,
-                    #         sender=message_envelope.sender,
-                    #         receiver=agent,
-                    #         kind=MessageKind.PUBLISH,
-                    #         delivery_stage=DeliveryStage.DELIVER,
-                    #     )
-                    # )
-                    message_context = MessageContext(
-                        sender=message_envelope.sender,
-                        topic_id=message_envelope.topic_id,
-                        is_rpc=False,
-                        cancellation_token=message_envelope.cancellation_token,
-                    )
-                    agent = await self._get_agent(agent_id)
-
-                    async def _on_message(agent: Agent, message_context: MessageContext) -> Any:
-                        with self._tracer_helper.trace_block("process", agent.id, parent=None):
-                            with MessageHandlerContext.populate_context(agent.id):
-                                return await agent.on_message(
-                                    message_envelope.message,
-                                    ctx=message_context,
+                with ExitStack() as agents_in_use:
+                    for agent_id in recipients:
+                        # Avoid sending the message back to the sender
+                        if message_envelope.sender is not None and agent_id == message_envelope.sender:
+                            continue
+
+                        if event_logger.isEnabledFor(logging.INFO):
+                            event_logger.info(
+                                MessageEvent(
+                                    payload=message_envelope.message,
+                                    sender=message_envelope.sender,
+                                    receiver=agent_id,
+                                    kind=MessageKind.PUBLISH,
+                                    delivery_stage=DeliveryStage.DELIVER,
+                                    topic_id=str(message_envelope.topic_id),
                                 )
-
-                    future = _on_message(agent, message_context)
-                    responses.append(future)
-
-                await asyncio.gather(*responses)
+                            )
+                        message_context = MessageContext(
+                            sender=message_envelope.sender,
+                            topic_id=message_envelope.topic_id,
+                            is_rpc=False,
+                            cancellation_token=message_envelope.cancellation_token,
+                        )
+                        agent = await self._get_agent(agent_id)
+                        # Keep the recipients alive until they have handled the message.
+                        agents_in_use.enter_context(self._instantiated_agents.in_use(agent_id))
+
+                        async def _on_message(agent: Agent, message_context: MessageContext) -> Any:
+                            with self._tracer_helper.trace_block("process", agent.id, parent=None):
+                                with MessageHandlerContext.populate_context(agent.id):
+                                    return await agent.on_message(
+                                        message_envelope.message,
+                                        ctx=message_context,
+                                    )
+
+                        future = _on_message(agent, message_context)
+                        responses.append(future)
+
+                    await asyncio.gather(*responses)
             except BaseException as e:
                 # Ignore cancelled errors from logs
                 if isinstance(e, CancelledError):
@@ -394,36 +477,40 @@ async def _on_message(agent: Agent, message_context: MessageContext) -> Any:
 
     async def _process_response(self, message_envelope: ResponseMessageEnvelope) -> None:
         with self._tracer_helper.trace_block("ack", message_envelope.recipient, parent=message_envelope.metadata):
-            content = (
-                message_envelope.message.__dict__
-                if hasattr(message_envelope.message, "__dict__")
-                else message_envelope.message
-            )
-            logger.info(
-                f"Resolving response with message type {type(message_envelope.message).__name__} for recipient {message_envelope.recipient} from {message_envelope.sender.type}: {content}"
-            )
-            # event_logger.info(
-            #     MessageEvent(
-            #         payload=message_envelope.message,
-            #         sender=message_envelope.sender,
-            #         receiver=message_envelope.recipient,
-            #         kind=MessageKind.RESPOND,
-            #         delivery_stage=DeliveryStage.DELIVER,
-            #     )
-            # )
+            if event_logger.isEnabledFor(logging.INFO):
+                event_logger.info(
+                    MessageEvent(
+                        payload=message_envelope.message,
+                        sender=message_envelope.sender,
+                        receiver=message_envelope.recipient,
+                        kind=MessageKind.RESPOND,
+                        delivery_stage=DeliveryStage.DELIVER,
+                    )
+                )
             self._outstanding_tasks.decrement()
             if not message_envelope.future.cancelled():
                 message_envelope.future.set_result(message_envelope.message)
 
     async def process_next(self) -> None:
-        """Process the next message in the queue."""
+        """Process the next message in the queue, or the next ``message_batch_size``
+        messages if the runtime was created with a batch size greater than one."""
 
         if len(self._message_queue) == 0:
             # Yield control to the event loop to allow other tasks to run
             await asyncio.sleep(0)
             return
-        message_envelope = self._message_queue.pop(0)
 
+        for _ in range(self._message_batch_size):
+            if len(self._message_queue) == 0:
+                break
+            await self._dispatch(self._message_queue.popleft())
+
+        # Yield control to the message loop to allow other tasks to run
+        await asyncio.sleep(0)
+
+    async def _dispatch(
+        self, message_envelope: PublishMessageEnvelope | SendMessageEnvelope | ResponseMessageEnvelope
+    ) -> None:
         match message_envelope:
             case SendMessageEnvelope(message=message, sender=sender, recipient=recipient, future=future):
                 if self._intervention_handlers is not None:
@@ -442,9 +529,7 @@ async def process_next(self) -> None:
 
                         message_envelope.message = temp_message
                 self._outstanding_tasks.increment()
-                task = asyncio.create_task(self._process_send(message_envelope))
-                self._background_tasks.add(task)
-                task.add_done_callback(self._background_tasks.discard)
+                self._start_background_task(self._process_send(message_envelope))
             case PublishMessageEnvelope(
                 message=message,
                 sender=sender,
@@ -466,9 +551,7 @@ async def process_next(self) -> None:
 
                         message_envelope.message = temp_message
                 self._outstanding_tasks.increment()
-                task = asyncio.create_task(self._process_publish(message_envelope))
-                self._background_tasks.add(task)
-                task.add_done_callback(self._background_tasks.discard)
+                self._start_background_task(self._process_publish(message_envelope))
             case ResponseMessageEnvelope(message=message, sender=sender, recipient=recipient, future=future):
                 if self._intervention_handlers is not None:
                     for handler in self._intervention_handlers:
@@ -483,12 +566,7 @@ async def process_next(self) -> None:
                             return
                         message_envelope.message = temp_message
                 self._outstanding_tasks.increment()
-                task = asyncio.create_task(self._process_response(message_envelope))
-                self._background_tasks.add(task)
-                task.add_done_callback(self._background_tasks.discard)
-
-        # Yield control to the message loop to allow other tasks to run
-        await asyncio.sleep(0)
+                self._start_background_task(self._process_response(message_envelope))
 
     @property
     def idle(self) -> bool:
@@ -516,7 +594,11 @@ async def stop_when_idle(self) -> None:
         self._run_context = None
 
     async def stop_when(self, condition: Callable[[], bool]) -> None:
-        """Stop the runtime message processing loop when the condition is met."""
+        """Stop the runtime message processing loop when the condition is met.
+
+        The condition is checked before each message is processed, and periodically while there is nothing to
+        process, so it can depend on state other than the runtime's, such as a deadline.
+        """
         if self._run_context is None:
             raise RuntimeError("Runtime is not started")
         await self._run_context.stop_when(condition)
@@ -613,15 +695,16 @@ async def _invoke_agent_factory(
             return agent
 
     async def _get_agent(self, agent_id: AgentId) -> Agent:
-        if agent_id in self._instantiated_agents:
-            return self._instantiated_agents[agent_id]
+        agent = self._instantiated_agents.get(agent_id)
+        if agent is None:
+            if agent_id.type not in self._agent_factories:
+                raise LookupError(f"Agent with name {agent_id.type} not found.")
 
-        if agent_id.type not in self._agent_factories:
-            raise LookupError(f"Agent with name {agent_id.type} not found.")
+            agent_factory = self._agent_factories[agent_id.type]
+            agent = await self._invoke_agent_factory(agent_factory, agent_id)
+            await self._instantiated_agents.activate(agent_id, agent)
 
-        agent_factory = self._agent_factories[agent_id.type]
-        agent = await self._invoke_agent_factory(agent_factory, agent_id)
-        self._instantiated_agents[agent_id] = agent
+        await self._instantiated_agents.passivate(keep=agent_id)
         return agent
 
     # TODO: uncomment out the following type ignore when this is fixed in mypy: https://github.com/python/mypy/issues/3737
@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import math
+from typing import Callable, ClassVar, List, Set
+
+logger = logging.getLogger("autogen_core")
+
+
+class TimerHandle:
+    """A callback scheduled on a :class:`TimerWheel`."""
+
+    __slots__ = ("_wheel", "_slot", "deadline", "callback")
+
+    def __init__(self, wheel: "TimerWheel", slot: int, deadline: float, callback: Callable[[], None]) -> None:
+        self._wheel = wheel
+        self._slot = slot
+        self.deadline = deadline
+        self.callback = callback
+
+    def cancel(self) -> None:
+        """Unschedule the callback. Does nothing if it already ran or was cancelled."""
+        self._wheel._cancel(self, self._slot)  # type: ignore[reportPrivateUsage]
+
+
+class TimerWheel:
+    """Runs callbacks once their deadline passed, checking deadlines once per tick.
+
+    Timers are hashed into a ring of slots by the tick their deadline falls in, so scheduling and cancelling a
+    timer are constant time and each tick only looks at the timers of one slot. A timer is run at most one tick
+    after its deadline. The wheel runs a background task only while timers are scheduled.
+
+    Args:
+        tick (float, optional): The number of seconds between checks for expired timers. Defaults to 0.1.
+        slots (int, optional): The number of slots of the wheel. Defaults to 512.
+    """
+
+    DEFAULT_TICK: ClassVar[float] = 0.1
+    DEFAULT_SLOTS: ClassVar[int] = 512
+
+    def __init__(self, tick: float = DEFAULT_TICK, slots: int = DEFAULT_SLOTS) -> None:
+        if tick <= 0:
+            raise ValueError("tick must be positive.")
+        if slots < 1:
+            raise ValueError("slots must be at least 1.")
+        self._tick = tick
+        self._slots: List[Set[TimerHandle]] = [set() for _ in range(slots)]
+        self._size = 0
+        self._next_tick = 0
+        self._task: asyncio.Task[None] | None = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def schedule(self, delay: float, callback: Callable[[], None]) -> TimerHandle:
+        """Run ``callback`` once ``delay`` seconds passed."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + delay
+        slot = math.ceil(deadline / self._tick) % len(self._slots)
+        handle = TimerHandle(self, slot, deadline, callback)
+        self._slots[slot].add(handle)
+        self._size += 1
+        if self._task is None:
+            self._next_tick = math.floor(loop.time() / self._tick)
+            self._task = asyncio.create_task(self._run())
+        return handle
+
+    def close(self) -> None:
+        """Unschedule all timers and stop the background task."""
+        for slot in self._slots:
+            slot.clear()
+        self._size = 0
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _cancel(self, handle: TimerHandle, slot: int) -> None:
+        timers = self._slots[slot]
+        if handle in timers:
+            timers.remove(handle)
+            self._size -= 1
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while self._size > 0:
+                await asyncio.sleep(self._tick)
+                now = loop.time()
+                current_tick = math.floor(now / self._tick)
+                # Catch up on the ticks missed while the event loop was busy, visiting each slot at most once.
+                for tick in range(max(self._next_tick, current_tick - len(self._slots) + 1), current_tick + 1):
+                    timers = self._slots[tick % len(self._slots)]
+                    expired = [handle for handle in timers if handle.deadline <= now]
+                    for handle in expired:
+                        timers.remove(handle)
+                        self._size -= 1
+                        try:
+                            handle.callback()
+                        except Exception:
+                            logger.exception("Error running timer callback")
+                self._next_tick = current_tick + 1
+        finally:
+            if self._task is asyncio.current_task():
+                self._task = None
@@ -3,25 +3,28 @@
 import json
 import logging
 import signal
+import uuid
 import warnings
 from asyncio import Future, Task
 from collections import defaultdict
+from contextlib import ExitStack
+from itertools import count
 from typing import (
     TYPE_CHECKING,
     Any,
-    AsyncIterable,
-    AsyncIterator,
     Awaitable,
     Callable,
     ClassVar,
     DefaultDict,
     Dict,
+    FrozenSet,
     List,
     Literal,
     Mapping,
     ParamSpec,
     Sequence,
     Set,
+    Tuple,
     Type,
     TypeVar,
     cast,
@@ -32,8 +35,8 @@
 from opentelemetry.trace import TracerProvider
 from typing_extensions import Self, deprecated
 
-from autogen_core.base import JSON_DATA_CONTENT_TYPE
-from autogen_core.base._serialization import MessageSerializer, SerializationRegistry
+from autogen_core.base import JSON_DATA_CONTENT_TYPE, PROTOBUF_DATA_CONTENT_TYPE
+from autogen_core.base._serialization import MessageSerializer, SerializationRegistry, get_known_data_content_types
 from autogen_core.base._type_helpers import ChannelArgumentType
 
 from ..base import (
@@ -43,17 +46,47 @@
     AgentMetadata,
     AgentRuntime,
     AgentType,
+    BaseAgent,
     CancellationToken,
     MessageContext,
     MessageHandlerContext,
     Subscription,
     SubscriptionInstantiationContext,
     TopicId,
+    UnknownPayload,
 )
 from ..components import TypeSubscription
-from ._helpers import SubscriptionManager, get_impl
+from ._agent_passivation import AgentInstanceCache, AgentPassivationPolicy
+from ._content_types import DEFAULT_CONTENT_TYPES, content_encodings_metadata, content_types_metadata
+from ._flow_control import CreditGrantor, flow_control_metadata, supports_flow_control
+from ._helpers import SubscriptionCacheStats, SubscriptionManager, get_impl
+from ._message_batching import (
+    DEFAULT_MESSAGE_BATCHING_CONFIG,
+    CoalescingQueueAsyncIterable,
+    MessageBatchingConfig,
+    batching_metadata,
+    supports_batching,
+    unpack_messages,
+)
+from ._payload_compression import PayloadCompressionConfig, compress, decompress, get_available_content_encodings
+from ._reconnect import (
+    ReconnectConfig,
+    ReplayBuffer,
+    get_session_received,
+    is_replayable,
+    session_metadata,
+    session_received_metadata,
+)
+from ._shared_memory import (
+    SharedMemoryConfig,
+    SharedMemorySegments,
+    get_shared_memory_namespace,
+    read_shared_memory,
+    shared_memory_metadata,
+)
+from ._timer_wheel import TimerWheel
 from .protos import agent_worker_pb2, agent_worker_pb2_grpc
-from .telemetry import MessageRuntimeTracingConfig, TraceHelper, get_telemetry_grpc_metadata
+from .telemetry import MessageRuntimeTracingConfig, TraceHelper
 
 if TYPE_CHECKING:
     from .protos.agent_worker_pb2_grpc import AgentRpcAsyncStub
@@ -67,16 +100,8 @@
 
 type_func_alias = type
 
-
-class QueueAsyncIterable(AsyncIterator[Any], AsyncIterable[Any]):
-    def __init__(self, queue: asyncio.Queue[Any]) -> None:
-        self._queue = queue
-
-    async def __anext__(self) -> Any:
-        return await self._queue.get()
-
-    def __aiter__(self) -> AsyncIterator[Any]:
-        return self
+# A channel opened to the host, with the number of messages of the worker's session the host received.
+_OpenedChannel = Tuple[StreamStreamCall[agent_worker_pb2.Message, agent_worker_pb2.Message], int | None]  # type: ignore
 
 
 class HostConnection:
@@ -102,14 +127,42 @@ class HostConnection:
         )
     ]
 
-    def __init__(self, channel: grpc.aio.Channel) -> None:  # type: ignore
+    def __init__(self, channel: grpc.aio.Channel, reconnect: ReconnectConfig | None = None) -> None:  # type: ignore
         self._channel = channel
         self._send_queue = asyncio.Queue[agent_worker_pb2.Message]()
-        self._recv_queue = asyncio.Queue[agent_worker_pb2.Message]()
+        # None once the connection to the host is lost, after the messages received before.
+        self._recv_queue = asyncio.Queue[agent_worker_pb2.Message | None]()
+        self._credit_grantor: CreditGrantor | None = None
         self._connection_task: Task[None] | None = None
+        self._send_task: Task[None] | None = None
+        self._stub: AgentRpcAsyncStub = agent_worker_pb2_grpc.AgentRpcStub(channel)  # type: ignore
+        self._reconnect = reconnect
+        self._closing = False
+        self._lost: str | None = None
+        self._recv_stream: StreamStreamCall[agent_worker_pb2.Message, agent_worker_pb2.Message] | None = None  # type: ignore
+        # With reconnecting, the session outlives the channels, and the host resumes it when the worker reconnects.
+        self._session_id = uuid.uuid4().hex
+        self._replay_buffer = (
+            ReplayBuffer[agent_worker_pb2.Message](reconnect.replay_buffer_size) if reconnect is not None else None
+        )
+        # The number of messages of the session received from the host, except flow control credits.
+        self._received = 0
+        # The registrations of agent types and subscriptions sent to the host, sent again when the host
+        # starts a new session.
+        self._registrations: List[agent_worker_pb2.Message] = []
 
     @classmethod
-    def from_host_address(cls, host_address: str, extra_grpc_config: ChannelArgumentType = DEFAULT_GRPC_CONFIG) -> Self:
+    def from_host_address(
+        cls,
+        host_address: str,
+        extra_grpc_config: ChannelArgumentType = DEFAULT_GRPC_CONFIG,
+        message_batching: MessageBatchingConfig | None = DEFAULT_MESSAGE_BATCHING_CONFIG,
+        flow_control_window: int | None = None,
+        content_types: Sequence[str] = (),
+        content_encodings: Sequence[str] = (),
+        shared_memory_namespace: str = "",
+        reconnect: ReconnectConfig | None = None,
+    ) -> Self:
         logger.info("Connecting to %s", host_address)
         #  Always use DEFAULT_GRPC_CONFIG and override it with provided grpc_config
         merged_options = [
@@ -120,50 +173,198 @@ def from_host_address(cls, host_address: str, extra_grpc_config: ChannelArgument
             host_address,
             options=merged_options,
         )
-        instance = cls(channel)
+        instance = cls(channel, reconnect)
+        if flow_control_window is not None:
+            instance._credit_grantor = CreditGrantor(flow_control_window, instance._send_queue)
         instance._connection_task = asyncio.create_task(
-            instance._connect(channel, instance._send_queue, instance._recv_queue)
+            instance._connect(
+                message_batching,
+                content_types,
+                content_encodings,
+                shared_memory_namespace,
+            )
         )
         return instance
 
     async def close(self) -> None:
         if self._connection_task is None:
             raise RuntimeError("Connection is not open.")
+        self._closing = True
+        if self._reconnect is not None and self._send_task is not None and not self._send_task.done():
+            # End the session, so that the host removes the worker instead of keeping it for it to reconnect. The
+            # host closes the channel once it received the end of the session.
+            await self._send_queue.put(agent_worker_pb2.Message(endSession=agent_worker_pb2.EndSession()))
+            try:
+                await asyncio.wait_for(asyncio.shield(self._connection_task), timeout=1.0)
+            except asyncio.TimeoutError:
+                pass
         await self._channel.close()
+        # Cancel the stream explicitly, closing the channel does not always end a pending read.
+        if self._recv_stream is not None:
+            self._recv_stream.cancel()
         await self._connection_task
 
-    @staticmethod
-    async def _connect(  # type: ignore
-        channel: grpc.aio.Channel,
-        send_queue: asyncio.Queue[agent_worker_pb2.Message],
-        receive_queue: asyncio.Queue[agent_worker_pb2.Message],
+    async def _connect(
+        self,
+        message_batching: MessageBatchingConfig | None,
+        content_types: Sequence[str],
+        content_encodings: Sequence[str],
+        shared_memory_namespace: str,
     ) -> None:
-        stub: AgentRpcAsyncStub = agent_worker_pb2_grpc.AgentRpcStub(channel)  # type: ignore
-
-        # TODO: where do exceptions from reading the iterable go? How do we recover from those?
-        recv_stream: StreamStreamCall[agent_worker_pb2.Message, agent_worker_pb2.Message] = stub.OpenChannel(  # type: ignore
-            QueueAsyncIterable(send_queue)
-        )  # type: ignore
-
+        send_iterable = CoalescingQueueAsyncIterable(self._send_queue, message_batching)
+        metadata = [*batching_metadata(message_batching)]
+        if self._credit_grantor is not None:
+            metadata.extend(flow_control_metadata())
+        if content_types:
+            metadata.extend(content_types_metadata(content_types))
+        if content_encodings:
+            metadata.extend(content_encodings_metadata(content_encodings))
+        if shared_memory_namespace:
+            metadata.extend(shared_memory_metadata(shared_memory_namespace))
+        if self._reconnect is not None:
+            metadata.extend(session_metadata(self._session_id))
+
+        # The channels opened to the host, with the number of messages of the session the host received.
+        channels: asyncio.Queue[_OpenedChannel] = asyncio.Queue()  # type: ignore
+        self._send_task = send_task = asyncio.create_task(self._send_frames(send_iterable, channels))
+        failed_attempts = 0
+        try:
+            while True:
+                # Tell the host how many messages it sent were received, for it to send the others again.
+                channel_metadata = (
+                    [*metadata, *session_received_metadata(self._received)] if self._reconnect is not None else metadata
+                )
+                recv_stream: StreamStreamCall[agent_worker_pb2.Message, agent_worker_pb2.Message] = (  # type: ignore
+                    self._stub.OpenChannel(metadata=channel_metadata)  # type: ignore
+                )
+                self._recv_stream = recv_stream
+                try:
+                    # Only send batches and credits if the host acknowledged that it supports them.
+                    host_metadata = await recv_stream.initial_metadata()  # type: ignore
+                    if recv_stream.done():  # type: ignore
+                        # The channel did not open, and its metadata is empty. Reading raises the error.
+                        await recv_stream.read()  # type: ignore
+                    send_iterable.batching = supports_batching(host_metadata)  # type: ignore
+                    received = get_session_received(host_metadata)  # type: ignore
+                    if received is None:
+                        # The host started a new session.
+                        self._received = 0
+                    channels.put_nowait((recv_stream, received))
+                    if self._credit_grantor is not None and supports_flow_control(host_metadata):  # type: ignore
+                        self._credit_grantor.start()
+                    failed_attempts = 0
+
+                    while True:
+                        logger.info("Waiting for message from host")
+                        frame = await recv_stream.read()  # type: ignore
+                        if frame == grpc.aio.EOF:  # type: ignore
+                            logger.info("EOF")
+                            break
+                        for message in unpack_messages(cast(agent_worker_pb2.Message, frame)):
+                            logger.info("Received a message from host: %s", message)
+                            if is_replayable(message):
+                                self._received += 1
+                            await self._recv_queue.put(message)
+                            logger.info("Put message in receive queue")
+                except grpc.aio.AioRpcError as e:
+                    if self._reconnect is None or self._closing:
+                        raise
+                    logger.warning("The channel to the host broke: %s", e.details())
+                    failed_attempts += 1
+                if self._reconnect is None or self._closing:
+                    break
+                if self._reconnect.max_attempts is not None and failed_attempts > self._reconnect.max_attempts:
+                    logger.error("Failed to reconnect to the host after %d attempts.", self._reconnect.max_attempts)
+                    self._lose(f"Failed to reconnect to the host after {self._reconnect.max_attempts} attempts.")
+                    break
+                await asyncio.sleep(self._reconnect.backoff(max(failed_attempts - 1, 0)))
+                logger.info("Reconnecting to the host")
+        finally:
+            send_task.cancel()
+            if not self._closing and self._lost is None:
+                self._lose("The channel to the host closed.")
+
+    def _lose(self, reason: str) -> None:
+        # Reading and sending fail from now on, the runtime fails its pending requests once reading failed.
+        self._lost = reason
+        self._recv_queue.put_nowait(None)
+
+    async def _send_frames(  # type: ignore
+        self,
+        send_iterable: CoalescingQueueAsyncIterable,
+        channels: asyncio.Queue[_OpenedChannel],
+    ) -> None:
+        # A single task writes to every channel in turn, so that the messages of the session are sent in order and a
+        # message taken from the send queue when a channel broke is sent again on the next one.
         while True:
-            logger.info("Waiting for message from host")
-            message = await recv_stream.read()  # type: ignore
-            if message == grpc.aio.EOF:  # type: ignore
-                logger.info("EOF")
-                break
-            message = cast(agent_worker_pb2.Message, message)
-            logger.info(f"Received a message from host: {message}")
-            await receive_queue.put(message)
-            logger.info("Put message in receive queue")
+            send_stream, received = await channels.get()
+            try:
+                if self._replay_buffer is not None:
+                    if received is None:
+                        # The host started a new session, it does not know the agent types and subscriptions.
+                        self._replay_buffer.reset()
+                        for message in self._registrations:
+                            self._replay_buffer.append(message)
+                            await send_stream.write(message)  # type: ignore
+                    else:
+                        for message in self._replay_buffer.unreceived(received):
+                            await send_stream.write(message)  # type: ignore
+                async for frame in send_iterable:
+                    ended = self._replay_buffer is not None and self._record(cast(agent_worker_pb2.Message, frame))
+                    await send_stream.write(frame)  # type: ignore
+                    if ended:
+                        await send_stream.done_writing()  # type: ignore
+                        return
+            except (grpc.aio.AioRpcError, asyncio.InvalidStateError) as e:
+                logger.info("Stopped sending to the host on a broken channel: %s", e)
+
+    def _record(self, frame: agent_worker_pb2.Message) -> bool:
+        # Returns whether the frame ends the session.
+        assert self._replay_buffer is not None
+        ended = False
+        for message in unpack_messages(frame):
+            if is_replayable(message):
+                self._replay_buffer.append(message)
+            kind = message.WhichOneof("message")
+            if kind in ("registerAgentTypeRequest", "addSubscriptionRequest"):
+                self._registrations.append(message)
+            ended = ended or kind == "endSession"
+        return ended
+
+    def raise_if_lost(self) -> None:
+        """Raises :class:`ConnectionError` if the connection to the host was lost and is not reopened."""
+        if self._lost is not None:
+            raise ConnectionError(self._lost)
 
     async def send(self, message: agent_worker_pb2.Message) -> None:
-        logger.info(f"Send message to host: {message}")
+        self.raise_if_lost()
+        logger.info("Send message to host: %s", message)
         await self._send_queue.put(message)
         logger.info("Put message in send queue")
 
     async def recv(self) -> agent_worker_pb2.Message:
         logger.info("Getting message from queue")
-        return await self._recv_queue.get()
+        message = await self._recv_queue.get()
+        if message is None:
+            # Fail the next read too.
+            self._recv_queue.put_nowait(None)
+            raise ConnectionError(self._lost)
+        return message
+
+    async def get_states(
+        self, request: agent_worker_pb2.GetStatesRequest, timeout: float | None = None
+    ) -> agent_worker_pb2.GetStatesResponse:
+        return await self._stub.GetStates(request, timeout=timeout)  # type: ignore
+
+    async def save_states(
+        self, request: agent_worker_pb2.SaveStatesRequest, timeout: float | None = None
+    ) -> agent_worker_pb2.SaveStatesResponse:
+        return await self._stub.SaveStates(request, timeout=timeout)  # type: ignore
+
+    def release_credit(self) -> None:
+        """Signal that a request or event received from the host was processed."""
+        if self._credit_grantor is not None:
+            self._credit_grantor.release()
 
 
 class WorkerAgentRuntime(AgentRuntime):
@@ -172,25 +373,80 @@ def __init__(
         host_address: str,
         tracer_provider: TracerProvider | None = None,
         extra_grpc_config: ChannelArgumentType | None = None,
+        *,
+        max_cached_topics: int = SubscriptionManager.DEFAULT_MAX_CACHED_TOPICS,
+        passivation_policy: AgentPassivationPolicy | None = None,
+        tracing_sampling_ratio: float = 1.0,
+        message_batching: MessageBatchingConfig | None = DEFAULT_MESSAGE_BATCHING_CONFIG,
+        flow_control_window: int | None = None,
+        rpc_timeout: float | None = None,
+        preferred_content_type: str = JSON_DATA_CONTENT_TYPE,
+        payload_compression: PayloadCompressionConfig | None = None,
+        shared_memory: SharedMemoryConfig | None = None,
+        reconnect: ReconnectConfig | None = None,
     ) -> None:
+        if flow_control_window is not None and flow_control_window < 1:
+            raise ValueError("flow_control_window must be at least 1.")
+        if rpc_timeout is not None and rpc_timeout <= 0:
+            raise ValueError("rpc_timeout must be positive.")
         self._host_address = host_address
-        self._trace_helper = TraceHelper(tracer_provider, MessageRuntimeTracingConfig("Worker Runtime"))
+        self._trace_helper = TraceHelper(
+            tracer_provider, MessageRuntimeTracingConfig("Worker Runtime", tracing_sampling_ratio)
+        )
         self._per_type_subscribers: DefaultDict[tuple[str, str], Set[AgentId]] = defaultdict(set)
         self._agent_factories: Dict[
             str, Callable[[], Agent | Awaitable[Agent]] | Callable[[AgentRuntime, AgentId], Agent | Awaitable[Agent]]
         ] = {}
-        self._instantiated_agents: Dict[AgentId, Agent] = {}
+        self._instantiated_agents = AgentInstanceCache(passivation_policy)
         self._known_namespaces: set[str] = set()
         self._read_task: None | Task[None] = None
         self._running = False
         self._pending_requests: Dict[str, Future[Any]] = {}
-        self._pending_requests_lock = asyncio.Lock()
-        self._next_request_id = 0
+        # Request ids are unique across workers, as the host tracks pending responses by request id.
+        self._request_id_prefix = uuid.uuid4().hex[:12]
+        self._request_ids = count(1)
         self._host_connection: HostConnection | None = None
         self._background_tasks: Set[Task[Any]] = set()
-        self._subscription_manager = SubscriptionManager()
+        self._subscription_manager = SubscriptionManager(max_cached_topics=max_cached_topics)
         self._serialization_registry = SerializationRegistry()
         self._extra_grpc_config = extra_grpc_config or []
+        self._message_batching = message_batching
+        self._flow_control_window = flow_control_window
+        self._rpc_timeout = rpc_timeout
+        # Fails requests sent with `send_message` whose response did not arrive before their deadline.
+        self._request_deadlines = TimerWheel()
+        self._timed_out_requests = 0
+        # Payloads are serialized with the preferred content type only if every client connected to the host
+        # accepts it, as announced by the host. Otherwise they are serialized as JSON.
+        self._preferred_content_type = preferred_content_type
+        self._peer_content_types = DEFAULT_CONTENT_TYPES
+        # Payloads are only compressed once the host announced that every client can decompress them.
+        self._payload_compression = payload_compression
+        self._peer_content_encodings: FrozenSet[str] = frozenset()
+        # Large payloads are written to shared memory once the host announced that every client runs on this machine.
+        self._shared_memory = shared_memory
+        self._shared_memory_namespace = get_shared_memory_namespace()
+        self._peer_shared_memory_namespace = ""
+        self._shared_memory_segments = (
+            SharedMemorySegments(shared_memory.retention, shared_memory.max_bytes) if shared_memory else None
+        )
+        # Payloads are only decoded for agent classes with lazy deserialization if they declare handling their type.
+        # Otherwise, for example when the agent forwards them, they are passed as `UnknownPayload`.
+        self._agent_type_handled_types: Dict[str, FrozenSet[str]] = {}
+        # The eTag of the state of each agent as last saved to or restored from the host, so that saving a state
+        # fails if another runtime saved the state of the same agent since.
+        self._state_etags: Dict[AgentId, str] = {}
+        self._reconnect = reconnect
+
+    @property
+    def subscription_cache_stats(self) -> SubscriptionCacheStats:
+        """Statistics of the cache of subscribed recipients per topic."""
+        return self._subscription_manager.cache_stats
+
+    @property
+    def timed_out_requests(self) -> int:
+        """The number of requests sent with :meth:`send_message` that failed because their deadline passed."""
+        return self._timed_out_requests
 
     def start(self) -> None:
         """Start the runtime in a background task."""
@@ -198,7 +454,14 @@ def start(self) -> None:
             raise ValueError("Runtime is already running.")
         logger.info(f"Connecting to host: {self._host_address}")
         self._host_connection = HostConnection.from_host_address(
-            self._host_address, extra_grpc_config=self._extra_grpc_config
+            self._host_address,
+            extra_grpc_config=self._extra_grpc_config,
+            message_batching=self._message_batching,
+            flow_control_window=self._flow_control_window,
+            content_types=get_known_data_content_types(),
+            content_encodings=get_available_content_encodings(),
+            shared_memory_namespace=self._shared_memory_namespace,
+            reconnect=self._reconnect,
         )
         logger.info("Connection established")
         if self._read_task is None:
@@ -210,9 +473,12 @@ def _raise_on_exception(self, task: Task[Any]) -> None:
         if exception is not None:
             raise exception
 
+    def _release_credit(self, task: Task[Any]) -> None:
+        if self._host_connection is not None:
+            self._host_connection.release_credit()
+
     async def _run_read_loop(self) -> None:
         logger.info("Starting read loop")
-        # TODO: catch exceptions and reconnect
         while self._running:
             try:
                 message = await self._host_connection.recv()  # type: ignore
@@ -225,6 +491,7 @@ async def _run_read_loop(self) -> None:
                         self._background_tasks.add(task)
                         task.add_done_callback(self._raise_on_exception)
                         task.add_done_callback(self._background_tasks.discard)
+                        task.add_done_callback(self._release_credit)
                     case "response":
                         task = asyncio.create_task(self._process_response(message.response))
                         self._background_tasks.add(task)
@@ -235,6 +502,7 @@ async def _run_read_loop(self) -> None:
                         self._background_tasks.add(task)
                         task.add_done_callback(self._raise_on_exception)
                         task.add_done_callback(self._background_tasks.discard)
+                        task.add_done_callback(self._release_credit)
                     case "registerAgentTypeResponse":
                         task = asyncio.create_task(
                             self._process_register_agent_type_response(message.registerAgentTypeResponse)
@@ -249,23 +517,42 @@ async def _run_read_loop(self) -> None:
                         self._background_tasks.add(task)
                         task.add_done_callback(self._raise_on_exception)
                         task.add_done_callback(self._background_tasks.discard)
+                    case "contentTypes":
+                        self._peer_content_types = frozenset(message.contentTypes.content_types)
+                        self._peer_content_encodings = frozenset(message.contentTypes.content_encodings)
+                        self._peer_shared_memory_namespace = message.contentTypes.shared_memory_namespace
                     case None:
                         logger.warning("No message")
                     case other:
                         logger.error(f"Unknown message type: {other}")
+            except ConnectionError as e:
+                logger.error("Lost the connection to the host: %s", e)
+                self._fail_pending_requests(e)
+                break
             except Exception as e:
                 logger.error("Error in read loop", exc_info=e)
 
+    def _fail_pending_requests(self, error: ConnectionError) -> None:
+        # The responses to the pending requests will not arrive.
+        for request_id, future in self._pending_requests.items():
+            if not future.done():
+                future.set_exception(ConnectionError(f"Request {request_id} failed: {error}"))
+        self._pending_requests.clear()
+
     async def stop(self) -> None:
         """Stop the runtime immediately."""
         if not self._running:
             raise RuntimeError("Runtime is not running.")
         self._running = False
+        self._request_deadlines.close()
         # Wait for all background tasks to finish.
         final_tasks_results = await asyncio.gather(*self._background_tasks, return_exceptions=True)
         for task_result in final_tasks_results:
             if isinstance(task_result, Exception):
                 logger.error("Error in background task", exc_info=task_result)
+        # Unlink the shared memory segments, receivers that did not read them yet fail to.
+        if self._shared_memory_segments is not None:
+            self._shared_memory_segments.close()
         # Close the host connection.
         if self._host_connection is not None:
             try:
@@ -321,38 +608,46 @@ async def send_message(
         *,
         sender: AgentId | None = None,
         cancellation_token: CancellationToken | None = None,
+        timeout: float | None = None,
     ) -> Any:
+        """Send a message to an agent and wait for its response.
+
+        Args:
+            timeout (float, optional): The number of seconds to wait for the response before raising
+                :class:`TimeoutError`. Defaults to the ``rpc_timeout`` of the runtime, which waits forever if None.
+        """
         if not self._running:
             raise ValueError("Runtime must be running when sending message.")
+        if timeout is None:
+            timeout = self._rpc_timeout
+        elif timeout <= 0:
+            raise ValueError("timeout must be positive.")
         if self._host_connection is None:
             raise RuntimeError("Host connection is not set.")
+        self._host_connection.raise_if_lost()
         data_type = self._serialization_registry.type_name(message)
         with self._trace_helper.trace_block(
             "create", recipient, parent=None, extraAttributes={"message_type": data_type}
         ):
             # create a new future for the result
             future = asyncio.get_event_loop().create_future()
-            request_id = await self._get_new_request_id()
+            request_id = self._get_new_request_id()
             self._pending_requests[request_id] = future
-            serialized_message = self._serialization_registry.serialize(
-                message, type_name=data_type, data_content_type=JSON_DATA_CONTENT_TYPE
-            )
-            telemetry_metadata = get_telemetry_grpc_metadata()
+            if timeout is not None:
+                self._track_deadline(request_id, future, timeout)
+            telemetry_metadata = self._trace_helper.get_grpc_metadata()
+            payload = await self._serialize_payload(message, data_type)
             runtime_message = agent_worker_pb2.Message(
                 request=agent_worker_pb2.RpcRequest(
                     request_id=request_id,
                     target=agent_worker_pb2.AgentId(type=recipient.type, key=recipient.key),
                     source=agent_worker_pb2.AgentId(type=sender.type, key=sender.key) if sender is not None else None,
                     metadata=telemetry_metadata,
-                    payload=agent_worker_pb2.Payload(
-                        data_type=data_type,
-                        data=serialized_message,
-                        data_content_type=JSON_DATA_CONTENT_TYPE,
-                    ),
+                    payload=payload,
+                    timeout=timeout,
                 )
             )
 
-            # TODO: Find a way to handle timeouts/errors
             task = asyncio.create_task(self._send_message(runtime_message, "send", recipient, telemetry_metadata))
             self._background_tasks.add(task)
             task.add_done_callback(self._raise_on_exception)
@@ -371,25 +666,20 @@ async def publish_message(
             raise ValueError("Runtime must be running when publishing message.")
         if self._host_connection is None:
             raise RuntimeError("Host connection is not set.")
+        self._host_connection.raise_if_lost()
         message_type = self._serialization_registry.type_name(message)
         with self._trace_helper.trace_block(
             "create", topic_id, parent=None, extraAttributes={"message_type": message_type}
         ):
-            serialized_message = self._serialization_registry.serialize(
-                message, type_name=message_type, data_content_type=JSON_DATA_CONTENT_TYPE
-            )
-            telemetry_metadata = get_telemetry_grpc_metadata()
+            telemetry_metadata = self._trace_helper.get_grpc_metadata()
+            payload = await self._serialize_payload(message, message_type)
             runtime_message = agent_worker_pb2.Message(
                 event=agent_worker_pb2.Event(
                     topic_type=topic_id.type,
                     topic_source=topic_id.source,
                     source=agent_worker_pb2.AgentId(type=sender.type, key=sender.key) if sender is not None else None,
                     metadata=telemetry_metadata,
-                    payload=agent_worker_pb2.Payload(
-                        data_type=message_type,
-                        data=serialized_message,
-                        data_content_type=JSON_DATA_CONTENT_TYPE,
-                    ),
+                    payload=payload,
                 )
             )
 
@@ -399,24 +689,162 @@ async def publish_message(
             task.add_done_callback(self._background_tasks.discard)
 
     async def save_state(self) -> Mapping[str, Any]:
-        raise NotImplementedError("Saving state is not yet implemented.")
+        """Save the state of the agents instantiated or passivated in this runtime. Use :meth:`checkpoint` to save it
+        on the host."""
+        state: Dict[str, Dict[str, Any]] = {}
+        for agent_id in self._instantiated_agents.known_agents():
+            agent_state = await self._instantiated_agents.saved_state(agent_id)
+            if agent_state is not None:
+                state[str(agent_id)] = dict(agent_state)
+        return state
 
     async def load_state(self, state: Mapping[str, Any]) -> None:
-        raise NotImplementedError("Loading state is not yet implemented.")
+        """Load the state of the agents whose type is registered with this runtime."""
+        for agent_id_str in state:
+            agent_id = AgentId.from_str(agent_id_str)
+            if agent_id.type in self._known_agent_names:
+                (await self._get_agent(agent_id)).load_state(state[str(agent_id)])
 
     async def agent_metadata(self, agent: AgentId) -> AgentMetadata:
-        raise NotImplementedError("Agent metadata is not yet implemented.")
+        return (await self._get_agent(agent)).metadata
 
     async def agent_save_state(self, agent: AgentId) -> Mapping[str, Any]:
-        raise NotImplementedError("Agent save_state is not yet implemented.")
+        return (await self._get_agent(agent)).save_state()
 
     async def agent_load_state(self, agent: AgentId, state: Mapping[str, Any]) -> None:
-        raise NotImplementedError("Agent load_state is not yet implemented.")
+        (await self._get_agent(agent)).load_state(state)
+
+    async def checkpoint(self, agent_ids: Sequence[AgentId] | None = None) -> None:
+        """Save the states of agents to the state store of the host, all of them in one call.
+
+        Args:
+            agent_ids (Sequence[AgentId], optional): The agents to save the states of. Defaults to the agents
+                instantiated or passivated in this runtime.
 
-    async def _get_new_request_id(self) -> str:
-        async with self._pending_requests_lock:
-            self._next_request_id += 1
-            return str(self._next_request_id)
+        Raises:
+            RuntimeError: If the host did not save the states, none of them are saved then. For example because
+                another runtime saved the state of one of the agents since this runtime last saved or restored it.
+        """
+        if self._host_connection is None:
+            raise RuntimeError("Host connection is not set.")
+        if agent_ids is None:
+            agent_ids = self._instantiated_agents.known_agents()
+        request = agent_worker_pb2.SaveStatesRequest()
+        for agent_id in agent_ids:
+            # Passivated agents are saved from their stored state, without activating them.
+            state = await self._instantiated_agents.saved_state(agent_id)
+            if state is None:
+                state = (await self._get_agent(agent_id)).save_state()
+            request.agent_states.add(
+                agent_id=agent_worker_pb2.AgentId(type=agent_id.type, key=agent_id.key),
+                eTag=self._state_etags.get(agent_id, ""),
+                text_data=json.dumps(dict(state)),
+            )
+        response = await self._host_connection.save_states(request, timeout=self._rpc_timeout)
+        if not response.success:
+            raise RuntimeError(f"Failed to save the agent states: {response.error}")
+        for agent_id, etag in zip(agent_ids, response.eTags, strict=True):
+            self._state_etags[agent_id] = etag
+
+    async def restore(self, agent_ids: Sequence[AgentId]) -> None:
+        """Load the states of agents from the state store of the host, all of them in one call.
+
+        The agents are instantiated if needed. Agents without a saved state are left as they are.
+
+        Args:
+            agent_ids (Sequence[AgentId]): The agents to load the states of.
+        """
+        if self._host_connection is None:
+            raise RuntimeError("Host connection is not set.")
+        response = await self._host_connection.get_states(
+            agent_worker_pb2.GetStatesRequest(
+                agent_ids=[agent_worker_pb2.AgentId(type=agent_id.type, key=agent_id.key) for agent_id in agent_ids]
+            ),
+            timeout=self._rpc_timeout,
+        )
+        if not response.success:
+            raise RuntimeError(f"Failed to get the agent states: {response.error}")
+        for agent_state in response.agent_states:
+            agent_id = AgentId(agent_state.agent_id.type, agent_state.agent_id.key)
+            if agent_state.WhichOneof("data") != "text_data":
+                raise ValueError(f"The state of {agent_id} was not saved by a Python runtime.")
+            (await self._get_agent(agent_id)).load_state(json.loads(agent_state.text_data))
+            self._state_etags[agent_id] = agent_state.eTag
+
+    def _get_data_content_type(self, type_name: str) -> str:
+        # Protobuf messages are sent in their wire format, which every runtime that knows the type can read.
+        if self._serialization_registry.is_registered(type_name, PROTOBUF_DATA_CONTENT_TYPE):
+            return PROTOBUF_DATA_CONTENT_TYPE
+        if self._preferred_content_type in self._peer_content_types and self._serialization_registry.is_registered(
+            type_name, self._preferred_content_type
+        ):
+            return self._preferred_content_type
+        return JSON_DATA_CONTENT_TYPE
+
+    async def _serialize_payload(self, message: Any, type_name: str) -> agent_worker_pb2.Payload:
+        if isinstance(message, UnknownPayload):
+            # A payload forwarded without decoding it is sent as it was received.
+            data_content_type = message.data_content_type
+        else:
+            data_content_type = self._get_data_content_type(type_name)
+        data = self._serialization_registry.serialize(message, type_name=type_name, data_content_type=data_content_type)
+        if (
+            self._shared_memory is not None
+            and self._shared_memory_segments is not None
+            and len(data) >= self._shared_memory.threshold
+            and self._peer_shared_memory_namespace == self._shared_memory_namespace
+        ):
+            # Only the handle of the segment is sent over gRPC, compressing the data would not save any copies. The
+            # payload is sent inline if there is no room for the segment.
+            shared_memory = self._shared_memory_segments.write(data)
+            if shared_memory is not None:
+                return agent_worker_pb2.Payload(
+                    data_type=type_name,
+                    data_content_type=data_content_type,
+                    shared_memory=shared_memory,
+                )
+        content_encoding = ""
+        compression = self._payload_compression
+        if (
+            compression is not None
+            and len(data) >= compression.threshold
+            and compression.algorithm in self._peer_content_encodings
+        ):
+            if compression.offload_threshold is not None and len(data) >= compression.offload_threshold:
+                # Large payloads take milliseconds to compress, which would hold up the other agents of the runtime.
+                compressed = await asyncio.to_thread(compress, data, compression.algorithm, compression.level)
+            else:
+                compressed = compress(data, compression.algorithm, compression.level)
+            # Incompressible payloads are sent as is, so the receiver does not pay for decompressing them.
+            if len(compressed) < len(data):
+                data = compressed
+                content_encoding = compression.algorithm
+        return agent_worker_pb2.Payload(
+            data_type=type_name,
+            data=data,
+            data_content_type=data_content_type,
+            content_encoding=content_encoding,
+        )
+
+    def _deserialize_payload(self, payload: agent_worker_pb2.Payload, recipient_type: str | None = None) -> Any:
+        data = payload.data
+        if payload.HasField("shared_memory"):
+            data = read_shared_memory(payload.shared_memory)
+        if payload.content_encoding:
+            data = decompress(data, payload.content_encoding)
+        if recipient_type is not None and not self._decodes_for(recipient_type, payload.data_type):
+            return UnknownPayload(payload.data_type, payload.data_content_type, data)
+        return self._serialization_registry.deserialize(
+            data, type_name=payload.data_type, data_content_type=payload.data_content_type
+        )
+
+    def _decodes_for(self, agent_type: str, type_name: str) -> bool:
+        handled_types = self._agent_type_handled_types.get(agent_type)
+        return handled_types is None or type_name in handled_types
+
+    def _get_new_request_id(self) -> str:
+        # No lock is needed, the counter is only advanced from the event loop.
+        return f"{self._request_id_prefix}-{next(self._request_ids)}"
 
     async def _process_request(self, request: agent_worker_pb2.RpcRequest) -> None:
         assert self._host_connection is not None
@@ -424,16 +852,9 @@ async def _process_request(self, request: agent_worker_pb2.RpcRequest) -> None:
         sender: AgentId | None = None
         if request.HasField("source"):
             sender = AgentId(request.source.type, request.source.key)
-            logging.info(f"Processing request from {sender} to {recipient}")
+            logger.info("Processing request from %s to %s", sender, recipient)
         else:
-            logging.info(f"Processing request from unknown source to {recipient}")
-
-        # Deserialize the message.
-        message = self._serialization_registry.deserialize(
-            request.payload.data,
-            type_name=request.payload.data_type,
-            data_content_type=request.payload.data_content_type,
-        )
+            logger.info("Processing request from unknown source to %s", recipient)
 
         # Get the receiving agent and prepare the message context.
         rec_agent = await self._get_agent(recipient)
@@ -444,9 +865,11 @@ async def _process_request(self, request: agent_worker_pb2.RpcRequest) -> None:
             cancellation_token=CancellationToken(),
         )
 
-        # Call the receiving agent.
+        # Deserialize the message and call the receiving agent, a message that cannot be deserialized fails the
+        # request.
         try:
-            with MessageHandlerContext.populate_context(rec_agent.id):
+            message = self._deserialize_payload(request.payload, recipient.type)
+            with self._instantiated_agents.in_use(recipient), MessageHandlerContext.populate_context(rec_agent.id):
                 with self._trace_helper.trace_block(
                     "process",
                     rec_agent.id,
@@ -460,7 +883,7 @@ async def _process_request(self, request: agent_worker_pb2.RpcRequest) -> None:
                 response=agent_worker_pb2.RpcResponse(
                     request_id=request.request_id,
                     error=str(e),
-                    metadata=get_telemetry_grpc_metadata(),
+                    metadata=self._trace_helper.get_grpc_metadata(),
                 ),
             )
             # Send the error response.
@@ -469,20 +892,14 @@ async def _process_request(self, request: agent_worker_pb2.RpcRequest) -> None:
 
         # Serialize the result.
         result_type = self._serialization_registry.type_name(result)
-        serialized_result = self._serialization_registry.serialize(
-            result, type_name=result_type, data_content_type=JSON_DATA_CONTENT_TYPE
-        )
+        payload = await self._serialize_payload(result, result_type)
 
         # Create the response message.
         response_message = agent_worker_pb2.Message(
             response=agent_worker_pb2.RpcResponse(
                 request_id=request.request_id,
-                payload=agent_worker_pb2.Payload(
-                    data_type=result_type,
-                    data=serialized_result,
-                    data_content_type=JSON_DATA_CONTENT_TYPE,
-                ),
-                metadata=get_telemetry_grpc_metadata(),
+                payload=payload,
+                metadata=self._trace_helper.get_grpc_metadata(),
             )
         )
 
@@ -497,59 +914,82 @@ async def _process_response(self, response: agent_worker_pb2.RpcResponse) -> Non
             attributes={"request_id": response.request_id},
             extraAttributes={"message_type": response.payload.data_type},
         ):
-            # Deserialize the result.
-            result = self._serialization_registry.deserialize(
-                response.payload.data,
-                type_name=response.payload.data_type,
-                data_content_type=response.payload.data_content_type,
-            )
-            # Get the future and set the result.
-            future = self._pending_requests.pop(response.request_id)
+            # Get the future, unless the request already timed out.
+            future = self._pending_requests.pop(response.request_id, None)
+            if future is None or future.done():
+                logger.warning("Received a response to request %s, which is no longer pending.", response.request_id)
+                return
+            # Set the error or the deserialized result.
             if len(response.error) > 0:
                 future.set_exception(Exception(response.error))
-            else:
-                future.set_result(result)
+                return
+            try:
+                future.set_result(self._deserialize_payload(response.payload))
+            except Exception as e:
+                future.set_exception(e)
+
+    def _track_deadline(self, request_id: str, future: Future[Any], timeout: float) -> None:
+        def expire() -> None:
+            self._pending_requests.pop(request_id, None)
+            if not future.done():
+                self._timed_out_requests += 1
+                future.set_exception(TimeoutError(f"Request {request_id} timed out after {timeout} seconds."))
+
+        handle = self._request_deadlines.schedule(timeout, expire)
+        future.add_done_callback(lambda _: handle.cancel())
 
     async def _process_event(self, event: agent_worker_pb2.Event) -> None:
-        message = self._serialization_registry.deserialize(
-            event.payload.data, type_name=event.payload.data_type, data_content_type=event.payload.data_content_type
-        )
+        # The payload is decoded at most once, and with lazy deserialization only if a recipient handles its type.
+        messages: Dict[bool, Any] = {}
         sender: AgentId | None = None
         if event.HasField("source"):
             sender = AgentId(event.source.type, event.source.key)
         topic_id = TopicId(event.topic_type, event.topic_source)
         # Get the recipients for the topic.
         recipients = await self._subscription_manager.get_subscribed_recipients(topic_id)
+        if event.recipient_types:
+            # The agent type is served by several workers, and the other recipients are served by other workers.
+            recipients = [agent_id for agent_id in recipients if agent_id.type in event.recipient_types]
         # Send the message to each recipient.
         responses: List[Awaitable[Any]] = []
-        for agent_id in recipients:
-            if agent_id == sender:
-                continue
-            message_context = MessageContext(
-                sender=sender,
-                topic_id=topic_id,
-                is_rpc=False,
-                cancellation_token=CancellationToken(),
-            )
-            agent = await self._get_agent(agent_id)
-            with MessageHandlerContext.populate_context(agent.id):
-
-                async def send_message(agent: Agent, message_context: MessageContext) -> Any:
-                    with self._trace_helper.trace_block(
-                        "process",
-                        agent.id,
-                        parent=event.metadata,
-                        extraAttributes={"message_type": event.payload.data_type},
-                    ):
-                        await agent.on_message(message, ctx=message_context)
-
-                future = send_message(agent, message_context)
-            responses.append(future)
-        # Wait for all responses.
-        try:
-            await asyncio.gather(*responses)
-        except BaseException as e:
-            logger.error("Error handling event", exc_info=e)
+        with ExitStack() as agents_in_use:
+            for agent_id in recipients:
+                if agent_id == sender:
+                    continue
+                message_context = MessageContext(
+                    sender=sender,
+                    topic_id=topic_id,
+                    is_rpc=False,
+                    cancellation_token=CancellationToken(),
+                )
+                decode = self._decodes_for(agent_id.type, event.payload.data_type)
+                if decode not in messages:
+                    try:
+                        messages[decode] = self._deserialize_payload(event.payload, agent_id.type)
+                    except Exception as e:
+                        logger.error("Failed to deserialize event for %s", agent_id, exc_info=e)
+                        continue
+                agent = await self._get_agent(agent_id)
+                # Keep the recipients alive until they have handled the message.
+                agents_in_use.enter_context(self._instantiated_agents.in_use(agent_id))
+                with MessageHandlerContext.populate_context(agent.id):
+
+                    async def send_message(agent: Agent, message: Any, message_context: MessageContext) -> Any:
+                        with self._trace_helper.trace_block(
+                            "process",
+                            agent.id,
+                            parent=event.metadata,
+                            extraAttributes={"message_type": event.payload.data_type},
+                        ):
+                            await agent.on_message(message, ctx=message_context)
+
+                    future = send_message(agent, messages[decode], message_context)
+                responses.append(future)
+            # Wait for all responses.
+            try:
+                await asyncio.gather(*responses)
+            except BaseException as e:
+                logger.error("Error handling event", exc_info=e)
 
     @deprecated(
         "Use your agent's `register` method directly instead of this method. See documentation for latest usage."
@@ -571,7 +1011,7 @@ async def register(
 
         # Create a future for the registration response.
         future = asyncio.get_event_loop().create_future()
-        request_id = await self._get_new_request_id()
+        request_id = self._get_new_request_id()
         self._pending_requests[request_id] = future
 
         # Send the registration request message to the host.
@@ -624,10 +1064,16 @@ async def factory_wrapper() -> T:
             return agent_instance
 
         self._agent_factories[type.type] = factory_wrapper
+        if issubclass(expected_class, BaseAgent) and expected_class.lazy_deserialization:
+            self._agent_type_handled_types[type.type] = frozenset(
+                serializer.type_name
+                for _, serializers in expected_class._handles_types()  # type: ignore[reportPrivateUsage]
+                for serializer in serializers
+            )
 
         # Create a future for the registration response.
         future = asyncio.get_event_loop().create_future()
-        request_id = await self._get_new_request_id()
+        request_id = self._get_new_request_id()
         self._pending_requests[request_id] = future
 
         # Send the registration request message to the host.
@@ -642,7 +1088,12 @@ async def factory_wrapper() -> T:
         return type
 
     async def _process_register_agent_type_response(self, response: agent_worker_pb2.RegisterAgentTypeResponse) -> None:
-        future = self._pending_requests.pop(response.request_id)
+        future = self._pending_requests.pop(response.request_id, None)
+        if future is None:
+            # The agent type was registered again after reconnecting.
+            if response.HasField("error"):
+                logger.error("Failed to register an agent type again after reconnecting: %s", response.error)
+            return
         if response.HasField("error"):
             future.set_exception(RuntimeError(response.error))
         else:
@@ -673,15 +1124,16 @@ async def _invoke_agent_factory(
         return agent
 
     async def _get_agent(self, agent_id: AgentId) -> Agent:
-        if agent_id in self._instantiated_agents:
-            return self._instantiated_agents[agent_id]
+        agent = self._instantiated_agents.get(agent_id)
+        if agent is None:
+            if agent_id.type not in self._agent_factories:
+                raise ValueError(f"Agent with name {agent_id.type} not found.")
 
-        if agent_id.type not in self._agent_factories:
-            raise ValueError(f"Agent with name {agent_id.type} not found.")
+            agent_factory = self._agent_factories[agent_id.type]
+            agent = await self._invoke_agent_factory(agent_factory, agent_id)
+            await self._instantiated_agents.activate(agent_id, agent)
 
-        agent_factory = self._agent_factories[agent_id.type]
-        agent = await self._invoke_agent_factory(agent_factory, agent_id)
-        self._instantiated_agents[agent_id] = agent
+        await self._instantiated_agents.passivate(keep=agent_id)
         return agent
 
     # TODO: uncomment out the following type ignore when this is fixed in mypy: https://github.com/python/mypy/issues/3737
@@ -707,7 +1159,7 @@ async def add_subscription(self, subscription: Subscription) -> None:
 
         # Create a future for the subscription response.
         future = asyncio.get_event_loop().create_future()
-        request_id = await self._get_new_request_id()
+        request_id = self._get_new_request_id()
         self._pending_requests[request_id] = future
 
         # Send the subscription to the host.
@@ -727,7 +1179,12 @@ async def add_subscription(self, subscription: Subscription) -> None:
         await future
 
     async def _process_add_subscription_response(self, response: agent_worker_pb2.AddSubscriptionResponse) -> None:
-        future = self._pending_requests.pop(response.request_id)
+        future = self._pending_requests.pop(response.request_id, None)
+        if future is None:
+            # The subscription was added again after reconnecting.
+            if response.HasField("error"):
+                logger.error("Failed to add a subscription again after reconnecting: %s", response.error)
+            return
         if response.HasField("error"):
             future.set_exception(RuntimeError(response.error))
         else:
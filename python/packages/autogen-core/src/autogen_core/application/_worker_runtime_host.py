@@ -1,27 +1,67 @@
 import asyncio
 import logging
 import signal
-from typing import Optional, Sequence
+from typing import Dict, Optional, Sequence
 
 import grpc
 
 from autogen_core.base._type_helpers import ChannelArgumentType
 
-from ._worker_runtime_host_servicer import WorkerAgentRuntimeHostServicer
-from .protos import agent_worker_pb2_grpc
+from ._flow_control import SendQueueOverflowPolicy, SendQueueStats
+from ._helpers import SubscriptionCacheStats, SubscriptionManager
+from ._host_state_store import HostStateStore
+from ._message_batching import DEFAULT_MESSAGE_BATCHING_CONFIG, MessageBatchingConfig
+from ._worker_runtime_host_servicer import WorkerAgentRuntimeHostServicer, add_servicer_to_server
 
 logger = logging.getLogger("autogen_core")
 
 
 class WorkerAgentRuntimeHost:
-    def __init__(self, address: str, extra_grpc_config: Optional[ChannelArgumentType] = None) -> None:
+    def __init__(
+        self,
+        address: str,
+        extra_grpc_config: Optional[ChannelArgumentType] = None,
+        *,
+        max_cached_topics: int = SubscriptionManager.DEFAULT_MAX_CACHED_TOPICS,
+        message_batching: MessageBatchingConfig | None = DEFAULT_MESSAGE_BATCHING_CONFIG,
+        max_send_queue_size: int | None = None,
+        send_queue_overflow_policy: SendQueueOverflowPolicy = "block",
+        rpc_timeout: float | None = None,
+        state_store: HostStateStore | None = None,
+        session_retention: float = 60.0,
+        session_replay_buffer_size: int = 1000,
+    ) -> None:
         self._server = grpc.aio.server(options=extra_grpc_config)
-        self._servicer = WorkerAgentRuntimeHostServicer()
-        agent_worker_pb2_grpc.add_AgentRpcServicer_to_server(self._servicer, self._server)
+        self._servicer = WorkerAgentRuntimeHostServicer(
+            max_cached_topics=max_cached_topics,
+            message_batching=message_batching,
+            max_send_queue_size=max_send_queue_size,
+            send_queue_overflow_policy=send_queue_overflow_policy,
+            rpc_timeout=rpc_timeout,
+            state_store=state_store,
+            session_retention=session_retention,
+            session_replay_buffer_size=session_replay_buffer_size,
+        )
+        add_servicer_to_server(self._servicer, self._server)
         self._server.add_insecure_port(address)
         self._address = address
         self._serve_task: asyncio.Task[None] | None = None
 
+    @property
+    def subscription_cache_stats(self) -> SubscriptionCacheStats:
+        """Statistics of the host's cache of subscribed recipients per topic."""
+        return self._servicer.subscription_cache_stats
+
+    @property
+    def send_queue_stats(self) -> Dict[int, SendQueueStats]:
+        """Statistics of the send queue of each connected worker, by client id."""
+        return self._servicer.send_queue_stats
+
+    @property
+    def timed_out_requests(self) -> int:
+        """The number of requests between workers that failed because the response did not arrive in time."""
+        return self._servicer.timed_out_requests
+
     async def _serve(self) -> None:
         await self._server.start()
         logger.info(f"Server started at {self._address}.")
@@ -38,6 +78,7 @@ async def stop(self, grace: int = 5) -> None:
         if self._serve_task is None:
             raise RuntimeError("Host runtime is not started.")
         await self._server.stop(grace=grace)
+        self._servicer.close()
         self._serve_task.cancel()
         try:
             await self._serve_task
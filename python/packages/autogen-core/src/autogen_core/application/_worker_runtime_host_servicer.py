@@ -1,143 +1,501 @@
 import asyncio
+import functools
 import logging
 from _collections_abc import AsyncIterator, Iterator
 from asyncio import Future, Task
-from typing import Any, Dict, Set
+from typing import Any, Dict, FrozenSet, List, Set, Tuple
 
 import grpc
+from google.protobuf.message_factory import GetMessageClass
 
-from ..base import TopicId
+from ..base import AgentId, TopicId
 from ..components import TypeSubscription
-from ._helpers import SubscriptionManager
+from ._consistent_hashing import ConsistentHashRing
+from ._content_types import (
+    DEFAULT_CONTENT_TYPES,
+    common_content_encodings,
+    common_content_types,
+    get_content_encodings,
+    get_content_types,
+)
+from ._flow_control import (
+    SendQueue,
+    SendQueueClosedError,
+    SendQueueOverflowPolicy,
+    SendQueueStats,
+    flow_control_metadata,
+    is_flow_controlled,
+    supports_flow_control,
+)
+from ._helpers import SubscriptionCacheStats, SubscriptionManager
+from ._host_state_store import AgentStateUpdate, ETagMismatchError, HostStateStore, InMemoryHostStateStore
+from ._message_batching import (
+    DEFAULT_MESSAGE_BATCHING_CONFIG,
+    CoalescingQueueAsyncIterable,
+    MessageBatchingConfig,
+    OutgoingMessage,
+    SerializedMessage,
+    batching_metadata,
+    message_kind,
+    serialize_frame,
+    supports_batching,
+    unpack_messages,
+)
+from ._reconnect import (
+    ClientSession,
+    ReplayBuffer,
+    get_session_id,
+    get_session_received,
+    is_replayable,
+    session_received_metadata,
+)
+from ._shared_memory import common_shared_memory_namespace, get_shared_memory_namespace_from_metadata
+from ._timer_wheel import TimerWheel
 from .protos import agent_worker_pb2, agent_worker_pb2_grpc
 
 logger = logging.getLogger("autogen_core")
 event_logger = logging.getLogger("autogen_core.events")
 
 
+_RPC_METHOD_HANDLERS = {
+    (False, False): grpc.unary_unary_rpc_method_handler,
+    (False, True): grpc.unary_stream_rpc_method_handler,
+    (True, False): grpc.stream_unary_rpc_method_handler,
+    (True, True): grpc.stream_stream_rpc_method_handler,
+}
+
+
+def add_servicer_to_server(servicer: agent_worker_pb2_grpc.AgentRpcServicer, server: grpc.aio.Server) -> None:  # type: ignore
+    """Like :func:`agent_worker_pb2_grpc.add_AgentRpcServicer_to_server`, but responses may also be frames that are
+    already serialized, so a message fanned out to several clients is serialized once.
+
+    :class:`WorkerAgentRuntimeHostServicer` must be registered with this function, the generated one cannot serialize
+    the frames it yields. The method handlers are derived from the ``AgentRpc`` service descriptor, so RPCs added to
+    ``agent_worker.proto`` are registered without changes here.
+    """
+    service = agent_worker_pb2.DESCRIPTOR.services_by_name["AgentRpc"]
+    rpc_method_handlers = {
+        method.name: _RPC_METHOD_HANDLERS[(method.client_streaming, method.server_streaming)](
+            getattr(servicer, method.name),
+            request_deserializer=GetMessageClass(method.input_type).FromString,
+            response_serializer=serialize_frame,
+        )
+        for method in service.methods
+    }
+    generic_handler = grpc.method_handlers_generic_handler(service.full_name, rpc_method_handlers)
+    server.add_generic_rpc_handlers((generic_handler,))
+
+
+def _describe_frame(frame: agent_worker_pb2.Message | bytes) -> str:
+    if isinstance(frame, bytes):
+        return f"serialized frame of {len(frame)} bytes"
+    return f"{frame.WhichOneof('message')} of {frame.ByteSize()} bytes"
+
+
 class WorkerAgentRuntimeHostServicer(agent_worker_pb2_grpc.AgentRpcServicer):
-    """A gRPC servicer that hosts message delivery service for agents."""
+    """A gRPC servicer that hosts message delivery service for agents. Register it with
+    :func:`add_servicer_to_server`, not with the generated ``add_AgentRpcServicer_to_server``.
+
+    Args:
+        max_cached_topics (int, optional): The maximum number of topics whose subscribed recipients are cached.
+            Least recently used topics are evicted first. Defaults to 10000.
+        message_batching (MessageBatchingConfig, optional): How messages sent to clients that accept batches are
+            packed into frames. Set to None to send one message per frame to every client.
+        max_send_queue_size (int, optional): The maximum number of requests and events queued for each client.
+            Defaults to None, for unbounded queues.
+        send_queue_overflow_policy (SendQueueOverflowPolicy, optional): What to do when a client's send queue is
+            full: ``"block"`` the delivery until there is room, ``"drop_oldest"`` queued message, or
+            ``"disconnect"`` the client. Only applies when ``max_send_queue_size`` is set. Defaults to ``"block"``.
+        rpc_timeout (float, optional): The number of seconds to wait for the response to a request that does not
+            carry its own timeout, after which the sender receives an error response. Defaults to None, waiting forever.
+        state_store (HostStateStore, optional): Where the states saved with the ``SaveState`` and ``SaveStates``
+            RPCs are kept. Defaults to an :class:`InMemoryHostStateStore`.
+        session_retention (float, optional): The number of seconds a client that advertised a session is kept after
+            its channel broke, for it to reconnect. Defaults to 60.
+        session_replay_buffer_size (int, optional): The number of the last messages sent to a client that advertised
+            a session that are kept to be sent again when it reconnects. Messages sent before those are lost if the
+            client did not receive them. Defaults to 1000.
 
-    def __init__(self) -> None:
+    With bounded send queues, the host reads at most ``max_send_queue_size`` requests and events ahead from each
+    client while their deliveries wait for room, so that a client sending faster than the recipients keep up is
+    held back instead of growing the host's memory.
+
+    Clients that advertise flow control grant the host credits over the channel. Requests and events are only
+    sent to such a client while it has credits left, so a busy client holds messages back in its send queue.
+
+    An agent type can be registered by several clients to spread its agents across them. Requests and events
+    for an agent are routed by consistent hashing on the agent key, so all messages for the same agent go to the
+    same client, and only the agents of a joining or leaving client move to another client. Clients serving the
+    same agent type are expected to add the same subscriptions for it.
+
+    Clients advertise the payload content types they accept when opening the channel. The host tells those clients
+    which content types every connected client accepts, so that payloads are only serialized in a content type other
+    than JSON when all recipients can deserialize it.
+
+    Clients that advertise a session when opening the channel resume it when they reconnect after the channel broke.
+    Until then, the host keeps their agent types and subscriptions, and queues the messages for them. When they
+    reconnect, the host tells them how many messages of the session it received, so that they send the others again,
+    and they tell the host how many messages they received, so that it sends the others again.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_cached_topics: int = SubscriptionManager.DEFAULT_MAX_CACHED_TOPICS,
+        message_batching: MessageBatchingConfig | None = DEFAULT_MESSAGE_BATCHING_CONFIG,
+        max_send_queue_size: int | None = None,
+        send_queue_overflow_policy: SendQueueOverflowPolicy = "block",
+        rpc_timeout: float | None = None,
+        state_store: HostStateStore | None = None,
+        session_retention: float = 60.0,
+        session_replay_buffer_size: int = 1000,
+    ) -> None:
+        if max_send_queue_size is not None and max_send_queue_size < 1:
+            raise ValueError("max_send_queue_size must be at least 1.")
+        if rpc_timeout is not None and rpc_timeout <= 0:
+            raise ValueError("rpc_timeout must be positive.")
+        if session_retention <= 0:
+            raise ValueError("session_retention must be positive.")
+        if session_replay_buffer_size < 1:
+            raise ValueError("session_replay_buffer_size must be at least 1.")
         self._client_id = 0
         self._client_id_lock = asyncio.Lock()
-        self._send_queues: Dict[int, asyncio.Queue[agent_worker_pb2.Message]] = {}
-        self._agent_type_to_client_id_lock = asyncio.Lock()
-        self._agent_type_to_client_id: Dict[str, int] = {}
+        self._send_queues: Dict[int, SendQueue] = {}
+        self._agent_type_to_clients_lock = asyncio.Lock()
+        self._agent_type_to_clients: Dict[str, ConsistentHashRing] = {}
         self._pending_responses: Dict[int, Dict[str, Future[Any]]] = {}
         self._background_tasks: Set[Task[Any]] = set()
-        self._subscription_manager = SubscriptionManager()
+        self._subscription_manager = SubscriptionManager(max_cached_topics=max_cached_topics)
         self._client_id_to_subscription_id_mapping: Dict[int, set[str]] = {}
+        # (topic type, agent type) -> id of the type subscription, which clients serving the same agent type share.
+        self._type_subscription_ids: Dict[Tuple[str, str], str] = {}
+        self._message_batching = message_batching
+        self._max_send_queue_size = max_send_queue_size
+        self._send_queue_overflow_policy: SendQueueOverflowPolicy = send_queue_overflow_policy
+        self._rpc_timeout = rpc_timeout
+        self._request_deadlines = TimerWheel()
+        self._timed_out_requests = 0
+        # Content types and encodings accepted by each client, and the clients that advertised them and are told
+        # about changes. Payloads are passed through as is, so only the clients need to agree on them.
+        self._client_content_types: Dict[int, FrozenSet[str]] = {}
+        self._client_content_encodings: Dict[int, FrozenSet[str]] = {}
+        self._client_shared_memory_namespaces: Dict[int, str] = {}
+        self._content_types_client_ids: Set[int] = set()
+        self._common_content_types = DEFAULT_CONTENT_TYPES
+        self._common_content_encodings: FrozenSet[str] = frozenset()
+        self._common_shared_memory_namespace = ""
+        self._state_store = state_store if state_store is not None else InMemoryHostStateStore()
+        self._session_retention = session_retention
+        self._sessions: Dict[str, ClientSession] = {}
+        self._session_expirations = TimerWheel(tick=min(1.0, session_retention))
+        self._session_replay_buffer_size = session_replay_buffer_size
+
+    @property
+    def subscription_cache_stats(self) -> SubscriptionCacheStats:
+        """Statistics of the cache of subscribed recipients per topic."""
+        return self._subscription_manager.cache_stats
+
+    @property
+    def send_queue_stats(self) -> Dict[int, SendQueueStats]:
+        """Statistics of the send queue of each connected client, by client id."""
+        return {client_id: send_queue.stats for client_id, send_queue in self._send_queues.items()}
+
+    @property
+    def timed_out_requests(self) -> int:
+        """The number of requests that failed because the response did not arrive before their deadline."""
+        return self._timed_out_requests
+
+    def close(self) -> None:
+        """Stop failing pending requests whose deadline passed, and expiring sessions."""
+        self._request_deadlines.close()
+        self._session_expirations.close()
 
     async def OpenChannel(  # type: ignore
         self,
         request_iterator: AsyncIterator[agent_worker_pb2.Message],
         context: grpc.aio.ServicerContext[agent_worker_pb2.Message, agent_worker_pb2.Message],
-    ) -> Iterator[agent_worker_pb2.Message] | AsyncIterator[agent_worker_pb2.Message]:  # type: ignore
-        # Aquire the lock to get a new client id.
-        async with self._client_id_lock:
-            self._client_id += 1
-            client_id = self._client_id
-
-        # Register the client with the server and create a send queue for the client.
-        send_queue: asyncio.Queue[agent_worker_pb2.Message] = asyncio.Queue()
-        self._send_queues[client_id] = send_queue
-        logger.info(f"Client {client_id} connected.")
+    ) -> Iterator[agent_worker_pb2.Message] | AsyncIterator[agent_worker_pb2.Message | bytes]:  # type: ignore
+        client_metadata = context.invocation_metadata()
+        acknowledged_metadata: List[Tuple[str, str]] = []
+        session_id = get_session_id(client_metadata)
+        session = self._sessions.get(session_id) if session_id else None
+        if session is not None and not session.connected:
+            # The client reconnected, it keeps its client id, agent types, subscriptions and queued messages.
+            client_id = session.client_id
+            send_queue = self._send_queues[client_id]
+            session.connected = True
+            if session.expiration is not None:
+                session.expiration.cancel()
+                session.expiration = None
+            acknowledged_metadata.extend(session_received_metadata(session.received))
+            received = get_session_received(client_metadata)
+            if received is not None:
+                send_queue.resend_unreceived(received)
+            logger.info(f"Client {client_id} reconnected.")
+        else:
+            # Aquire the lock to get a new client id.
+            async with self._client_id_lock:
+                self._client_id += 1
+                client_id = self._client_id
+
+            # Register the client with the server and create a send queue for the client.
+            send_queue = self._add_send_queue(client_id, replay=bool(session_id))
+            if session_id:
+                # A session whose previous channel is still open is started over, the previous channel is cleaned
+                # up once it closes.
+                session = self._sessions[session_id] = ClientSession(client_id)
+            logger.info(f"Client {client_id} connected.")
+
+        # Batch messages and wait for credits only if the client advertised support for it.
+        send_iterable = CoalescingQueueAsyncIterable(send_queue, self._message_batching)
+        if self._message_batching is not None and supports_batching(client_metadata):
+            acknowledged_metadata.extend(batching_metadata(self._message_batching))
+            send_iterable.batching = True
+        if supports_flow_control(client_metadata):
+            acknowledged_metadata.extend(flow_control_metadata())
+            send_queue.enable_flow_control()
+        if acknowledged_metadata:
+            await context.send_initial_metadata(acknowledged_metadata)
+        content_types = get_content_types(client_metadata)
+        content_encodings = get_content_encodings(client_metadata)
+        self._client_content_types[client_id] = content_types or DEFAULT_CONTENT_TYPES
+        self._client_content_encodings[client_id] = content_encodings
+        shared_memory_namespace = get_shared_memory_namespace_from_metadata(client_metadata)
+        self._client_shared_memory_namespaces[client_id] = shared_memory_namespace
+        if content_types is not None or content_encodings or shared_memory_namespace:
+            self._content_types_client_ids.add(client_id)
+        await self._update_content_types(client_id)
 
         try:
             # Concurrently handle receiving messages from the client and sending messages to the client.
             # This task will receive messages from the client.
-            receiving_task = asyncio.create_task(self._receive_messages(client_id, request_iterator))
+            receiving_task = asyncio.create_task(self._receive_messages(client_id, request_iterator, session))
 
             # Return an async generator that will yield messages from the send queue to the client.
-            while True:
-                message = await send_queue.get()
-                # Yield the message to the client.
-                try:
-                    yield message
-                except Exception as e:
-                    logger.error(f"Failed to send message to client {client_id}: {e}", exc_info=True)
-                    break
-                logger.info(f"Sent message to client {client_id}: {message}")
+            try:
+                async for message in send_iterable:
+                    # Yield the message to the client.
+                    try:
+                        yield message
+                    except Exception as e:
+                        logger.error(f"Failed to send message to client {client_id}: {e}", exc_info=True)
+                        break
+                    if logger.isEnabledFor(logging.INFO):
+                        logger.info("Sent %s to client %s", _describe_frame(message), client_id)
+            except SendQueueClosedError:
+                pass
+            if send_queue.overflowed:
+                receiving_task.cancel()
+                logger.error(f"Send queue of client {client_id} is full, disconnecting the client.")
+                await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, "Send queue is full.")
             # Wait for the receiving task to finish.
             await receiving_task
 
         finally:
-            # Clean up the client connection.
-            del self._send_queues[client_id]
-            # Cancel pending requests sent to this client.
-            for future in self._pending_responses.pop(client_id, {}).values():
-                future.cancel()
-            # Remove the client id from the agent type to client id mapping.
-            await self._on_client_disconnect(client_id)
+            if (
+                session is not None
+                and self._sessions.get(session_id) is session
+                and not session.ended
+                and not send_queue.overflowed
+            ):
+                # Keep the client until it reconnects or its session expires.
+                session.connected = False
+                session.expiration = self._session_expirations.schedule(
+                    self._session_retention, lambda: self._expire_session(session_id)
+                )
+                logger.info(f"Client {client_id} disconnected, keeping its session for it to reconnect.")
+            else:
+                if session is not None and self._sessions.get(session_id) is session:
+                    del self._sessions[session_id]
+                await self._remove_client(client_id)
+
+    def _expire_session(self, session_id: str) -> None:
+        session = self._sessions.pop(session_id)
+        logger.info(f"Client {session.client_id} did not reconnect in time, removing it.")
+        task = asyncio.create_task(self._remove_client(session.client_id))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._raise_on_exception)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _remove_client(self, client_id: int) -> None:
+        # Clean up the client connection.
+        send_queue = self._send_queues.pop(client_id)
+        send_queue.close()
+        self._client_content_types.pop(client_id, None)
+        self._client_content_encodings.pop(client_id, None)
+        self._client_shared_memory_namespaces.pop(client_id, None)
+        self._content_types_client_ids.discard(client_id)
+        await self._update_content_types()
+        # Cancel pending requests sent to this client.
+        for future in self._pending_responses.pop(client_id, {}).values():
+            future.cancel()
+        # Remove the client id from the agent type to client id mapping.
+        await self._on_client_disconnect(client_id)
+
+    async def _update_content_types(self, new_client_id: int | None = None) -> None:
+        # Tell the clients about the content types and encodings accepted by every client if they changed, and a new
+        # client about them in any case.
+        common = common_content_types(self._client_content_types.values())
+        common_encodings = common_content_encodings(self._client_content_encodings.values())
+        # Payloads are only passed in shared memory if every client can read it, whichever client receives them.
+        shared_memory_namespace = common_shared_memory_namespace(self._client_shared_memory_namespaces.values())
+        if (
+            common != self._common_content_types
+            or common_encodings != self._common_content_encodings
+            or shared_memory_namespace != self._common_shared_memory_namespace
+        ):
+            self._common_content_types = common
+            self._common_content_encodings = common_encodings
+            self._common_shared_memory_namespace = shared_memory_namespace
+            client_ids = set(self._content_types_client_ids)
+        elif new_client_id in self._content_types_client_ids:
+            client_ids = {new_client_id}
+        else:
+            return
+        logger.info(
+            "Content types accepted by all clients: %s, content encodings: %s", sorted(common), sorted(common_encodings)
+        )
+        message = agent_worker_pb2.Message(
+            contentTypes=agent_worker_pb2.ContentTypes(
+                content_types=sorted(common),
+                content_encodings=sorted(common_encodings),
+                shared_memory_namespace=shared_memory_namespace,
+            )
+        )
+        for client_id in client_ids:
+            send_queue = self._send_queues.get(client_id)
+            if send_queue is not None:
+                await send_queue.put(message)
 
     async def _on_client_disconnect(self, client_id: int) -> None:
-        async with self._agent_type_to_client_id_lock:
-            agent_types = [agent_type for agent_type, id_ in self._agent_type_to_client_id.items() if id_ == client_id]
-            for agent_type in agent_types:
-                logger.info(f"Removing agent type {agent_type} from agent type to client id mapping")
-                del self._agent_type_to_client_id[agent_type]
-            for sub_id in self._client_id_to_subscription_id_mapping.get(client_id, []):
-                logger.info(f"Client id {client_id} disconnected. Removing corresponding subscription with id {id}")
+        async with self._agent_type_to_clients_lock:
+            for agent_type, clients in list(self._agent_type_to_clients.items()):
+                if client_id not in clients:
+                    continue
+                clients.remove(client_id)
+                if len(clients) == 0:
+                    logger.info(f"Removing agent type {agent_type} from agent type to client id mapping")
+                    del self._agent_type_to_clients[agent_type]
+                else:
+                    logger.info(f"Rebalanced agent type {agent_type} across clients {clients.nodes}")
+            for sub_id in self._client_id_to_subscription_id_mapping.pop(client_id, set()):
+                if any(sub_id in ids for ids in self._client_id_to_subscription_id_mapping.values()):
+                    # Still used by another client serving the same agent type.
+                    continue
+                logger.info(f"Client id {client_id} disconnected. Removing corresponding subscription with id {sub_id}")
                 await self._subscription_manager.remove_subscription(sub_id)
+                for key, id_ in list(self._type_subscription_ids.items()):
+                    if id_ == sub_id:
+                        del self._type_subscription_ids[key]
         logger.info(f"Client {client_id} disconnected successfully")
 
+    def _add_send_queue(self, client_id: int, replay: bool = False) -> SendQueue:
+        # The messages sent to a client with a session are kept, to send those it did not receive again.
+        send_queue = SendQueue(
+            self._max_send_queue_size,
+            self._send_queue_overflow_policy,
+            on_drop=functools.partial(self._fail_dropped_request, client_id),
+            replay_buffer=ReplayBuffer[OutgoingMessage](self._session_replay_buffer_size) if replay else None,
+        )
+        self._send_queues[client_id] = send_queue
+        return send_queue
+
     def _raise_on_exception(self, task: Task[Any]) -> None:
         exception = task.exception()
         if exception is not None:
             raise exception
 
     async def _receive_messages(
-        self, client_id: int, request_iterator: AsyncIterator[agent_worker_pb2.Message]
+        self,
+        client_id: int,
+        request_iterator: AsyncIterator[agent_worker_pb2.Message],
+        session: ClientSession | None = None,
     ) -> None:
-        # Receive messages from the client and process them.
-        async for message in request_iterator:
-            logger.info(f"Received message from client {client_id}: {message}")
-            oneofcase = message.WhichOneof("message")
-            match oneofcase:
-                case "request":
-                    request: agent_worker_pb2.RpcRequest = message.request
-                    task = asyncio.create_task(self._process_request(request, client_id))
-                    self._background_tasks.add(task)
-                    task.add_done_callback(self._raise_on_exception)
-                    task.add_done_callback(self._background_tasks.discard)
-                case "response":
-                    response: agent_worker_pb2.RpcResponse = message.response
-                    task = asyncio.create_task(self._process_response(response, client_id))
-                    self._background_tasks.add(task)
-                    task.add_done_callback(self._raise_on_exception)
-                    task.add_done_callback(self._background_tasks.discard)
-                case "event":
-                    event: agent_worker_pb2.Event = message.event
-                    task = asyncio.create_task(self._process_event(event))
-                    self._background_tasks.add(task)
-                    task.add_done_callback(self._raise_on_exception)
-                    task.add_done_callback(self._background_tasks.discard)
-                case "registerAgentTypeRequest":
-                    register_agent_type: agent_worker_pb2.RegisterAgentTypeRequest = message.registerAgentTypeRequest
-                    task = asyncio.create_task(
-                        self._process_register_agent_type_request(register_agent_type, client_id)
-                    )
-                    self._background_tasks.add(task)
-                    task.add_done_callback(self._raise_on_exception)
-                    task.add_done_callback(self._background_tasks.discard)
-                case "addSubscriptionRequest":
-                    add_subscription: agent_worker_pb2.AddSubscriptionRequest = message.addSubscriptionRequest
-                    task = asyncio.create_task(self._process_add_subscription_request(add_subscription, client_id))
-                    self._background_tasks.add(task)
-                    task.add_done_callback(self._raise_on_exception)
-                    task.add_done_callback(self._background_tasks.discard)
-                case "registerAgentTypeResponse" | "addSubscriptionResponse":
-                    logger.warning(f"Received unexpected message type: {oneofcase}")
-                case None:
-                    logger.warning("Received empty message")
-                case other:
-                    logger.error(f"Received unexpected message: {other}")
+        # Receive messages from the client and process them, counting them for the session of the client.
+        # With bounded send queues, stop reading while as many requests and events as a queue holds wait for room.
+        deliveries = asyncio.Semaphore(self._max_send_queue_size) if self._max_send_queue_size is not None else None
+
+        def delivered(_: Task[None]) -> None:
+            assert deliveries is not None
+            deliveries.release()
+
+        async for frame in request_iterator:
+            for message in unpack_messages(frame):
+                if session is not None and is_replayable(message):
+                    session.received += 1
+                if message.WhichOneof("message") == "endSession":
+                    if session is not None:
+                        # The client stopped, close the channel instead of keeping the session for it to reconnect.
+                        session.ended = True
+                        self._send_queues[client_id].close()
+                    continue
+                if deliveries is not None and is_flow_controlled(message):
+                    await deliveries.acquire()
+                    task = self._dispatch_message(message, client_id)
+                    if task is None:
+                        deliveries.release()
+                    else:
+                        task.add_done_callback(delivered)
+                else:
+                    self._dispatch_message(message, client_id)
+
+    def _dispatch_message(self, message: agent_worker_pb2.Message, client_id: int) -> Task[None] | None:
+        """Processes a message received from a client, returning the task processing it, if any."""
+        logger.info("Received message from client %s: %s", client_id, message)
+        oneofcase = message.WhichOneof("message")
+        match oneofcase:
+            case "request":
+                request: agent_worker_pb2.RpcRequest = message.request
+                task = asyncio.create_task(self._process_request(request, client_id))
+                self._background_tasks.add(task)
+                task.add_done_callback(self._raise_on_exception)
+                task.add_done_callback(self._background_tasks.discard)
+                return task
+            case "response":
+                response: agent_worker_pb2.RpcResponse = message.response
+                task = asyncio.create_task(self._process_response(response, client_id))
+                self._background_tasks.add(task)
+                task.add_done_callback(self._raise_on_exception)
+                task.add_done_callback(self._background_tasks.discard)
+                return task
+            case "event":
+                event: agent_worker_pb2.Event = message.event
+                task = asyncio.create_task(self._process_event(event))
+                self._background_tasks.add(task)
+                task.add_done_callback(self._raise_on_exception)
+                task.add_done_callback(self._background_tasks.discard)
+                return task
+            case "registerAgentTypeRequest":
+                register_agent_type: agent_worker_pb2.RegisterAgentTypeRequest = message.registerAgentTypeRequest
+                task = asyncio.create_task(self._process_register_agent_type_request(register_agent_type, client_id))
+                self._background_tasks.add(task)
+                task.add_done_callback(self._raise_on_exception)
+                task.add_done_callback(self._background_tasks.discard)
+                return task
+            case "addSubscriptionRequest":
+                add_subscription: agent_worker_pb2.AddSubscriptionRequest = message.addSubscriptionRequest
+                task = asyncio.create_task(self._process_add_subscription_request(add_subscription, client_id))
+                self._background_tasks.add(task)
+                task.add_done_callback(self._raise_on_exception)
+                task.add_done_callback(self._background_tasks.discard)
+                return task
+            case "flowControl":
+                send_queue = self._send_queues.get(client_id)
+                if send_queue is not None:
+                    send_queue.grant(message.flowControl.credits)
+            case "registerAgentTypeResponse" | "addSubscriptionResponse":
+                logger.warning(f"Received unexpected message type: {oneofcase}")
+            case None:
+                logger.warning("Received empty message")
+            case other:
+                logger.error(f"Received unexpected message: {other}")
+        return None
 
     async def _process_request(self, request: agent_worker_pb2.RpcRequest, client_id: int) -> None:
-        # Deliver the message to a client given the target agent type.
-        async with self._agent_type_to_client_id_lock:
-            target_client_id = self._agent_type_to_client_id.get(request.target.type)
+        # Deliver the message to the client serving the target agent.
+        async with self._agent_type_to_clients_lock:
+            clients = self._agent_type_to_clients.get(request.target.type)
+            target_client_id = clients.get(request.target.key) if clients is not None else None
         if target_client_id is None:
             logger.error(f"Agent {request.target.type} not found, failed to deliver message.")
             return
@@ -145,20 +503,56 @@ async def _process_request(self, request: agent_worker_pb2.RpcRequest, client_id
         if target_send_queue is None:
             logger.error(f"Client {target_client_id} not found, failed to deliver message.")
             return
-        await target_send_queue.put(agent_worker_pb2.Message(request=request))
 
-        # Create a future to wait for the response from the target.
+        # Create a future to wait for the response from the target, before queueing the request so that the future
+        # is failed if the request is dropped.
         future = asyncio.get_event_loop().create_future()
         self._pending_responses.setdefault(target_client_id, {})[request.request_id] = future
+        timeout = request.timeout if request.HasField("timeout") else self._rpc_timeout
+        if timeout is not None:
+            self._track_deadline(request.request_id, target_client_id, future, timeout)
+        await target_send_queue.put(agent_worker_pb2.Message(request=request))
 
         # Create a task to wait for the response and send it back to the client.
-        send_response_task = asyncio.create_task(self._wait_and_send_response(future, client_id))
+        send_response_task = asyncio.create_task(self._wait_and_send_response(future, client_id, request.request_id))
         self._background_tasks.add(send_response_task)
         send_response_task.add_done_callback(self._raise_on_exception)
         send_response_task.add_done_callback(self._background_tasks.discard)
 
-    async def _wait_and_send_response(self, future: Future[agent_worker_pb2.RpcResponse], client_id: int) -> None:
-        response = await future
+    def _track_deadline(
+        self, request_id: str, target_client_id: int, future: Future[agent_worker_pb2.RpcResponse], timeout: float
+    ) -> None:
+        def expire() -> None:
+            self._pending_responses.get(target_client_id, {}).pop(request_id, None)
+            if not future.done():
+                self._timed_out_requests += 1
+                future.set_exception(TimeoutError(f"Request {request_id} timed out after {timeout} seconds."))
+
+        handle = self._request_deadlines.schedule(timeout, expire)
+        future.add_done_callback(lambda _: handle.cancel())
+
+    def _fail_dropped_request(self, target_client_id: int, message: OutgoingMessage) -> None:
+        # Answer a request dropped from the send queue of the target client with an error response to the sender.
+        if message_kind(message) != "request" or not isinstance(message, agent_worker_pb2.Message):
+            return
+        request_id = message.request.request_id
+        future = self._pending_responses.get(target_client_id, {}).pop(request_id, None)
+        if future is not None and not future.done():
+            future.set_result(
+                agent_worker_pb2.RpcResponse(
+                    request_id=request_id,
+                    error=f"Request {request_id} was dropped because the send queue of client {target_client_id} was full.",
+                )
+            )
+
+    async def _wait_and_send_response(
+        self, future: Future[agent_worker_pb2.RpcResponse], client_id: int, request_id: str
+    ) -> None:
+        try:
+            response = await future
+        except TimeoutError as e:
+            logger.error("Failed to receive the response to request %s from client %s: %s", request_id, client_id, e)
+            response = agent_worker_pb2.RpcResponse(request_id=request_id, error=str(e))
         message = agent_worker_pb2.Message(response=response)
         send_queue = self._send_queues.get(client_id)
         if send_queue is None:
@@ -168,39 +562,71 @@ async def _wait_and_send_response(self, future: Future[agent_worker_pb2.RpcRespo
 
     async def _process_response(self, response: agent_worker_pb2.RpcResponse, client_id: int) -> None:
         # Setting the result of the future will send the response back to the original sender.
-        future = self._pending_responses[client_id].pop(response.request_id)
+        future = self._pending_responses.get(client_id, {}).pop(response.request_id, None)
+        if future is None:
+            logger.warning("Received a response to request %s, which is no longer pending.", response.request_id)
+            return
         future.set_result(response)
 
     async def _process_event(self, event: agent_worker_pb2.Event) -> None:
         topic_id = TopicId(type=event.topic_type, source=event.topic_source)
         recipients = await self._subscription_manager.get_subscribed_recipients(topic_id)
-        # Get the client ids of the recipients.
-        async with self._agent_type_to_client_id_lock:
-            client_ids: Set[int] = set()
-            for recipient in recipients:
-                client_id = self._agent_type_to_client_id.get(recipient.type)
-                if client_id is not None:
-                    client_ids.add(client_id)
-                else:
+        # Get the client ids of the recipients, and the types of the recipients routed to each client.
+        async with self._agent_type_to_clients_lock:
+            client_recipient_types: Dict[int, Set[str]] = {}
+            # The recipient types each client serves, for agent types served by several clients.
+            client_shared_types: Dict[int, Set[str]] = {}
+            for recipient in set(recipients):
+                clients = self._agent_type_to_clients.get(recipient.type)
+                client_id = clients.get(recipient.key) if clients is not None else None
+                if clients is None or client_id is None:
                     logger.error(f"Agent {recipient.type} and its client not found for topic {topic_id}.")
-        # Deliver the event to clients.
-        for client_id in client_ids:
-            await self._send_queues[client_id].put(agent_worker_pb2.Message(event=event))
+                    continue
+                client_recipient_types.setdefault(client_id, set()).add(recipient.type)
+                if len(clients) > 1:
+                    for node in clients.nodes:
+                        client_shared_types.setdefault(node, set()).add(recipient.type)
+        # A client serving a recipient type whose recipient is routed to another client is told which recipient
+        # types to deliver the event to, so that every recipient receives the event once.
+        restricted: Dict[int, Set[str]] = {
+            client_id: recipient_types
+            for client_id, recipient_types in client_recipient_types.items()
+            if not client_shared_types.get(client_id, set()) <= recipient_types
+        }
+        # Deliver the event to clients, concurrently so that a client with a full send queue does not hold up the others.
+        shared_queues = [
+            self._send_queues[client_id]
+            for client_id in client_recipient_types
+            if client_id not in restricted and client_id in self._send_queues
+        ]
+        message: OutgoingMessage = agent_worker_pb2.Message(event=event)
+        if len(shared_queues) > 1:
+            # Serialize the event once instead of once per client stream.
+            message = SerializedMessage.from_message(agent_worker_pb2.Message(event=event))
+        deliveries: List[Tuple[SendQueue, OutgoingMessage]] = [(send_queue, message) for send_queue in shared_queues]
+        for client_id, recipient_types in restricted.items():
+            if client_id not in self._send_queues:
+                continue
+            restricted_event = agent_worker_pb2.Event()
+            restricted_event.CopyFrom(event)
+            restricted_event.recipient_types.extend(sorted(recipient_types))
+            deliveries.append((self._send_queues[client_id], agent_worker_pb2.Message(event=restricted_event)))
+        await asyncio.gather(*[send_queue.put(message) for send_queue, message in deliveries])
 
     async def _process_register_agent_type_request(
         self, register_agent_type_req: agent_worker_pb2.RegisterAgentTypeRequest, client_id: int
     ) -> None:
-        # Register the agent type with the host runtime.
-        async with self._agent_type_to_client_id_lock:
-            if register_agent_type_req.type in self._agent_type_to_client_id:
-                existing_client_id = self._agent_type_to_client_id[register_agent_type_req.type]
-                logger.error(
-                    f"Agent type {register_agent_type_req.type} already registered with client {existing_client_id}."
-                )
+        # Register the agent type with the host runtime. Other clients may already serve the same agent type.
+        async with self._agent_type_to_clients_lock:
+            clients = self._agent_type_to_clients.setdefault(register_agent_type_req.type, ConsistentHashRing())
+            if client_id in clients:
+                logger.error(f"Agent type {register_agent_type_req.type} already registered with client {client_id}.")
                 success = False
                 error = f"Agent type {register_agent_type_req.type} already registered."
             else:
-                self._agent_type_to_client_id[register_agent_type_req.type] = client_id
+                clients.add(client_id)
+                if len(clients) > 1:
+                    logger.info(f"Rebalanced agent type {register_agent_type_req.type} across clients {clients.nodes}")
                 success = True
                 error = None
         # Send a response back to the client.
@@ -224,15 +650,24 @@ async def _process_add_subscription_request(
                 type_subscription = TypeSubscription(
                     topic_type=type_subscription_msg.topic_type, agent_type=type_subscription_msg.agent_type
                 )
-                try:
-                    await self._subscription_manager.add_subscription(type_subscription)
-                    subscription_ids = self._client_id_to_subscription_id_mapping.setdefault(client_id, set())
-                    subscription_ids.add(type_subscription.id)
+                subscription_ids = self._client_id_to_subscription_id_mapping.setdefault(client_id, set())
+                key = (type_subscription.topic_type, type_subscription.agent_type)
+                existing_id = self._type_subscription_ids.get(key)
+                if existing_id is not None and existing_id not in subscription_ids:
+                    # Another client serving the same agent type added this subscription, share it.
+                    subscription_ids.add(existing_id)
                     success = True
                     error = None
-                except ValueError as e:
-                    success = False
-                    error = str(e)
+                else:
+                    try:
+                        await self._subscription_manager.add_subscription(type_subscription)
+                        subscription_ids.add(type_subscription.id)
+                        self._type_subscription_ids[key] = type_subscription.id
+                        success = True
+                        error = None
+                    except ValueError as e:
+                        success = False
+                        error = str(e)
                 # Send a response back to the client.
                 await self._send_queues[client_id].put(
                     agent_worker_pb2.Message(
@@ -249,11 +684,69 @@ async def GetState(  # type: ignore
         request: agent_worker_pb2.AgentId,
         context: grpc.aio.ServicerContext[agent_worker_pb2.AgentId, agent_worker_pb2.GetStateResponse],
     ) -> agent_worker_pb2.GetStateResponse:  # type: ignore
-        raise NotImplementedError("Method not implemented!")
+        response = await self.GetStates(agent_worker_pb2.GetStatesRequest(agent_ids=[request]), context)  # type: ignore
+        if not response.success:
+            return agent_worker_pb2.GetStateResponse(success=False, error=response.error)
+        if not response.agent_states:
+            return agent_worker_pb2.GetStateResponse(success=True)
+        return agent_worker_pb2.GetStateResponse(agent_state=response.agent_states[0], success=True)
 
     async def SaveState(  # type: ignore
         self,
         request: agent_worker_pb2.AgentState,
         context: grpc.aio.ServicerContext[agent_worker_pb2.AgentId, agent_worker_pb2.SaveStateResponse],
     ) -> agent_worker_pb2.SaveStateResponse:  # type: ignore
-        raise NotImplementedError("Method not implemented!")
+        response = await self.SaveStates(agent_worker_pb2.SaveStatesRequest(agent_states=[request]), context)  # type: ignore
+        if not response.success:
+            return agent_worker_pb2.SaveStateResponse(success=False, error=response.error)
+        return agent_worker_pb2.SaveStateResponse(success=True, eTag=response.eTags[0])
+
+    async def GetStates(  # type: ignore
+        self,
+        request: agent_worker_pb2.GetStatesRequest,
+        context: grpc.aio.ServicerContext[agent_worker_pb2.GetStatesRequest, agent_worker_pb2.GetStatesResponse],
+    ) -> agent_worker_pb2.GetStatesResponse:  # type: ignore
+        try:
+            stored_states = await self._state_store.get(
+                [AgentId(agent_id.type, agent_id.key) for agent_id in request.agent_ids]
+            )
+        except Exception as e:
+            logger.error("Failed to get agent states", exc_info=e)
+            return agent_worker_pb2.GetStatesResponse(success=False, error=str(e))
+        response = agent_worker_pb2.GetStatesResponse(success=True)
+        for agent_id, stored_state in zip(request.agent_ids, stored_states, strict=True):
+            if stored_state is None:
+                continue
+            # The store keeps the data of the state, the agent id and eTag are set when it is read.
+            agent_state = response.agent_states.add()
+            agent_state.ParseFromString(stored_state.data)
+            agent_state.agent_id.CopyFrom(agent_id)
+            agent_state.eTag = stored_state.etag
+        return response
+
+    async def SaveStates(  # type: ignore
+        self,
+        request: agent_worker_pb2.SaveStatesRequest,
+        context: grpc.aio.ServicerContext[agent_worker_pb2.SaveStatesRequest, agent_worker_pb2.SaveStatesResponse],
+    ) -> agent_worker_pb2.SaveStatesResponse:  # type: ignore
+        updates: List[AgentStateUpdate] = []
+        for agent_state in request.agent_states:
+            data = agent_worker_pb2.AgentState()
+            data.CopyFrom(agent_state)
+            data.ClearField("agent_id")
+            data.ClearField("eTag")
+            updates.append(
+                AgentStateUpdate(
+                    AgentId(agent_state.agent_id.type, agent_state.agent_id.key),
+                    data.SerializeToString(),
+                    agent_state.eTag,
+                )
+            )
+        try:
+            etags = await self._state_store.save(updates)
+        except (ETagMismatchError, ValueError) as e:
+            return agent_worker_pb2.SaveStatesResponse(success=False, error=str(e))
+        except Exception as e:
+            logger.error("Failed to save agent states", exc_info=e)
+            return agent_worker_pb2.SaveStatesResponse(success=False, error=str(e))
+        return agent_worker_pb2.SaveStatesResponse(success=True, eTags=etags)
@@ -79,6 +79,12 @@ def prompt_tokens(self) -> int:
     def completion_tokens(self) -> int:
         return cast(int, self.kwargs["completion_tokens"])
 
-    # This must output the event in a json serializable format
+    # This must output the event in a json serializable format.
+    # The payload is only rendered here, when a handler actually formats the event.
     def __str__(self) -> str:
-        return json.dumps(self.kwargs)
+        kwargs = dict(self.kwargs)
+        payload = kwargs["payload"]
+        kwargs["payload"] = payload.__dict__ if hasattr(payload, "__dict__") else payload
+        kwargs["kind"] = kwargs["kind"].name
+        kwargs["delivery_stage"] = kwargs["delivery_stage"].name
+        return json.dumps(kwargs, default=str)
@@ -57,20 +57,53 @@ class Payload(google.protobuf.message.Message):
     DATA_TYPE_FIELD_NUMBER: builtins.int
     DATA_CONTENT_TYPE_FIELD_NUMBER: builtins.int
     DATA_FIELD_NUMBER: builtins.int
+    CONTENT_ENCODING_FIELD_NUMBER: builtins.int
+    SHARED_MEMORY_FIELD_NUMBER: builtins.int
     data_type: builtins.str
     data_content_type: builtins.str
     data: builtins.bytes
+    content_encoding: builtins.str
+    """The compression applied to data, for example "gzip", or empty if data is not compressed."""
+    @property
+    def shared_memory(self) -> global___SharedMemoryHandle:
+        """Set instead of data when the data was written to a shared memory
+        segment on the machine of the sender.
+        """
+
     def __init__(
         self,
         *,
         data_type: builtins.str = ...,
         data_content_type: builtins.str = ...,
         data: builtins.bytes = ...,
+        content_encoding: builtins.str = ...,
+        shared_memory: global___SharedMemoryHandle | None = ...,
     ) -> None: ...
-    def ClearField(self, field_name: typing.Literal["data", b"data", "data_content_type", b"data_content_type", "data_type", b"data_type"]) -> None: ...
+    def HasField(self, field_name: typing.Literal["shared_memory", b"shared_memory"]) -> builtins.bool: ...
+    def ClearField(self, field_name: typing.Literal["content_encoding", b"content_encoding", "data", b"data", "data_content_type", b"data_content_type", "data_type", b"data_type", "shared_memory", b"shared_memory"]) -> None: ...
 
 global___Payload = Payload
 
+@typing.final
+class SharedMemoryHandle(google.protobuf.message.Message):
+    """A shared memory segment holding the data of a payload."""
+
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    NAME_FIELD_NUMBER: builtins.int
+    SIZE_FIELD_NUMBER: builtins.int
+    name: builtins.str
+    size: builtins.int
+    def __init__(
+        self,
+        *,
+        name: builtins.str = ...,
+        size: builtins.int = ...,
+    ) -> None: ...
+    def ClearField(self, field_name: typing.Literal["name", b"name", "size", b"size"]) -> None: ...
+
+global___SharedMemoryHandle = SharedMemoryHandle
+
 @typing.final
 class RpcRequest(google.protobuf.message.Message):
     DESCRIPTOR: google.protobuf.descriptor.Descriptor
@@ -97,8 +130,11 @@ class RpcRequest(google.protobuf.message.Message):
     METHOD_FIELD_NUMBER: builtins.int
     PAYLOAD_FIELD_NUMBER: builtins.int
     METADATA_FIELD_NUMBER: builtins.int
+    TIMEOUT_FIELD_NUMBER: builtins.int
     request_id: builtins.str
     method: builtins.str
+    timeout: builtins.float
+    """The number of seconds the sender waits for the response. The host fails the request once it elapsed."""
     @property
     def source(self) -> global___AgentId: ...
     @property
@@ -116,10 +152,14 @@ class RpcRequest(google.protobuf.message.Message):
         method: builtins.str = ...,
         payload: global___Payload | None = ...,
         metadata: collections.abc.Mapping[builtins.str, builtins.str] | None = ...,
+        timeout: builtins.float | None = ...,
     ) -> None: ...
-    def HasField(self, field_name: typing.Literal["_source", b"_source", "payload", b"payload", "source", b"source", "target", b"target"]) -> builtins.bool: ...
-    def ClearField(self, field_name: typing.Literal["_source", b"_source", "metadata", b"metadata", "method", b"method", "payload", b"payload", "request_id", b"request_id", "source", b"source", "target", b"target"]) -> None: ...
+    def HasField(self, field_name: typing.Literal["_source", b"_source", "_timeout", b"_timeout", "payload", b"payload", "source", b"source", "target", b"target", "timeout", b"timeout"]) -> builtins.bool: ...
+    def ClearField(self, field_name: typing.Literal["_source", b"_source", "_timeout", b"_timeout", "metadata", b"metadata", "method", b"method", "payload", b"payload", "request_id", b"request_id", "source", b"source", "target", b"target", "timeout", b"timeout"]) -> None: ...
+    @typing.overload
     def WhichOneof(self, oneof_group: typing.Literal["_source", b"_source"]) -> typing.Literal["source"] | None: ...
+    @typing.overload
+    def WhichOneof(self, oneof_group: typing.Literal["_timeout", b"_timeout"]) -> typing.Literal["timeout"] | None: ...
 
 global___RpcRequest = RpcRequest
 
@@ -191,6 +231,7 @@ class Event(google.protobuf.message.Message):
     SOURCE_FIELD_NUMBER: builtins.int
     PAYLOAD_FIELD_NUMBER: builtins.int
     METADATA_FIELD_NUMBER: builtins.int
+    RECIPIENT_TYPES_FIELD_NUMBER: builtins.int
     topic_type: builtins.str
     topic_source: builtins.str
     @property
@@ -199,6 +240,12 @@ class Event(google.protobuf.message.Message):
     def payload(self) -> global___Payload: ...
     @property
     def metadata(self) -> google.protobuf.internal.containers.ScalarMap[builtins.str, builtins.str]: ...
+    @property
+    def recipient_types(self) -> google.protobuf.internal.containers.RepeatedScalarFieldContainer[builtins.str]:
+        """When set, only subscribed agents of these types receive the event. The host sets it when an agent
+        type is served by several workers, so each recipient receives the event on one worker only.
+        """
+
     def __init__(
         self,
         *,
@@ -207,9 +254,10 @@ class Event(google.protobuf.message.Message):
         source: global___AgentId | None = ...,
         payload: global___Payload | None = ...,
         metadata: collections.abc.Mapping[builtins.str, builtins.str] | None = ...,
+        recipient_types: collections.abc.Iterable[builtins.str] | None = ...,
     ) -> None: ...
     def HasField(self, field_name: typing.Literal["_source", b"_source", "payload", b"payload", "source", b"source"]) -> builtins.bool: ...
-    def ClearField(self, field_name: typing.Literal["_source", b"_source", "metadata", b"metadata", "payload", b"payload", "source", b"source", "topic_source", b"topic_source", "topic_type", b"topic_type"]) -> None: ...
+    def ClearField(self, field_name: typing.Literal["_source", b"_source", "metadata", b"metadata", "payload", b"payload", "recipient_types", b"recipient_types", "source", b"source", "topic_source", b"topic_source", "topic_type", b"topic_type"]) -> None: ...
     def WhichOneof(self, oneof_group: typing.Literal["_source", b"_source"]) -> typing.Literal["source"] | None: ...
 
 global___Event = Event
@@ -391,24 +439,121 @@ global___GetStateResponse = GetStateResponse
 
 @typing.final
 class SaveStateResponse(google.protobuf.message.Message):
+    """A state is only saved if its eTag is empty or matches the eTag of the saved
+    state, and gets a new eTag when it is saved.
+    """
+
     DESCRIPTOR: google.protobuf.descriptor.Descriptor
 
     SUCCESS_FIELD_NUMBER: builtins.int
     ERROR_FIELD_NUMBER: builtins.int
+    ETAG_FIELD_NUMBER: builtins.int
     success: builtins.bool
     error: builtins.str
+    eTag: builtins.str
     def __init__(
         self,
         *,
         success: builtins.bool = ...,
         error: builtins.str | None = ...,
+        eTag: builtins.str = ...,
     ) -> None: ...
     def HasField(self, field_name: typing.Literal["_error", b"_error", "error", b"error"]) -> builtins.bool: ...
-    def ClearField(self, field_name: typing.Literal["_error", b"_error", "error", b"error", "success", b"success"]) -> None: ...
+    def ClearField(self, field_name: typing.Literal["_error", b"_error", "eTag", b"eTag", "error", b"error", "success", b"success"]) -> None: ...
     def WhichOneof(self, oneof_group: typing.Literal["_error", b"_error"]) -> typing.Literal["error"] | None: ...
 
 global___SaveStateResponse = SaveStateResponse
 
+@typing.final
+class GetStatesRequest(google.protobuf.message.Message):
+    """The states of several agents, read in one call. Agents without a saved
+    state are left out of the response.
+    """
+
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    AGENT_IDS_FIELD_NUMBER: builtins.int
+    @property
+    def agent_ids(self) -> google.protobuf.internal.containers.RepeatedCompositeFieldContainer[global___AgentId]: ...
+    def __init__(
+        self,
+        *,
+        agent_ids: collections.abc.Iterable[global___AgentId] | None = ...,
+    ) -> None: ...
+    def ClearField(self, field_name: typing.Literal["agent_ids", b"agent_ids"]) -> None: ...
+
+global___GetStatesRequest = GetStatesRequest
+
+@typing.final
+class GetStatesResponse(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    AGENT_STATES_FIELD_NUMBER: builtins.int
+    SUCCESS_FIELD_NUMBER: builtins.int
+    ERROR_FIELD_NUMBER: builtins.int
+    success: builtins.bool
+    error: builtins.str
+    @property
+    def agent_states(self) -> google.protobuf.internal.containers.RepeatedCompositeFieldContainer[global___AgentState]: ...
+    def __init__(
+        self,
+        *,
+        agent_states: collections.abc.Iterable[global___AgentState] | None = ...,
+        success: builtins.bool = ...,
+        error: builtins.str | None = ...,
+    ) -> None: ...
+    def HasField(self, field_name: typing.Literal["_error", b"_error", "error", b"error"]) -> builtins.bool: ...
+    def ClearField(self, field_name: typing.Literal["_error", b"_error", "agent_states", b"agent_states", "error", b"error", "success", b"success"]) -> None: ...
+    def WhichOneof(self, oneof_group: typing.Literal["_error", b"_error"]) -> typing.Literal["error"] | None: ...
+
+global___GetStatesResponse = GetStatesResponse
+
+@typing.final
+class SaveStatesRequest(google.protobuf.message.Message):
+    """The states of several agents, saved in one call. Either all states are
+    saved, or none if the eTag of any of them does not match.
+    """
+
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    AGENT_STATES_FIELD_NUMBER: builtins.int
+    @property
+    def agent_states(self) -> google.protobuf.internal.containers.RepeatedCompositeFieldContainer[global___AgentState]: ...
+    def __init__(
+        self,
+        *,
+        agent_states: collections.abc.Iterable[global___AgentState] | None = ...,
+    ) -> None: ...
+    def ClearField(self, field_name: typing.Literal["agent_states", b"agent_states"]) -> None: ...
+
+global___SaveStatesRequest = SaveStatesRequest
+
+@typing.final
+class SaveStatesResponse(google.protobuf.message.Message):
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    SUCCESS_FIELD_NUMBER: builtins.int
+    ERROR_FIELD_NUMBER: builtins.int
+    ETAGS_FIELD_NUMBER: builtins.int
+    success: builtins.bool
+    error: builtins.str
+    @property
+    def eTags(self) -> google.protobuf.internal.containers.RepeatedScalarFieldContainer[builtins.str]:
+        """The new eTag of each state, in the order of the request."""
+
+    def __init__(
+        self,
+        *,
+        success: builtins.bool = ...,
+        error: builtins.str | None = ...,
+        eTags: collections.abc.Iterable[builtins.str] | None = ...,
+    ) -> None: ...
+    def HasField(self, field_name: typing.Literal["_error", b"_error", "error", b"error"]) -> builtins.bool: ...
+    def ClearField(self, field_name: typing.Literal["_error", b"_error", "eTags", b"eTags", "error", b"error", "success", b"success"]) -> None: ...
+    def WhichOneof(self, oneof_group: typing.Literal["_error", b"_error"]) -> typing.Literal["error"] | None: ...
+
+global___SaveStatesResponse = SaveStatesResponse
+
 @typing.final
 class Message(google.protobuf.message.Message):
     DESCRIPTOR: google.protobuf.descriptor.Descriptor
@@ -421,6 +566,10 @@ class Message(google.protobuf.message.Message):
     ADDSUBSCRIPTIONREQUEST_FIELD_NUMBER: builtins.int
     ADDSUBSCRIPTIONRESPONSE_FIELD_NUMBER: builtins.int
     CLOUDEVENT_FIELD_NUMBER: builtins.int
+    MESSAGEBATCH_FIELD_NUMBER: builtins.int
+    FLOWCONTROL_FIELD_NUMBER: builtins.int
+    CONTENTTYPES_FIELD_NUMBER: builtins.int
+    ENDSESSION_FIELD_NUMBER: builtins.int
     @property
     def request(self) -> global___RpcRequest: ...
     @property
@@ -437,6 +586,14 @@ class Message(google.protobuf.message.Message):
     def addSubscriptionResponse(self) -> global___AddSubscriptionResponse: ...
     @property
     def cloudEvent(self) -> cloudevent_pb2.CloudEvent: ...
+    @property
+    def messageBatch(self) -> global___MessageBatch: ...
+    @property
+    def flowControl(self) -> global___FlowControl: ...
+    @property
+    def contentTypes(self) -> global___ContentTypes: ...
+    @property
+    def endSession(self) -> global___EndSession: ...
     def __init__(
         self,
         *,
@@ -448,9 +605,102 @@ class Message(google.protobuf.message.Message):
         addSubscriptionRequest: global___AddSubscriptionRequest | None = ...,
         addSubscriptionResponse: global___AddSubscriptionResponse | None = ...,
         cloudEvent: cloudevent_pb2.CloudEvent | None = ...,
+        messageBatch: global___MessageBatch | None = ...,
+        flowControl: global___FlowControl | None = ...,
+        contentTypes: global___ContentTypes | None = ...,
+        endSession: global___EndSession | None = ...,
     ) -> None: ...
-    def HasField(self, field_name: typing.Literal["addSubscriptionRequest", b"addSubscriptionRequest", "addSubscriptionResponse", b"addSubscriptionResponse", "cloudEvent", b"cloudEvent", "event", b"event", "message", b"message", "registerAgentTypeRequest", b"registerAgentTypeRequest", "registerAgentTypeResponse", b"registerAgentTypeResponse", "request", b"request", "response", b"response"]) -> builtins.bool: ...
-    def ClearField(self, field_name: typing.Literal["addSubscriptionRequest", b"addSubscriptionRequest", "addSubscriptionResponse", b"addSubscriptionResponse", "cloudEvent", b"cloudEvent", "event", b"event", "message", b"message", "registerAgentTypeRequest", b"registerAgentTypeRequest", "registerAgentTypeResponse", b"registerAgentTypeResponse", "request", b"request", "response", b"response"]) -> None: ...
-    def WhichOneof(self, oneof_group: typing.Literal["message", b"message"]) -> typing.Literal["request", "response", "event", "registerAgentTypeRequest", "registerAgentTypeResponse", "addSubscriptionRequest", "addSubscriptionResponse", "cloudEvent"] | None: ...
+    def HasField(self, field_name: typing.Literal["addSubscriptionRequest", b"addSubscriptionRequest", "addSubscriptionResponse", b"addSubscriptionResponse", "cloudEvent", b"cloudEvent", "contentTypes", b"contentTypes", "endSession", b"endSession", "event", b"event", "flowControl", b"flowControl", "message", b"message", "messageBatch", b"messageBatch", "registerAgentTypeRequest", b"registerAgentTypeRequest", "registerAgentTypeResponse", b"registerAgentTypeResponse", "request", b"request", "response", b"response"]) -> builtins.bool: ...
+    def ClearField(self, field_name: typing.Literal["addSubscriptionRequest", b"addSubscriptionRequest", "addSubscriptionResponse", b"addSubscriptionResponse", "cloudEvent", b"cloudEvent", "contentTypes", b"contentTypes", "endSession", b"endSession", "event", b"event", "flowControl", b"flowControl", "message", b"message", "messageBatch", b"messageBatch", "registerAgentTypeRequest", b"registerAgentTypeRequest", "registerAgentTypeResponse", b"registerAgentTypeResponse", "request", b"request", "response", b"response"]) -> None: ...
+    def WhichOneof(self, oneof_group: typing.Literal["message", b"message"]) -> typing.Literal["request", "response", "event", "registerAgentTypeRequest", "registerAgentTypeResponse", "addSubscriptionRequest", "addSubscriptionResponse", "cloudEvent", "messageBatch", "flowControl", "contentTypes", "endSession"] | None: ...
 
 global___Message = Message
+
+@typing.final
+class MessageBatch(google.protobuf.message.Message):
+    """Several messages sent in one frame. Only sent to peers that advertised
+    support with the "agent-message-batching" metadata when opening the channel.
+    """
+
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    MESSAGES_FIELD_NUMBER: builtins.int
+    @property
+    def messages(self) -> google.protobuf.internal.containers.RepeatedCompositeFieldContainer[global___Message]: ...
+    def __init__(
+        self,
+        *,
+        messages: collections.abc.Iterable[global___Message] | None = ...,
+    ) -> None: ...
+    def ClearField(self, field_name: typing.Literal["messages", b"messages"]) -> None: ...
+
+global___MessageBatch = MessageBatch
+
+@typing.final
+class FlowControl(google.protobuf.message.Message):
+    """Grants the receiving peer permission to send this many more requests and
+    events on the channel. Only sent to peers that acknowledged the
+    "agent-flow-control" metadata when the channel was opened.
+    """
+
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    CREDITS_FIELD_NUMBER: builtins.int
+    credits: builtins.int
+    def __init__(
+        self,
+        *,
+        credits: builtins.int = ...,
+    ) -> None: ...
+    def ClearField(self, field_name: typing.Literal["credits", b"credits"]) -> None: ...
+
+global___FlowControl = FlowControl
+
+@typing.final
+class EndSession(google.protobuf.message.Message):
+    """Sent by a client that advertised a session with the "agent-session"
+    metadata as its last message when it stops, so that the host removes it
+    instead of keeping the session for the client to reconnect.
+    """
+
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    def __init__(
+        self,
+    ) -> None: ...
+
+global___EndSession = EndSession
+
+@typing.final
+class ContentTypes(google.protobuf.message.Message):
+    """The payload content types and content encodings accepted by every client
+    connected to the host, sent by the host to clients that advertised the ones
+    they accept with the "agent-content-types" and "agent-content-encodings"
+    metadata when opening the channel. Sent when the channel opens and whenever
+    the sets change.
+    """
+
+    DESCRIPTOR: google.protobuf.descriptor.Descriptor
+
+    CONTENT_TYPES_FIELD_NUMBER: builtins.int
+    CONTENT_ENCODINGS_FIELD_NUMBER: builtins.int
+    SHARED_MEMORY_NAMESPACE_FIELD_NUMBER: builtins.int
+    shared_memory_namespace: builtins.str
+    """The shared memory namespace of every client, advertised with the
+    "agent-shared-memory" metadata, or empty if the clients do not all share
+    memory.
+    """
+    @property
+    def content_types(self) -> google.protobuf.internal.containers.RepeatedScalarFieldContainer[builtins.str]: ...
+    @property
+    def content_encodings(self) -> google.protobuf.internal.containers.RepeatedScalarFieldContainer[builtins.str]: ...
+    def __init__(
+        self,
+        *,
+        content_types: collections.abc.Iterable[builtins.str] | None = ...,
+        content_encodings: collections.abc.Iterable[builtins.str] | None = ...,
+        shared_memory_namespace: builtins.str = ...,
+    ) -> None: ...
+    def ClearField(self, field_name: typing.Literal["content_encodings", b"content_encodings", "content_types", b"content_types", "shared_memory_namespace", b"shared_memory_namespace"]) -> None: ...
+
+global___ContentTypes = ContentTypes
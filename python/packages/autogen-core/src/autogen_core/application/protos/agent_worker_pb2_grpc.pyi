@@ -34,6 +34,16 @@ class AgentRpcStub:
         agent_worker_pb2.SaveStateResponse,
     ]
 
+    GetStates: grpc.UnaryUnaryMultiCallable[
+        agent_worker_pb2.GetStatesRequest,
+        agent_worker_pb2.GetStatesResponse,
+    ]
+
+    SaveStates: grpc.UnaryUnaryMultiCallable[
+        agent_worker_pb2.SaveStatesRequest,
+        agent_worker_pb2.SaveStatesResponse,
+    ]
+
 class AgentRpcAsyncStub:
     OpenChannel: grpc.aio.StreamStreamMultiCallable[
         agent_worker_pb2.Message,
@@ -50,6 +60,16 @@ class AgentRpcAsyncStub:
         agent_worker_pb2.SaveStateResponse,
     ]
 
+    GetStates: grpc.aio.UnaryUnaryMultiCallable[
+        agent_worker_pb2.GetStatesRequest,
+        agent_worker_pb2.GetStatesResponse,
+    ]
+
+    SaveStates: grpc.aio.UnaryUnaryMultiCallable[
+        agent_worker_pb2.SaveStatesRequest,
+        agent_worker_pb2.SaveStatesResponse,
+    ]
+
 class AgentRpcServicer(metaclass=abc.ABCMeta):
     @abc.abstractmethod
     def OpenChannel(
@@ -72,4 +92,18 @@ class AgentRpcServicer(metaclass=abc.ABCMeta):
         context: _ServicerContext,
     ) -> typing.Union[agent_worker_pb2.SaveStateResponse, collections.abc.Awaitable[agent_worker_pb2.SaveStateResponse]]: ...
 
+    @abc.abstractmethod
+    def GetStates(
+        self,
+        request: agent_worker_pb2.GetStatesRequest,
+        context: _ServicerContext,
+    ) -> typing.Union[agent_worker_pb2.GetStatesResponse, collections.abc.Awaitable[agent_worker_pb2.GetStatesResponse]]: ...
+
+    @abc.abstractmethod
+    def SaveStates(
+        self,
+        request: agent_worker_pb2.SaveStatesRequest,
+        context: _ServicerContext,
+    ) -> typing.Union[agent_worker_pb2.SaveStatesResponse, collections.abc.Awaitable[agent_worker_pb2.SaveStatesResponse]]: ...
+
 def add_AgentRpcServicer_to_server(servicer: AgentRpcServicer, server: typing.Union[grpc.Server, grpc.aio.Server]) -> None: ...
@@ -1,10 +1,29 @@
 import contextlib
-from typing import Dict, Generic, Iterator, Optional, Sequence
+import random
+from typing import ContextManager, Dict, Generic, Iterator, Mapping, Optional, Sequence
 
-from opentelemetry.trace import Link, NoOpTracerProvider, Span, SpanKind, TracerProvider
+from opentelemetry.trace import (
+    INVALID_SPAN,
+    Link,
+    NonRecordingSpan,
+    NoOpTracerProvider,
+    Span,
+    SpanContext,
+    SpanKind,
+    TraceFlags,
+    TracerProvider,
+    get_current_span,
+    use_span,
+)
 from opentelemetry.util import types
 
-from ._propagation import TelemetryMetadataContainer, get_telemetry_context
+from ._propagation import (
+    EnvelopeMetadata,
+    TelemetryMetadataContainer,
+    get_telemetry_context,
+    get_telemetry_envelope_metadata,
+    get_telemetry_grpc_metadata,
+)
 from ._tracing_config import Destination, ExtraAttributes, Operation, TracingConfig
 
 
@@ -15,6 +34,12 @@ class TraceHelper(Generic[Operation, Destination, ExtraAttributes]):
     This class provides a context manager `trace_block` to create and manage spans for tracing operations,
     following semantic conventions and supporting nested spans through metadata contexts.
 
+    When no tracer provider is given, or the provider is a :class:`~opentelemetry.trace.NoOpTracerProvider`,
+    tracing is disabled: `trace_block` returns a shared no-op context manager and the metadata helpers return
+    empty metadata, so no spans or telemetry metadata are created per message.
+
+    When the config's ``sampling_ratio`` is below 1.0, operations that continue an existing trace follow the
+    sampling decision of their parent, and operations that start a new trace are sampled with that probability.
     """
 
     def __init__(
@@ -26,8 +51,27 @@ def __init__(
             f"autogen {instrumentation_builder_config.name}"
         )
         self.instrumentation_builder_config = instrumentation_builder_config
+        self._enabled = tracer_provider is not None and not isinstance(tracer_provider, NoOpTracerProvider)
+        self._sampling_ratio = instrumentation_builder_config.sampling_ratio
+        self._disabled_block = contextlib.nullcontext(INVALID_SPAN)
+
+    @property
+    def enabled(self) -> bool:
+        """Whether spans are created for traced operations."""
+        return self._enabled
+
+    def get_envelope_metadata(self) -> EnvelopeMetadata | None:
+        """Returns the telemetry metadata to attach to an envelope, or None if tracing is disabled."""
+        if not self._enabled:
+            return None
+        return get_telemetry_envelope_metadata()
+
+    def get_grpc_metadata(self, existingMetadata: Optional[Mapping[str, str]] = None) -> Dict[str, str]:
+        """Returns the telemetry metadata to attach to a gRPC message, without trace context if tracing is disabled."""
+        if not self._enabled:
+            return dict(existingMetadata or {})
+        return get_telemetry_grpc_metadata(existingMetadata)
 
-    @contextlib.contextmanager
     def trace_block(
         self,
         operation: Operation,
@@ -42,7 +86,7 @@ def trace_block(
         record_exception: bool = True,
         set_status_on_exception: bool = True,
         end_on_exit: bool = True,
-    ) -> Iterator[Span]:
+    ) -> ContextManager[Span]:
         """
         Thin wrapper on top of start_as_current_span.
         1. It helps us follow semantic conventions
@@ -61,13 +105,64 @@ def trace_block(
             set_status_on_exception (bool, optional): Whether to set the status on exception. Defaults to True.
             end_on_exit (bool, optional): Whether to end the span on exit. Defaults to True.
 
-        Yields:
-            Iterator[Span]: The span object.
+        Returns:
+            ContextManager[Span]: A context manager yielding the span object.
 
         """
+        if not self._enabled:
+            return self._disabled_block
+        return self._trace_block(
+            operation,
+            destination,
+            parent,
+            extraAttributes=extraAttributes,
+            kind=kind,
+            attributes=attributes,
+            links=links,
+            start_time=start_time,
+            record_exception=record_exception,
+            set_status_on_exception=set_status_on_exception,
+            end_on_exit=end_on_exit,
+        )
+
+    @contextlib.contextmanager
+    def _trace_block(
+        self,
+        operation: Operation,
+        destination: Destination,
+        parent: Optional[TelemetryMetadataContainer],
+        *,
+        extraAttributes: ExtraAttributes | None,
+        kind: Optional[SpanKind],
+        attributes: Optional[types.Attributes],
+        links: Optional[Sequence[Link]],
+        start_time: Optional[int],
+        record_exception: bool,
+        set_status_on_exception: bool,
+        end_on_exit: bool,
+    ) -> Iterator[Span]:
+        context = get_telemetry_context(parent) if parent else None
+        if self._sampling_ratio < 1.0:
+            parent_span_context = get_current_span(context).get_span_context()
+            if parent_span_context.is_valid:
+                sampled = parent_span_context.trace_flags.sampled
+            else:
+                sampled = random.random() < self._sampling_ratio
+            if not sampled:
+                # Propagate the decision so that the rest of the trace is not sampled either.
+                if not parent_span_context.is_valid:
+                    parent_span_context = SpanContext(
+                        trace_id=random.getrandbits(128) or 1,
+                        span_id=random.getrandbits(64) or 1,
+                        is_remote=False,
+                        trace_flags=TraceFlags(TraceFlags.DEFAULT),
+                    )
+                with use_span(NonRecordingSpan(parent_span_context), end_on_exit=False) as span:
+                    yield span
+                return
+
         span_name = self.instrumentation_builder_config.get_span_name(operation, destination)
         span_kind = kind or self.instrumentation_builder_config.get_span_kind(operation)
-        context = get_telemetry_context(parent) if parent else None
         attributes_with_defaults: Dict[str, types.AttributeValue] = {}
         for key, value in (attributes or {}).items():
             attributes_with_defaults[key] = value
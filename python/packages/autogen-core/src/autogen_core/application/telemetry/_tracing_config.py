@@ -84,6 +84,14 @@ def get_span_kind(
             SpanKind: The span kind based on the messaging operation.
         """
 
+    @property
+    def sampling_ratio(self) -> float:
+        """
+        Returns:
+            The probability that an operation starting a new trace is sampled. Defaults to 1.0, every trace is sampled.
+        """
+        return 1.0
+
 
 class ExtraMessageRuntimeAttributes(TypedDict):
     message_size: NotRequired[int]
@@ -103,15 +111,27 @@ class MessageRuntimeTracingConfig(
     This class implements the TracingConfig protocol and provides
     the name of the module being instrumented and the attributes for the
     instrumentation configuration.
+
+    Args:
+        runtime_name (str): The name of the runtime being instrumented.
+        sampling_ratio (float, optional): The probability that a message starting a new trace is traced,
+            between 0.0 and 1.0. Defaults to 1.0, every message is traced.
     """
 
-    def __init__(self, runtime_name: str) -> None:
+    def __init__(self, runtime_name: str, sampling_ratio: float = 1.0) -> None:
+        if not 0.0 <= sampling_ratio <= 1.0:
+            raise ValueError("sampling_ratio must be between 0.0 and 1.0.")
         self._runtime_name = runtime_name
+        self._sampling_ratio = sampling_ratio
 
     @property
     def name(self) -> str:
         return self._runtime_name
 
+    @property
+    def sampling_ratio(self) -> float:
+        return self._sampling_ratio
+
     def build_attributes(
         self,
         operation: MessagingOperation,
@@ -56,6 +56,9 @@ def decorator(cls: Type[BaseAgentType]) -> Type[BaseAgentType]:
 class BaseAgent(ABC, Agent):
     internal_unbound_subscriptions_list: ClassVar[List[UnboundSubscription]] = []
     internal_extra_handles_types: ClassVar[List[Tuple[Type[Any], List[MessageSerializer[Any]]]]] = []
+    # Whether runtimes that serialize messages pass the agent messages of types it does not declare handling, for
+    # example to forward them, as `UnknownPayload`s instead of decoding them.
+    lazy_deserialization: ClassVar[bool] = False
 
     def __init_subclass__(cls, **kwargs: Any) -> None:
         super().__init_subclass__(**kwargs)
@@ -1,7 +1,9 @@
+import importlib.util
 import json
 from dataclasses import asdict, dataclass, fields
 from typing import Any, ClassVar, Dict, List, Protocol, Sequence, TypeVar, cast, get_args, get_origin, runtime_checkable
 
+from google.protobuf import message as protobuf_message
 from pydantic import BaseModel
 
 from autogen_core.base._type_helpers import is_union
@@ -90,6 +92,22 @@ def has_nested_base_model_in_type(tp: Any) -> bool:
 DataclassT = TypeVar("DataclassT", bound=IsDataclass)
 
 JSON_DATA_CONTENT_TYPE = "application/json"
+MSGPACK_DATA_CONTENT_TYPE = "application/vnd.msgpack"
+PROTOBUF_DATA_CONTENT_TYPE = "application/x-protobuf"
+
+
+def _import_msgpack() -> Any:
+    try:
+        import msgpack  # type: ignore
+    except ImportError as e:
+        raise RuntimeError(
+            "Missing dependency for msgpack serialization. Please ensure the autogen-core package was installed with the 'msgpack' extra."
+        ) from e
+    return msgpack
+
+
+def is_msgpack_available() -> bool:
+    return importlib.util.find_spec("msgpack") is not None
 
 
 class DataclassJsonMessageSerializer(MessageSerializer[DataclassT]):
@@ -120,6 +138,41 @@ def serialize(self, message: DataclassT) -> bytes:
         return json.dumps(asdict(message)).encode("utf-8")
 
 
+class DataclassMsgpackMessageSerializer(MessageSerializer[DataclassT]):
+    """Serializes dataclasses to msgpack, which is smaller and faster to encode and decode than JSON.
+
+    Supports the same dataclasses as :class:`DataclassJsonMessageSerializer`. Requires the ``msgpack`` extra.
+    """
+
+    def __init__(self, cls: type[DataclassT]) -> None:
+        if contains_a_union(cls):
+            raise ValueError("Dataclass has a union type, which is not supported. To use a union, use a Pydantic model")
+
+        if has_nested_dataclass(cls) or has_nested_base_model(cls):
+            raise ValueError(
+                "Dataclass has nested dataclasses or base models, which are not supported. To use nested types, use a Pydantic model"
+            )
+
+        self.cls = cls
+        self._msgpack = _import_msgpack()
+        self._field_names = [f.name for f in fields(cls)]
+
+    @property
+    def data_content_type(self) -> str:
+        return MSGPACK_DATA_CONTENT_TYPE
+
+    @property
+    def type_name(self) -> str:
+        return _type_name(self.cls)
+
+    def deserialize(self, payload: bytes) -> DataclassT:
+        return self.cls(**self._msgpack.unpackb(payload))
+
+    def serialize(self, message: DataclassT) -> bytes:
+        # Fields are not nested, so there is no need for the recursive copy done by asdict.
+        return cast(bytes, self._msgpack.packb({name: getattr(message, name) for name in self._field_names}))
+
+
 PydanticT = TypeVar("PydanticT", bound=BaseModel)
 
 
@@ -143,6 +196,61 @@ def serialize(self, message: PydanticT) -> bytes:
         return message.model_dump_json().encode("utf-8")
 
 
+class PydanticMsgpackMessageSerializer(MessageSerializer[PydanticT]):
+    """Serializes Pydantic models to msgpack, which produces smaller payloads than JSON.
+
+    Fields are dumped in JSON mode, so any model that can be serialized to JSON can be serialized to msgpack.
+    Pydantic encodes and decodes JSON natively, which is usually faster than going through msgpack, so this
+    serializer is not returned by :func:`try_get_known_serializers_for_type`. Register it with the runtimes of
+    both the senders and the receivers to use it. Requires the ``msgpack`` extra.
+    """
+
+    def __init__(self, cls: type[PydanticT]) -> None:
+        self.cls = cls
+        self._msgpack = _import_msgpack()
+
+    @property
+    def data_content_type(self) -> str:
+        return MSGPACK_DATA_CONTENT_TYPE
+
+    @property
+    def type_name(self) -> str:
+        return _type_name(self.cls)
+
+    def deserialize(self, payload: bytes) -> PydanticT:
+        return self.cls.model_validate(self._msgpack.unpackb(payload))
+
+    def serialize(self, message: PydanticT) -> bytes:
+        return cast(bytes, self._msgpack.packb(message.model_dump(mode="json")))
+
+
+ProtobufT = TypeVar("ProtobufT", bound=protobuf_message.Message)
+
+
+class ProtobufMessageSerializer(MessageSerializer[ProtobufT]):
+    """Serializes protobuf messages to their binary wire format.
+
+    The type name is the full name of the message in its proto package, as used by other languages.
+    """
+
+    def __init__(self, cls: type[ProtobufT]) -> None:
+        self.cls = cls
+
+    @property
+    def data_content_type(self) -> str:
+        return PROTOBUF_DATA_CONTENT_TYPE
+
+    @property
+    def type_name(self) -> str:
+        return _type_name(self.cls)
+
+    def deserialize(self, payload: bytes) -> ProtobufT:
+        return self.cls.FromString(payload)
+
+    def serialize(self, message: ProtobufT) -> bytes:
+        return message.SerializeToString()
+
+
 @dataclass
 class UnknownPayload:
     type_name: str
@@ -151,6 +259,10 @@ class UnknownPayload:
 
 
 def _type_name(cls: type[Any] | Any) -> str:
+    if isinstance(cls, protobuf_message.Message) or (
+        isinstance(cls, type) and issubclass(cls, protobuf_message.Message)
+    ):
+        return cls.DESCRIPTOR.full_name
     if isinstance(cls, type):
         return cls.__name__
     else:
@@ -160,13 +272,28 @@ def _type_name(cls: type[Any] | Any) -> str:
 V = TypeVar("V")
 
 
+def get_known_data_content_types() -> List[str]:
+    """Returns the content types :func:`try_get_known_serializers_for_type` returns dataclass serializers for.
+
+    A runtime advertising them expects the serializers of its message types to be registered in each of them. A
+    message of a registered type in a content type without a serializer fails to deserialize.
+    """
+    if is_msgpack_available():
+        return [JSON_DATA_CONTENT_TYPE, MSGPACK_DATA_CONTENT_TYPE]
+    return [JSON_DATA_CONTENT_TYPE]
+
+
 def try_get_known_serializers_for_type(cls: type[Any]) -> list[MessageSerializer[Any]]:
-    # TODO: Support protobuf types
     serializers: List[MessageSerializer[Any]] = []
-    if issubclass(cls, BaseModel):
+    if issubclass(cls, protobuf_message.Message):
+        serializers.append(ProtobufMessageSerializer(cls))
+    elif issubclass(cls, BaseModel):
         serializers.append(PydanticJsonMessageSerializer(cls))
     elif isinstance(cls, IsDataclass):
         serializers.append(DataclassJsonMessageSerializer(cls))
+        # Added if msgpack is installed, so that the type can be received in either format.
+        if is_msgpack_available():
+            serializers.append(DataclassMsgpackMessageSerializer(cls))
 
     return serializers
 
@@ -175,6 +302,10 @@ class SerializationRegistry:
     def __init__(self) -> None:
         # type_name, data_content_type -> serializer
         self._serializers: dict[tuple[str, str], MessageSerializer[Any]] = {}
+        # message class -> type_name
+        self._type_names: dict[type[Any], str] = {}
+        # type_name -> data_content_types with a serializer
+        self._data_content_types: dict[str, set[str]] = {}
 
     def add_serializer(self, serializer: MessageSerializer[Any] | Sequence[MessageSerializer[Any]]) -> None:
         if isinstance(serializer, Sequence):
@@ -183,15 +314,30 @@ def add_serializer(self, serializer: MessageSerializer[Any] | Sequence[MessageSe
             return
 
         self._serializers[(serializer.type_name, serializer.data_content_type)] = serializer
+        self._data_content_types.setdefault(serializer.type_name, set()).add(serializer.data_content_type)
 
     def deserialize(self, payload: bytes, *, type_name: str, data_content_type: str) -> Any:
         serializer = self._serializers.get((type_name, data_content_type))
         if serializer is None:
+            known_content_types = self._data_content_types.get(type_name)
+            if known_content_types:
+                # The type is known, handing the message on undecoded would be mistaken for an unknown type.
+                raise ValueError(
+                    f"Type {type_name} cannot be deserialized from content type {data_content_type}, only from "
+                    f"{', '.join(sorted(known_content_types))}"
+                )
             return UnknownPayload(type_name, data_content_type, payload)
 
         return serializer.deserialize(payload)
 
     def serialize(self, message: Any, *, type_name: str, data_content_type: str) -> bytes:
+        if (
+            isinstance(message, UnknownPayload)
+            and message.type_name == type_name
+            and message.data_content_type == data_content_type
+        ):
+            # A payload that was never deserialized is passed on as is.
+            return message.payload
         serializer = self._serializers.get((type_name, data_content_type))
         if serializer is None:
             raise ValueError(f"Unknown type {type_name} with content type {data_content_type}")
@@ -202,4 +348,10 @@ def is_registered(self, type_name: str, data_content_type: str) -> bool:
         return (type_name, data_content_type) in self._serializers
 
     def type_name(self, message: Any) -> str:
-        return _type_name(message)
+        if isinstance(message, UnknownPayload):
+            return message.type_name
+        cls = type(message)
+        type_name = self._type_names.get(cls)
+        if type_name is None:
+            type_name = self._type_names[cls] = _type_name(message)
+        return type_name
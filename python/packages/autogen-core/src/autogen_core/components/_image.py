@@ -13,44 +13,116 @@
 from pydantic_core import core_schema
 from typing_extensions import Literal
 
+ImageFormat = Literal["PNG", "JPEG", "WEBP"]
+"""The formats an :class:`Image` can be encoded to."""
+
+# Formats whose original bytes are sent as they are, the other ones are encoded to PNG.
+_KEPT_FORMATS = {"PNG", "JPEG", "WEBP"}
+
 
 class Image:
-    def __init__(self, image: PILImage.Image):
-        self.image: PILImage.Image = image.convert("RGB")
+    """An image in a message to a model.
+
+    The image is encoded once, the first time it is needed, and the encoding is reused by :meth:`to_base64`,
+    :attr:`data_uri`, :meth:`to_openai_format` and serialization. Images created from encoded bytes, with
+    :meth:`from_base64`, :meth:`from_uri`, :meth:`from_file` or :meth:`from_url`, keep the bytes they were created
+    from if they are PNG, JPEG or WebP and no ``format`` is given, and are only decoded when :attr:`image` is used.
+
+    Assigning :attr:`image` discards the encoding. Changes made in place to the PIL image are not noticed, assign it
+    again to encode it again.
+
+    Args:
+        image (PIL.Image.Image): The image, converted to RGB.
+        format (str, optional): The format to encode the image to, ``"PNG"``, ``"JPEG"`` or ``"WEBP"``. Defaults to
+            ``"PNG"``.
+        quality (int, optional): The quality of the JPEG and WebP encodings, from 0 to 100, lower is smaller.
+            Defaults to None, the Pillow default.
+    """
+
+    def __init__(self, image: PILImage.Image, format: ImageFormat = "PNG", quality: int | None = None):
+        self._image: PILImage.Image | None = image.convert("RGB")
+        # The image opened from the kept bytes, decoded when the image is first used.
+        self._opened: PILImage.Image | None = None
+        self._format = format
+        self._quality = quality
+        self._encoded: bytes | None = None
+        self._base64: str | None = None
+        self._data_uri: str | None = None
+
+    @property
+    def image(self) -> PILImage.Image:
+        if self._image is None:
+            assert self._opened is not None
+            self._image = self._opened.convert("RGB")
+            self._opened = None
+        return self._image
+
+    @image.setter
+    def image(self, image: PILImage.Image) -> None:
+        self._image = image.convert("RGB")
+        self._opened = None
+        self._encoded = None
+        self._base64 = None
+        self._data_uri = None
 
     @classmethod
-    def from_pil(cls, pil_image: PILImage.Image) -> Image:
-        return cls(pil_image)
+    def from_pil(cls, pil_image: PILImage.Image, format: ImageFormat = "PNG", quality: int | None = None) -> Image:
+        return cls(pil_image, format, quality)
 
     @classmethod
-    def from_uri(cls, uri: str) -> Image:
-        if not re.match(r"data:image/(?:png|jpeg);base64,", uri):
+    def from_uri(cls, uri: str, format: ImageFormat | None = None, quality: int | None = None) -> Image:
+        if not re.match(r"data:image/(?:png|jpeg|gif|webp);base64,", uri):
             raise ValueError("Invalid URI format. It should be a base64 encoded image URI.")
 
         # A URI. Remove the prefix and decode the base64 string.
-        base64_data = re.sub(r"data:image/(?:png|jpeg);base64,", "", uri)
-        return cls.from_base64(base64_data)
+        base64_data = re.sub(r"data:image/(?:png|jpeg|gif|webp);base64,", "", uri)
+        return cls.from_base64(base64_data, format, quality)
 
     @classmethod
-    async def from_url(cls, url: str) -> Image:
+    async def from_url(cls, url: str, format: ImageFormat | None = None, quality: int | None = None) -> Image:
         async with aiohttp.ClientSession() as session:
             async with session.get(url) as response:
                 content = await response.read()
-                return cls(PILImage.open(content))
+                return cls._from_bytes(content, format, quality)
 
     @classmethod
-    def from_base64(cls, base64_str: str) -> Image:
-        return cls(PILImage.open(BytesIO(base64.b64decode(base64_str))))
+    def from_base64(cls, base64_str: str, format: ImageFormat | None = None, quality: int | None = None) -> Image:
+        return cls._from_bytes(base64.b64decode(base64_str), format, quality)
 
-    def to_base64(self) -> str:
-        buffered = BytesIO()
-        self.image.save(buffered, format="PNG")
-        content = buffered.getvalue()
-        return base64.b64encode(content).decode("utf-8")
+    @classmethod
+    def from_file(cls, file_path: Path, format: ImageFormat | None = None, quality: int | None = None) -> Image:
+        return cls._from_bytes(Path(file_path).read_bytes(), format, quality)
 
     @classmethod
-    def from_file(cls, file_path: Path) -> Image:
-        return cls(PILImage.open(file_path))
+    def _from_bytes(cls, data: bytes, format: ImageFormat | None, quality: int | None) -> Image:
+        # Opening only reads the header, the pixels are decoded by convert.
+        opened = PILImage.open(BytesIO(data))
+        if format is not None or opened.format not in _KEPT_FORMATS:
+            return cls(opened, format or "PNG", quality)
+        image = cls.__new__(cls)
+        image._image = None
+        image._opened = opened
+        image._format = cast(ImageFormat, opened.format)
+        image._quality = quality
+        image._encoded = data
+        image._base64 = None
+        image._data_uri = None
+        return image
+
+    def to_base64(self) -> str:
+        if self._base64 is None:
+            self._base64 = base64.b64encode(self._encode()).decode("utf-8")
+        return self._base64
+
+    def _encode(self) -> bytes:
+        if self._encoded is None:
+            buffered = BytesIO()
+            if self._quality is not None and self._format != "PNG":
+                self.image.save(buffered, format=self._format, quality=self._quality)
+            else:
+                self.image.save(buffered, format=self._format)
+            self._encoded = buffered.getvalue()
+        return self._encoded
 
     def _repr_html_(self) -> str:
         # Show the image in Jupyter notebook
@@ -58,7 +130,9 @@ def _repr_html_(self) -> str:
 
     @property
     def data_uri(self) -> str:
-        return _convert_base64_to_data_uri(self.to_base64())
+        if self._data_uri is None:
+            self._data_uri = _convert_base64_to_data_uri(self.to_base64())
+        return self._data_uri
 
     def to_openai_format(self, detail: Literal["auto", "low", "high"] = "auto") -> ChatCompletionContentPartImageParam:
         return {"type": "image_url", "image_url": {"url": self.data_uri, "detail": detail}}
@@ -90,8 +164,8 @@ def serialize(value: Image) -> dict[str, Any]:
 
 def _convert_base64_to_data_uri(base64_image: str) -> str:
     def _get_mime_type_from_data_uri(base64_image: str) -> str:
-        # Decode the base64 string
-        image_data = base64.b64decode(base64_image)
+        # Decode the first bytes of the base64 string, enough for the signatures
+        image_data = base64.b64decode(base64_image[:16])
         # Check the first few bytes for known signatures
         if image_data.startswith(b"\xff\xd8\xff"):
             return "image/jpeg"
@@ -2,7 +2,16 @@
 import warnings
 from typing import TYPE_CHECKING, Any
 
+from ._cache import (
+    CachedChatCompletionClient,
+    ChatCompletionCacheStats,
+    ChatCompletionCacheStore,
+    InMemoryChatCompletionCacheStore,
+    SqliteChatCompletionCacheStore,
+)
 from ._model_client import ChatCompletionClient, ModelCapabilities
+from ._rate_limit import ChatCompletionRateLimiter, RateLimitedChatCompletionClient
+from ._single_flight import SingleFlightChatCompletionClient
 from ._types import (
     AssistantMessage,
     ChatCompletionTokenLogprob,
@@ -26,6 +35,14 @@
     "OpenAIChatCompletionClient",
     "ModelCapabilities",
     "ChatCompletionClient",
+    "CachedChatCompletionClient",
+    "ChatCompletionCacheStats",
+    "ChatCompletionCacheStore",
+    "InMemoryChatCompletionCacheStore",
+    "SqliteChatCompletionCacheStore",
+    "SingleFlightChatCompletionClient",
+    "ChatCompletionRateLimiter",
+    "RateLimitedChatCompletionClient",
     "SystemMessage",
     "UserMessage",
     "AssistantMessage",
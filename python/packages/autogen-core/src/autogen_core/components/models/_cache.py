@@ -0,0 +1,307 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Any, AsyncGenerator, List, Mapping, Optional, Protocol, Sequence, Union, runtime_checkable
+
+from pydantic import TypeAdapter
+
+from ...base import CancellationToken
+from ..tools import Tool, ToolSchema
+from ._model_client import ChatCompletionClient, ModelCapabilities
+from ._types import CreateResult, LLMMessage, RequestUsage
+
+
+@dataclass(frozen=True)
+class ChatCompletionCacheStats:
+    """A snapshot of the statistics of a :class:`CachedChatCompletionClient`.
+
+    Args:
+        hits (int): The number of calls answered from the cache.
+        misses (int): The number of calls forwarded to the wrapped client.
+    """
+
+    hits: int
+    misses: int
+
+
+@runtime_checkable
+class ChatCompletionCacheStore(Protocol):
+    """Stores the responses cached by :class:`CachedChatCompletionClient`, serialized, by the hash of their
+    request."""
+
+    async def get(self, key: str) -> bytes | None:
+        """Get a cached response.
+
+        Args:
+            key (str): The hash of the request.
+
+        Returns:
+            bytes | None: The cached response, or None if the request was not cached.
+        """
+        ...
+
+    async def set(self, key: str, value: bytes) -> None:
+        """Cache a response.
+
+        Args:
+            key (str): The hash of the request.
+            value (bytes): The response.
+        """
+        ...
+
+
+class InMemoryChatCompletionCacheStore(ChatCompletionCacheStore):
+    """A :class:`ChatCompletionCacheStore` that keeps the most recently used responses in memory, they are lost when
+    the process exits.
+
+    Args:
+        max_entries (int, optional): The maximum number of responses kept. Defaults to 1000.
+    """
+
+    def __init__(self, max_entries: int = 1000) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1.")
+        self._max_entries = max_entries
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: str) -> bytes | None:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+
+class SqliteChatCompletionCacheStore(ChatCompletionCacheStore):
+    """A :class:`ChatCompletionCacheStore` that keeps the responses in a SQLite database, so that they are reused
+    across runs.
+
+    Each call runs on a worker thread, so that the event loop is not blocked on disk reads and writes.
+
+    Args:
+        path (str | os.PathLike[str]): The path of the database file, created if it does not exist.
+    """
+
+    def __init__(self, path: str | os.PathLike[str]) -> None:
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value BLOB NOT NULL)")
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            self._connection.close()
+
+    async def get(self, key: str) -> bytes | None:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: bytes) -> None:
+        await asyncio.to_thread(self._set, key, value)
+
+    def _get(self, key: str) -> bytes | None:
+        with self._lock:
+            row = self._connection.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+        return None if row is None else bytes(row[0])
+
+    def _set(self, key: str, value: bytes) -> None:
+        with self._lock:
+            self._connection.execute(
+                "INSERT INTO responses (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                (key, value),
+            )
+
+
+@dataclass
+class _CacheEntry:
+    result: CreateResult
+    # The chunks of a streamed response, None if the response was not streamed.
+    chunks: Optional[List[str]] = None
+
+
+_message_adapter: TypeAdapter[LLMMessage] = TypeAdapter(LLMMessage)
+_entry_adapter: TypeAdapter[_CacheEntry] = TypeAdapter(_CacheEntry)
+
+
+def client_configuration(client: ChatCompletionClient) -> Mapping[str, Any]:
+    # The configuration a client answers with: its class, capabilities and the create args it was constructed with,
+    # such as the model and temperature, which the OpenAI clients keep in _create_args. Clients wrapping another one,
+    # such as rate limited ones, are looked through.
+    inner = client
+    while not hasattr(inner, "_create_args"):
+        wrapped = getattr(inner, "_client", None)
+        if not isinstance(wrapped, ChatCompletionClient):
+            break
+        inner = wrapped
+    return {
+        "client": type(inner).__qualname__,
+        "capabilities": dict(client.capabilities),
+        "create_args": getattr(inner, "_create_args", None),
+    }
+
+
+def request_key(
+    messages: Sequence[LLMMessage],
+    tools: Sequence[Tool | ToolSchema],
+    json_output: Optional[bool],
+    extra_create_args: Mapping[str, Any],
+    namespace: str = "",
+    client: Mapping[str, Any] | None = None,
+) -> str:
+    # A SHA-256 hash of the canonical JSON encoding of a request, equal for requests a model answers the same.
+    request = {
+        "namespace": namespace,
+        "client": client,
+        "messages": [
+            [type(message).__name__, _message_adapter.dump_python(message, mode="json")] for message in messages
+        ],
+        "tools": [tool.schema if isinstance(tool, Tool) else tool for tool in tools],
+        "json_output": json_output,
+        "extra_create_args": extra_create_args,
+    }
+    # Keys are sorted so that equal mappings hash the same, and values JSON cannot encode are hashed by repr.
+    canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=repr)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class CachedChatCompletionClient(ChatCompletionClient):
+    """Wraps a :class:`ChatCompletionClient` to answer repeated requests from a cache.
+
+    Requests are keyed on a hash of their messages, tools, ``json_output`` and ``extra_create_args``, and of the
+    configuration of the wrapped client: its class, capabilities and the create args it was constructed with, such as
+    the model and temperature of an OpenAI client, so that differently configured clients can share a store. Responses
+    answered from the cache have :attr:`CreateResult.cached` set, and are not counted in the usage of the wrapped
+    client. A response streamed with :meth:`create_stream` is replayed chunk by chunk from the cache, and a response
+    created with :meth:`create` is replayed as a single chunk.
+
+    Configuration kept outside of the create args, such as the endpoint of an OpenAI client, is not part of the key.
+    Give clients that differ only in such configuration and share a store different namespaces.
+
+    Args:
+        client (ChatCompletionClient): The client to forward the requests that are not cached to.
+        store (ChatCompletionCacheStore, optional): Where the responses are cached. Defaults to an
+            :class:`InMemoryChatCompletionCacheStore`.
+        namespace (str, optional): Part of every key, to separate the responses of clients the key does not tell
+            apart. Defaults to an empty string.
+
+    Example:
+
+        .. code-block:: python
+
+            from autogen_core.components.models import CachedChatCompletionClient, SqliteChatCompletionCacheStore
+            from autogen_ext.models import OpenAIChatCompletionClient
+
+            client = CachedChatCompletionClient(
+                OpenAIChatCompletionClient(model="gpt-4o"),
+                SqliteChatCompletionCacheStore("cache.db"),
+            )
+    """
+
+    def __init__(
+        self,
+        client: ChatCompletionClient,
+        store: ChatCompletionCacheStore | None = None,
+        namespace: str = "",
+    ) -> None:
+        self._client = client
+        self._store = store if store is not None else InMemoryChatCompletionCacheStore()
+        self._namespace = namespace
+        self._client_configuration = client_configuration(client)
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def cache_stats(self) -> ChatCompletionCacheStats:
+        """A snapshot of the cache hits and misses."""
+        return ChatCompletionCacheStats(hits=self._hits, misses=self._misses)
+
+    def cache_key(
+        self,
+        messages: Sequence[LLMMessage],
+        tools: Sequence[Tool | ToolSchema] = [],
+        json_output: Optional[bool] = None,
+        extra_create_args: Mapping[str, Any] = {},
+    ) -> str:
+        """Returns the key a request is cached under, a SHA-256 hash of its canonical JSON encoding."""
+        return request_key(messages, tools, json_output, extra_create_args, self._namespace, self._client_configuration)
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        tools: Sequence[Tool | ToolSchema] = [],
+        json_output: Optional[bool] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> CreateResult:
+        key = self.cache_key(messages, tools, json_output, extra_create_args)
+        entry = await self._get(key)
+        if entry is not None:
+            return replace(entry.result, cached=True)
+        result = await self._client.create(messages, tools, json_output, extra_create_args, cancellation_token)
+        await self._store.set(key, _entry_adapter.dump_json(_CacheEntry(result)))
+        return result
+
+    async def create_stream(
+        self,
+        messages: Sequence[LLMMessage],
+        tools: Sequence[Tool | ToolSchema] = [],
+        json_output: Optional[bool] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> AsyncGenerator[Union[str, CreateResult], None]:
+        key = self.cache_key(messages, tools, json_output, extra_create_args)
+        entry = await self._get(key)
+        if entry is not None:
+            if entry.chunks is not None:
+                for cached_chunk in entry.chunks:
+                    yield cached_chunk
+            elif isinstance(entry.result.content, str):
+                yield entry.result.content
+            yield replace(entry.result, cached=True)
+            return
+        chunks: List[str] = []
+        async for chunk in self._client.create_stream(
+            messages, tools, json_output, extra_create_args, cancellation_token
+        ):
+            if isinstance(chunk, CreateResult):
+                await self._store.set(key, _entry_adapter.dump_json(_CacheEntry(chunk, chunks)))
+            else:
+                chunks.append(chunk)
+            yield chunk
+
+    async def _get(self, key: str) -> _CacheEntry | None:
+        value = await self._store.get(key)
+        if value is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        return _entry_adapter.validate_json(value)
+
+    def actual_usage(self) -> RequestUsage:
+        return self._client.actual_usage()
+
+    def total_usage(self) -> RequestUsage:
+        return self._client.total_usage()
+
+    def count_tokens(self, messages: Sequence[LLMMessage], tools: Sequence[Tool | ToolSchema] = []) -> int:
+        return self._client.count_tokens(messages, tools)
+
+    def remaining_tokens(self, messages: Sequence[LLMMessage], tools: Sequence[Tool | ToolSchema] = []) -> int:
+        return self._client.remaining_tokens(messages, tools)
+
+    @property
+    def capabilities(self) -> ModelCapabilities:
+        return self._client.capabilities
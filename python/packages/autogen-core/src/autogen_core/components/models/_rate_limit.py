@@ -0,0 +1,267 @@
+import asyncio
+import heapq
+import time
+from asyncio import Future, TimerHandle
+from itertools import count
+from typing import Any, AsyncGenerator, List, Mapping, Optional, Sequence, Tuple, Union
+
+from ...base import CancellationToken
+from ..tools import Tool, ToolSchema
+from ._model_client import ChatCompletionClient, ModelCapabilities
+from ._types import CreateResult, LLMMessage, RequestUsage
+
+
+class _TokenBucket:
+    # Holds up to a minute's worth of units, refilled continuously.
+    def __init__(self, per_minute: int) -> None:
+        self.capacity = float(per_minute)
+        self._rate = per_minute / 60
+        self._level = self.capacity
+        self._updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self._level = min(self.capacity, self._level + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def has(self, amount: float) -> bool:
+        return self._level >= amount
+
+    def take(self, amount: float) -> None:
+        # The level can go below zero when a usage turns out larger than estimated.
+        self._level -= amount
+
+    def give(self, amount: float) -> None:
+        self._level = min(self.capacity, self._level + amount)
+
+    def wait_time(self, amount: float) -> float:
+        return max(amount - self._level, 0) / self._rate
+
+
+class ChatCompletionRateLimiter:
+    """Limits the requests sent to a model deployment, shared by the :class:`RateLimitedChatCompletionClient`
+    instances of every client that targets the deployment.
+
+    Requests wait until the token buckets for requests per minute and tokens per minute have room for them, and
+    until fewer than ``max_in_flight`` requests are in flight, so that the deployment's rate limits are not hit
+    instead of being retried. Waiting requests are let through by priority, highest first, and in arrival order
+    within a priority, so that latency sensitive calls, such as an orchestrator's, go ahead of bulk calls.
+
+    Args:
+        requests_per_minute (int, optional): The maximum number of requests per minute. Defaults to None, not
+            limiting the requests.
+        tokens_per_minute (int, optional): The maximum number of prompt and completion tokens per minute. Requests
+            are admitted on an estimate of their prompt tokens, and the estimate is corrected with the usage of
+            their response. Defaults to None, not limiting the tokens.
+        max_in_flight (int, optional): The maximum number of requests in flight. Defaults to None, not limiting
+            them.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int | None = None,
+        tokens_per_minute: int | None = None,
+        max_in_flight: int | None = None,
+    ) -> None:
+        if requests_per_minute is not None and requests_per_minute < 1:
+            raise ValueError("requests_per_minute must be at least 1.")
+        if tokens_per_minute is not None and tokens_per_minute < 1:
+            raise ValueError("tokens_per_minute must be at least 1.")
+        if max_in_flight is not None and max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1.")
+        self._requests = _TokenBucket(requests_per_minute) if requests_per_minute is not None else None
+        self._tokens = _TokenBucket(tokens_per_minute) if tokens_per_minute is not None else None
+        self._max_in_flight = max_in_flight
+        self._in_flight = 0
+        # Waiting requests: negated priority, arrival order, tokens and the future resolved when admitted.
+        self._waiters: List[Tuple[int, int, int, Future[None]]] = []
+        self._arrivals = count()
+        self._wakeup: TimerHandle | None = None
+
+    @property
+    def in_flight(self) -> int:
+        """The number of requests admitted and not released yet."""
+        return self._in_flight
+
+    @property
+    def waiting(self) -> int:
+        """The number of requests waiting to be admitted."""
+        return sum(1 for *_, future in self._waiters if not future.done())
+
+    async def acquire(self, tokens: int = 0, priority: int = 0) -> int:
+        """Wait until a request can be sent. Every call must be followed by a call to :meth:`release`.
+
+        Args:
+            tokens (int, optional): The estimated number of tokens of the request. Defaults to 0.
+            priority (int, optional): Requests with a higher priority are admitted first. Defaults to 0.
+
+        Returns:
+            int: The number of tokens taken from the token bucket, which is at most its capacity, to correct with
+            the actual usage of the request on :meth:`release`.
+        """
+        if self._tokens is not None:
+            # A request larger than the bucket waits for a full bucket.
+            tokens = min(tokens, int(self._tokens.capacity))
+        if not self._waiters and self._try_admit(tokens):
+            return tokens
+        future: Future[None] = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (-priority, next(self._arrivals), tokens, future))
+        self._admit_waiters()
+        try:
+            await future
+            return tokens
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Admitted just before being cancelled.
+                self.release()
+            else:
+                self._admit_waiters()
+            raise
+
+    def release(self, token_correction: int = 0) -> None:
+        """Release a request admitted by :meth:`acquire` once its response was received.
+
+        Args:
+            token_correction (int, optional): The tokens taken by :meth:`acquire` minus the actual usage of the
+                request, given back to the token bucket, or taken from it if negative. Defaults to 0.
+        """
+        self._in_flight -= 1
+        if self._tokens is not None and token_correction:
+            self._tokens.refill(time.monotonic())
+            if token_correction > 0:
+                self._tokens.give(token_correction)
+            else:
+                self._tokens.take(-token_correction)
+        self._admit_waiters()
+
+    def _try_admit(self, tokens: int) -> bool:
+        if self._max_in_flight is not None and self._in_flight >= self._max_in_flight:
+            return False
+        now = time.monotonic()
+        if self._requests is not None:
+            self._requests.refill(now)
+            if not self._requests.has(1):
+                return False
+        if self._tokens is not None:
+            self._tokens.refill(now)
+            if not self._tokens.has(tokens):
+                return False
+        if self._requests is not None:
+            self._requests.take(1)
+        if self._tokens is not None:
+            self._tokens.take(tokens)
+        self._in_flight += 1
+        return True
+
+    def _admit_waiters(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+            self._wakeup = None
+        while self._waiters:
+            _, _, tokens, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+            elif self._try_admit(tokens):
+                heapq.heappop(self._waiters)
+                future.set_result(None)
+            else:
+                break
+        if not self._waiters or (self._max_in_flight is not None and self._in_flight >= self._max_in_flight):
+            # Nothing waits, or a release admits the next request.
+            return
+        # Wait for the buckets to refill enough for the first request in line.
+        tokens = self._waiters[0][2]
+        delay = max(
+            self._requests.wait_time(1) if self._requests is not None else 0,
+            self._tokens.wait_time(tokens) if self._tokens is not None else 0,
+        )
+        self._wakeup = asyncio.get_running_loop().call_later(delay, self._admit_waiters)
+
+
+class RateLimitedChatCompletionClient(ChatCompletionClient):
+    """Wraps a :class:`ChatCompletionClient` to send its requests through a :class:`ChatCompletionRateLimiter`.
+
+    The tokens of a request are estimated with :meth:`count_tokens` of the wrapped client, and corrected with the
+    usage of the response. Wrap a client several times with the same limiter and different priorities to give some
+    callers precedence.
+
+    Args:
+        client (ChatCompletionClient): The client to send the requests to.
+        limiter (ChatCompletionRateLimiter): The limiter of the deployment the client targets.
+        priority (int, optional): The priority of the requests of this client. Defaults to 0.
+
+    Example:
+
+        .. code-block:: python
+
+            from autogen_core.components.models import ChatCompletionRateLimiter, RateLimitedChatCompletionClient
+            from autogen_ext.models import OpenAIChatCompletionClient
+
+            model_client = OpenAIChatCompletionClient(model="gpt-4o")
+            limiter = ChatCompletionRateLimiter(requests_per_minute=500, tokens_per_minute=30000, max_in_flight=16)
+            orchestrator_client = RateLimitedChatCompletionClient(model_client, limiter, priority=1)
+            worker_client = RateLimitedChatCompletionClient(model_client, limiter)
+    """
+
+    def __init__(self, client: ChatCompletionClient, limiter: ChatCompletionRateLimiter, priority: int = 0) -> None:
+        self._client = client
+        self._limiter = limiter
+        self._priority = priority
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        tools: Sequence[Tool | ToolSchema] = [],
+        json_output: Optional[bool] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> CreateResult:
+        charged = await self._acquire(self._client.count_tokens(messages, tools), cancellation_token)
+        token_correction = 0
+        try:
+            result = await self._client.create(messages, tools, json_output, extra_create_args, cancellation_token)
+            token_correction = charged - result.usage.prompt_tokens - result.usage.completion_tokens
+            return result
+        finally:
+            self._limiter.release(token_correction)
+
+    async def create_stream(
+        self,
+        messages: Sequence[LLMMessage],
+        tools: Sequence[Tool | ToolSchema] = [],
+        json_output: Optional[bool] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> AsyncGenerator[Union[str, CreateResult], None]:
+        charged = await self._acquire(self._client.count_tokens(messages, tools), cancellation_token)
+        token_correction = 0
+        try:
+            async for chunk in self._client.create_stream(
+                messages, tools, json_output, extra_create_args, cancellation_token
+            ):
+                if isinstance(chunk, CreateResult):
+                    token_correction = charged - chunk.usage.prompt_tokens - chunk.usage.completion_tokens
+                yield chunk
+        finally:
+            self._limiter.release(token_correction)
+
+    async def _acquire(self, estimate: int, cancellation_token: Optional[CancellationToken]) -> int:
+        admission = asyncio.ensure_future(self._limiter.acquire(estimate, self._priority))
+        if cancellation_token is not None:
+            cancellation_token.link_future(admission)
+        return await admission
+
+    def actual_usage(self) -> RequestUsage:
+        return self._client.actual_usage()
+
+    def total_usage(self) -> RequestUsage:
+        return self._client.total_usage()
+
+    def count_tokens(self, messages: Sequence[LLMMessage], tools: Sequence[Tool | ToolSchema] = []) -> int:
+        return self._client.count_tokens(messages, tools)
+
+    def remaining_tokens(self, messages: Sequence[LLMMessage], tools: Sequence[Tool | ToolSchema] = []) -> int:
+        return self._client.remaining_tokens(messages, tools)
+
+    @property
+    def capabilities(self) -> ModelCapabilities:
+        return self._client.capabilities
@@ -0,0 +1,111 @@
+import asyncio
+from asyncio import Task
+from dataclasses import dataclass, replace
+from functools import partial
+from typing import Any, AsyncGenerator, Dict, Mapping, Optional, Sequence, Union
+
+from ...base import CancellationToken
+from ..tools import Tool, ToolSchema
+from ._cache import request_key
+from ._model_client import ChatCompletionClient, ModelCapabilities
+from ._types import CreateResult, LLMMessage, RequestUsage
+
+
+@dataclass
+class _Flight:
+    task: Task[CreateResult]
+    # The number of callers waiting for the result.
+    waiters: int = 0
+
+
+class SingleFlightChatCompletionClient(ChatCompletionClient):
+    """Wraps a :class:`ChatCompletionClient` to send concurrent identical requests to it once.
+
+    A :meth:`create` call for a request that is already in flight waits for the result of that request instead of
+    sending it again, so that agents prompting a model with the same messages at the same time spend the tokens
+    once. Requests are identical if their messages, tools, ``json_output`` and ``extra_create_args`` are, compared
+    by the same hash as :class:`CachedChatCompletionClient`. The callers that joined a request in flight get a copy
+    of its result with :attr:`CreateResult.cached` set. Results are not kept once the request completed, wrap the
+    client in a :class:`CachedChatCompletionClient` to also answer later requests.
+
+    Cancelling a call only cancels the request sent to the wrapped client when no other caller waits for it.
+    Streamed requests are not coalesced.
+
+    Args:
+        client (ChatCompletionClient): The client to send the requests to.
+    """
+
+    def __init__(self, client: ChatCompletionClient) -> None:
+        self._client = client
+        self._flights: Dict[str, _Flight] = {}
+        self._coalesced_requests = 0
+
+    @property
+    def coalesced_requests(self) -> int:
+        """The number of calls that were answered by a request already in flight."""
+        return self._coalesced_requests
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        tools: Sequence[Tool | ToolSchema] = [],
+        json_output: Optional[bool] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> CreateResult:
+        key = request_key(messages, tools, json_output, extra_create_args)
+        flight = self._flights.get(key)
+        joined = flight is not None
+        if flight is None:
+            # The request is sent without the caller's cancellation token, cancelling it is up to the last waiter.
+            flight = self._flights[key] = _Flight(
+                asyncio.create_task(self._client.create(messages, tools, json_output, extra_create_args))
+            )
+            flight.task.add_done_callback(partial(self._land, key, flight))
+        else:
+            self._coalesced_requests += 1
+        flight.waiters += 1
+        result = asyncio.shield(flight.task)
+        if cancellation_token is not None:
+            cancellation_token.link_future(result)
+        try:
+            create_result = await result
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Callers arriving before the task finished cancelling send the request again.
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                flight.task.cancel()
+        return replace(create_result, cached=True) if joined else create_result
+
+    def _land(self, key: str, flight: _Flight, task: Task[CreateResult]) -> None:
+        # Later requests are sent again once the request completed.
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def create_stream(
+        self,
+        messages: Sequence[LLMMessage],
+        tools: Sequence[Tool | ToolSchema] = [],
+        json_output: Optional[bool] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> AsyncGenerator[Union[str, CreateResult], None]:
+        return self._client.create_stream(messages, tools, json_output, extra_create_args, cancellation_token)
+
+    def actual_usage(self) -> RequestUsage:
+        return self._client.actual_usage()
+
+    def total_usage(self) -> RequestUsage:
+        return self._client.total_usage()
+
+    def count_tokens(self, messages: Sequence[LLMMessage], tools: Sequence[Tool | ToolSchema] = []) -> int:
+        return self._client.count_tokens(messages, tools)
+
+    def remaining_tokens(self, messages: Sequence[LLMMessage], tools: Sequence[Tool | ToolSchema] = []) -> int:
+        return self._client.remaining_tokens(messages, tools)
+
+    @property
+    def capabilities(self) -> ModelCapabilities:
+        return self._client.capabilities
@@ -0,0 +1,263 @@
+import asyncio
+from pathlib import Path
+from typing import Any, AsyncGenerator, List, Mapping, Optional, Sequence, Union
+
+import pytest
+from autogen_core.base import CancellationToken
+from autogen_core.components import FunctionCall
+from autogen_core.components.models import (
+    CachedChatCompletionClient,
+    ChatCompletionCacheStats,
+    ChatCompletionClient,
+    ChatCompletionRateLimiter,
+    CreateResult,
+    InMemoryChatCompletionCacheStore,
+    LLMMessage,
+    ModelCapabilities,
+    RateLimitedChatCompletionClient,
+    RequestUsage,
+    SingleFlightChatCompletionClient,
+    SqliteChatCompletionCacheStore,
+    SystemMessage,
+    UserMessage,
+)
+from autogen_core.components.models._openai_client import OpenAIChatCompletionClient
+from autogen_core.components.tools import FunctionTool, Tool, ToolSchema
+
+
+class CountingChatCompletionClient(ChatCompletionClient):
+    """Answers every request with the number of requests it received."""
+
+    def __init__(self, latency: float = 0, create_args: Mapping[str, Any] | None = None) -> None:
+        self.calls = 0
+        self.cancelled_calls = 0
+        self._latency = latency
+        # Like the OpenAI clients, which the cache keys on the create args of.
+        self._create_args = create_args
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        tools: Sequence[Tool | ToolSchema] = [],
+        json_output: Optional[bool] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> CreateResult:
+        self.calls += 1
+        if extra_create_args.get("fail"):
+            raise ValueError("The request failed.")
+        try:
+            await asyncio.sleep(self._latency)
+        except asyncio.CancelledError:
+            self.cancelled_calls += 1
+            raise
+        if tools:
+            content: Union[str, List[FunctionCall]] = [FunctionCall(id="1", arguments="{}", name="tool")]
+            return CreateResult(
+                finish_reason="function_calls", content=content, usage=RequestUsage(10, 1), cached=False
+            )
+        return CreateResult(
+            finish_reason="stop", content=f"response {self.calls}", usage=RequestUsage(10, 2), cached=False
+        )
+
+    async def create_stream(
+        self,
+        messages: Sequence[LLMMessage],
+        tools: Sequence[Tool | ToolSchema] = [],
+        json_output: Optional[bool] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> AsyncGenerator[Union[str, CreateResult], None]:
+        self.calls += 1
+        yield "response "
+        yield str(self.calls)
+        yield CreateResult(
+            finish_reason="stop", content=f"response {self.calls}", usage=RequestUsage(10, 2), cached=False
+        )
+
+    def actual_usage(self) -> RequestUsage:
+        return RequestUsage(0, 0)
+
+    def total_usage(self) -> RequestUsage:
+        return RequestUsage(0, 0)
+
+    def count_tokens(self, messages: Sequence[LLMMessage], tools: Sequence[Tool | ToolSchema] = []) -> int:
+        return 0
+
+    def remaining_tokens(self, messages: Sequence[LLMMessage], tools: Sequence[Tool | ToolSchema] = []) -> int:
+        return 0
+
+    @property
+    def capabilities(self) -> ModelCapabilities:
+        return ModelCapabilities(vision=False, function_calling=True, json_output=True)
+
+
+def _tool(value: str) -> str:
+    return value
+
+
+messages: List[LLMMessage] = [SystemMessage(content="system"), UserMessage(content="hello", source="user")]
+
+
+@pytest.mark.asyncio
+async def test_cached_create() -> None:
+    inner = CountingChatCompletionClient()
+    client = CachedChatCompletionClient(inner)
+    first = await client.create(messages)
+    assert first.content == "response 1" and not first.cached
+    second = await client.create(messages)
+    assert second.content == "response 1" and second.cached
+    assert second.usage == first.usage
+    assert inner.calls == 1
+    assert client.cache_stats == ChatCompletionCacheStats(hits=1, misses=1)
+
+    # Any difference in the request is a miss.
+    tool = FunctionTool(_tool, description="A tool.")
+    tool_result = await client.create(messages, tools=[tool])
+    assert tool_result.content == [FunctionCall(id="1", arguments="{}", name="tool")]
+    assert (await client.create(messages, tools=[tool.schema])).cached
+    await client.create(messages, json_output=True)
+    await client.create(messages, extra_create_args={"temperature": 0.5})
+    await client.create([UserMessage(content="system", source="user"), messages[1]])
+    assert inner.calls == 5
+    assert client.cache_stats == ChatCompletionCacheStats(hits=2, misses=5)
+
+    # The order of the create args does not matter.
+    await client.create(messages, extra_create_args={"temperature": 0.5, "seed": 1})
+    assert (await client.create(messages, extra_create_args={"seed": 1, "temperature": 0.5})).cached
+
+
+@pytest.mark.asyncio
+async def test_cached_create_stream() -> None:
+    inner = CountingChatCompletionClient()
+    client = CachedChatCompletionClient(inner)
+    streamed = [chunk async for chunk in client.create_stream(messages)]
+    assert streamed[:2] == ["response ", "1"]
+    replayed = [chunk async for chunk in client.create_stream(messages)]
+    assert replayed[:2] == ["response ", "1"]
+    assert isinstance(replayed[2], CreateResult) and replayed[2].cached
+    assert inner.calls == 1
+
+    # A created response is replayed as one chunk, and a streamed one is returned by create.
+    assert (await client.create(messages)).content == "response 1"
+    other: List[LLMMessage] = [UserMessage(content="other", source="user")]
+    await client.create(other)
+    replayed = [chunk async for chunk in client.create_stream(other)]
+    assert replayed[0] == "response 2"
+    assert inner.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_in_memory_cache_store_eviction() -> None:
+    store = InMemoryChatCompletionCacheStore(max_entries=2)
+    await store.set("a", b"1")
+    await store.set("b", b"2")
+    assert await store.get("a") == b"1"
+    await store.set("c", b"3")
+    assert await store.get("b") is None
+    assert await store.get("a") == b"1"
+    assert len(store) == 2
+
+
+@pytest.mark.asyncio
+async def test_sqlite_cache_store(tmp_path: Path) -> None:
+    path = tmp_path / "cache.db"
+    store = SqliteChatCompletionCacheStore(path)
+    await CachedChatCompletionClient(CountingChatCompletionClient(), store, namespace="model").create(messages)
+    store.close()
+
+    # The response is reused by another run, but not by a client in another namespace.
+    store = SqliteChatCompletionCacheStore(path)
+    inner = CountingChatCompletionClient()
+    assert (await CachedChatCompletionClient(inner, store, namespace="model").create(messages)).cached
+    assert not (await CachedChatCompletionClient(inner, store, namespace="other").create(messages)).cached
+    assert inner.calls == 1
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_cache_keys_on_client_configuration() -> None:
+    store = InMemoryChatCompletionCacheStore()
+    small = CountingChatCompletionClient(create_args={"model": "small"})
+    large = CountingChatCompletionClient(create_args={"model": "large"})
+    await CachedChatCompletionClient(small, store).create(messages)
+
+    # Clients configured differently that share a store do not answer each other's requests.
+    assert not (await CachedChatCompletionClient(large, store).create(messages)).cached
+    assert (
+        await CachedChatCompletionClient(CountingChatCompletionClient(create_args={"model": "small"}), store).create(
+            messages
+        )
+    ).cached
+    assert small.calls == 1 and large.calls == 1
+
+    # The create args of the OpenAI clients are part of the key, also through the clients wrapping them.
+    def key(client: ChatCompletionClient) -> str:
+        return CachedChatCompletionClient(client).cache_key(messages)
+
+    gpt_4o = OpenAIChatCompletionClient(model="gpt-4o", api_key="key")
+    assert key(gpt_4o) == key(OpenAIChatCompletionClient(model="gpt-4o", api_key="other key"))
+    assert key(gpt_4o) != key(OpenAIChatCompletionClient(model="gpt-4o-mini", api_key="key"))
+    assert key(gpt_4o) != key(OpenAIChatCompletionClient(model="gpt-4o", api_key="key", temperature=0.5))
+    assert key(RateLimitedChatCompletionClient(gpt_4o, ChatCompletionRateLimiter(requests_per_minute=10))) == key(
+        gpt_4o
+    )
+
+
+@pytest.mark.asyncio
+async def test_single_flight_create() -> None:
+    inner = CountingChatCompletionClient(latency=0.1)
+    client = SingleFlightChatCompletionClient(inner)
+    other: List[LLMMessage] = [UserMessage(content="other", source="user")]
+    results = await asyncio.gather(*(client.create(messages) for _ in range(5)), client.create(other))
+    assert inner.calls == 2
+    assert client.coalesced_requests == 4
+    assert all(result.content == results[0].content for result in results[:5])
+    assert [result.cached for result in results] == [False, True, True, True, True, False]
+
+    # A request is sent again once the identical request completed.
+    await client.create(messages)
+    assert inner.calls == 3
+
+    # The error of a request is raised to every caller.
+    errors = await asyncio.gather(
+        *(client.create(messages, extra_create_args={"fail": True}) for _ in range(3)), return_exceptions=True
+    )
+    assert all(isinstance(error, ValueError) for error in errors)
+    assert inner.calls == 4
+
+
+@pytest.mark.asyncio
+async def test_single_flight_cancellation() -> None:
+    inner = CountingChatCompletionClient(latency=0.1)
+    client = SingleFlightChatCompletionClient(inner)
+
+    # Cancelling one caller does not cancel the request of the others.
+    token = CancellationToken()
+    cancelled = asyncio.create_task(client.create(messages, cancellation_token=token))
+    waiting = asyncio.create_task(client.create(messages))
+    await asyncio.sleep(0.01)
+    token.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+    assert (await waiting).content == "response 1"
+    assert inner.cancelled_calls == 0
+
+    # Cancelling every caller cancels the request.
+    tokens = [CancellationToken(), CancellationToken()]
+    tasks = [asyncio.create_task(client.create(messages, cancellation_token=token)) for token in tokens]
+    await asyncio.sleep(0.01)
+    for token in tokens:
+        token.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await asyncio.sleep(0.01)
+    assert inner.cancelled_calls == 1
+
+    # A request sent while the cancelled request is still being cancelled is sent again.
+    token = CancellationToken()
+    cancelled = asyncio.create_task(client.create(messages, cancellation_token=token))
+    await asyncio.sleep(0.01)
+    token.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+    assert (await client.create(messages)).cached is False
@@ -0,0 +1,63 @@
+import base64
+import random
+from io import BytesIO
+from pathlib import Path
+
+from autogen_core.components import Image
+from PIL import Image as PILImage
+
+
+def _noise(size: int) -> PILImage.Image:
+    return PILImage.frombytes("RGB", (size, size), random.Random(0).randbytes(size * size * 3))
+
+
+def test_encoding_is_cached() -> None:
+    image = Image(_noise(64))
+    assert image.to_base64() is image.to_base64()
+    assert image.data_uri is image.data_uri
+    assert image.data_uri.startswith("data:image/png;base64,")
+    assert image.to_openai_format()["image_url"]["url"] is image.data_uri
+
+    # Assigning the image encodes it again.
+    encoded = image.to_base64()
+    image.image = PILImage.new("RGB", (10, 10))
+    assert image.to_base64() != encoded
+    assert PILImage.open(BytesIO(base64.b64decode(image.to_base64()))).size == (10, 10)
+
+
+def test_original_bytes_are_kept(tmp_path: Path) -> None:
+    buffered = BytesIO()
+    _noise(64).save(buffered, format="JPEG", quality=50)
+    jpeg = base64.b64encode(buffered.getvalue()).decode("utf-8")
+
+    image = Image.from_base64(jpeg)
+    assert image.to_base64() == jpeg
+    assert image.data_uri == f"data:image/jpeg;base64,{jpeg}"
+    assert image.image.size == (64, 64)
+    assert image.image.mode == "RGB"
+    assert Image.from_uri(image.data_uri).to_base64() == jpeg
+
+    path = tmp_path / "image.jpg"
+    path.write_bytes(buffered.getvalue())
+    assert Image.from_file(path).to_base64() == jpeg
+
+    # A format given re-encodes the image.
+    assert Image.from_base64(jpeg, format="PNG").data_uri.startswith("data:image/png;base64,")
+
+    # Formats other than PNG, JPEG and WebP are encoded to PNG.
+    buffered = BytesIO()
+    _noise(64).save(buffered, format="BMP")
+    bmp = Image.from_base64(base64.b64encode(buffered.getvalue()).decode("utf-8"))
+    assert bmp.data_uri.startswith("data:image/png;base64,")
+
+
+def test_lossy_formats() -> None:
+    pil_image = _noise(256)
+    png = Image(pil_image).to_base64()
+    jpeg = Image(pil_image, format="JPEG", quality=50)
+    webp = Image.from_pil(pil_image, format="WEBP", quality=50)
+    assert jpeg.data_uri.startswith("data:image/jpeg;base64,")
+    assert webp.data_uri.startswith("data:image/webp;base64,")
+    assert len(jpeg.to_base64()) < len(png)
+    assert len(webp.to_base64()) < len(png)
+    assert len(Image(pil_image, format="JPEG", quality=10).to_base64()) < len(jpeg.to_base64())
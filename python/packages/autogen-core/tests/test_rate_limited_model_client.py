@@ -0,0 +1,156 @@
+import asyncio
+import time
+from typing import Any, AsyncGenerator, List, Mapping, Optional, Sequence, Union
+
+import pytest
+from autogen_core.base import CancellationToken
+from autogen_core.components.models import (
+    ChatCompletionClient,
+    ChatCompletionRateLimiter,
+    CreateResult,
+    LLMMessage,
+    ModelCapabilities,
+    RateLimitedChatCompletionClient,
+    RequestUsage,
+    UserMessage,
+)
+from autogen_core.components.tools import Tool, ToolSchema
+
+
+class ConcurrencyTrackingChatCompletionClient(ChatCompletionClient):
+    """Records how many requests are in flight at most, and uses the tokens it estimates."""
+
+    def __init__(self, latency: float, tokens: int) -> None:
+        self._latency = latency
+        self._tokens = tokens
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        tools: Sequence[Tool | ToolSchema] = [],
+        json_output: Optional[bool] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> CreateResult:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self._latency)
+        self.in_flight -= 1
+        return CreateResult(finish_reason="stop", content="response", usage=RequestUsage(self._tokens, 0), cached=False)
+
+    async def create_stream(
+        self,
+        messages: Sequence[LLMMessage],
+        tools: Sequence[Tool | ToolSchema] = [],
+        json_output: Optional[bool] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> AsyncGenerator[Union[str, CreateResult], None]:
+        yield await self.create(messages, tools, json_output, extra_create_args, cancellation_token)
+
+    def actual_usage(self) -> RequestUsage:
+        return RequestUsage(0, 0)
+
+    def total_usage(self) -> RequestUsage:
+        return RequestUsage(0, 0)
+
+    def count_tokens(self, messages: Sequence[LLMMessage], tools: Sequence[Tool | ToolSchema] = []) -> int:
+        return self._tokens
+
+    def remaining_tokens(self, messages: Sequence[LLMMessage], tools: Sequence[Tool | ToolSchema] = []) -> int:
+        return 0
+
+    @property
+    def capabilities(self) -> ModelCapabilities:
+        return ModelCapabilities(vision=False, function_calling=False, json_output=False)
+
+
+messages: List[LLMMessage] = [UserMessage(content="hello", source="user")]
+
+
+@pytest.mark.asyncio
+async def test_max_in_flight() -> None:
+    inner = ConcurrencyTrackingChatCompletionClient(latency=0.05, tokens=10)
+    limiter = ChatCompletionRateLimiter(max_in_flight=2)
+    client = RateLimitedChatCompletionClient(inner, limiter)
+    await asyncio.gather(*(client.create(messages) for _ in range(6)))
+    assert inner.max_in_flight == 2
+    assert limiter.in_flight == 0
+    chunks = [chunk async for chunk in client.create_stream(messages)]
+    assert isinstance(chunks[-1], CreateResult)
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_tokens_per_minute() -> None:
+    # 6000 tokens per minute are 100 tokens per second.
+    limiter = ChatCompletionRateLimiter(tokens_per_minute=6000)
+    await limiter.acquire(6000)
+    limiter.release()
+    start = time.monotonic()
+    await limiter.acquire(30)
+    assert time.monotonic() - start >= 0.2
+    limiter.release()
+
+    # Tokens estimated but not used are given back.
+    limiter = ChatCompletionRateLimiter(tokens_per_minute=6000)
+    await limiter.acquire(6000)
+    limiter.release(token_correction=6000)
+    start = time.monotonic()
+    await limiter.acquire(6000)
+    assert time.monotonic() - start < 0.1
+    limiter.release()
+
+    # A request larger than the bucket takes the whole bucket, and the usage beyond it is taken on release.
+    limiter = ChatCompletionRateLimiter(tokens_per_minute=6000)
+    assert await limiter.acquire(12000) == 6000
+    limiter.release(token_correction=6000)
+    client = RateLimitedChatCompletionClient(ConcurrencyTrackingChatCompletionClient(latency=0, tokens=9000), limiter)
+    await client.create(messages)
+    # The bucket is 3000 tokens short, which takes 30 seconds to refill.
+    bucket = limiter._tokens  # type: ignore[reportPrivateUsage]
+    assert bucket is not None and bucket.wait_time(0) > 29
+
+
+@pytest.mark.asyncio
+async def test_priority() -> None:
+    limiter = ChatCompletionRateLimiter(max_in_flight=1)
+    await limiter.acquire()
+    admitted: List[str] = []
+
+    async def request(name: str, priority: int) -> None:
+        await limiter.acquire(priority=priority)
+        admitted.append(name)
+        limiter.release()
+
+    tasks = [
+        asyncio.create_task(request("bulk 1", 0)),
+        asyncio.create_task(request("bulk 2", 0)),
+        asyncio.create_task(request("orchestrator", 1)),
+    ]
+    await asyncio.sleep(0.01)
+    assert limiter.waiting == 3
+    limiter.release()
+    await asyncio.gather(*tasks)
+    assert admitted == ["orchestrator", "bulk 1", "bulk 2"]
+
+
+@pytest.mark.asyncio
+async def test_cancel_waiting_request() -> None:
+    inner = ConcurrencyTrackingChatCompletionClient(latency=0.1, tokens=10)
+    limiter = ChatCompletionRateLimiter(max_in_flight=1)
+    client = RateLimitedChatCompletionClient(inner, limiter)
+    first = asyncio.create_task(client.create(messages))
+    token = CancellationToken()
+    cancelled = asyncio.create_task(client.create(messages, cancellation_token=token))
+    await asyncio.sleep(0.01)
+    assert limiter.waiting == 1
+    token.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+    assert limiter.waiting == 0
+    await first
+    assert limiter.in_flight == 0
+    await client.create(messages)
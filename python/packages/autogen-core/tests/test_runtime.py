@@ -1,8 +1,12 @@
 import asyncio
+import json
 import logging
+from typing import Dict
 
 import pytest
 from autogen_core.application import SingleThreadedAgentRuntime
+from autogen_core.application.logging import EVENT_LOGGER_NAME
+from autogen_core.application.logging.events import DeliveryStage, MessageEvent, MessageKind
 from autogen_core.base import (
     AgentId,
     AgentInstantiationContext,
@@ -92,6 +96,42 @@ async def test_register_receives_publish(tracer_provider: TracerProvider) -> Non
     ]
 
 
+@pytest.mark.asyncio
+async def test_no_tracer_provider_creates_no_metadata() -> None:
+    runtime = SingleThreadedAgentRuntime()
+    await runtime.publish_message(MessageType(), topic_id=TopicId("default", "default"))
+    assert runtime.unprocessed_messages[0].metadata is None
+
+
+@pytest.mark.asyncio
+async def test_tracing_sampling_ratio(tracer_provider: TracerProvider) -> None:
+    with pytest.raises(ValueError):
+        SingleThreadedAgentRuntime(tracer_provider=tracer_provider, tracing_sampling_ratio=1.5)
+
+    runtime = SingleThreadedAgentRuntime(tracer_provider=tracer_provider, tracing_sampling_ratio=0.0)
+    await LoopbackAgentWithDefaultSubscription.register(runtime, "name", LoopbackAgentWithDefaultSubscription)
+    runtime.start()
+    await runtime.publish_message(MessageType(), topic_id=DefaultTopicId())
+    await runtime.send_message(MessageType(), AgentId("name", "default"))
+    await runtime.stop_when_idle()
+    assert test_exporter.get_exported_spans() == []
+
+    runtime = SingleThreadedAgentRuntime(tracer_provider=tracer_provider, tracing_sampling_ratio=0.5)
+    await LoopbackAgentWithDefaultSubscription.register(runtime, "name", LoopbackAgentWithDefaultSubscription)
+    runtime.start()
+    for _ in range(100):
+        await runtime.publish_message(MessageType(), topic_id=DefaultTopicId())
+    await runtime.stop_when_idle()
+
+    # Each message is traced either completely or not at all.
+    spans_per_trace: Dict[int, int] = {}
+    for span in test_exporter.get_exported_spans():
+        assert span.context is not None
+        spans_per_trace[span.context.trace_id] = spans_per_trace.get(span.context.trace_id, 0) + 1
+    assert 0 < len(spans_per_trace) < 100
+    assert all(count == 3 for count in spans_per_trace.values())
+
+
 @pytest.mark.asyncio
 async def test_register_receives_publish_with_exception(caplog: pytest.LogCaptureFixture) -> None:
     runtime = SingleThreadedAgentRuntime()
@@ -306,3 +346,96 @@ async def test_default_subscription_publish_to_other_source() -> None:
         AgentId("name", key="other"), type=LoopbackAgentWithDefaultSubscription
     )
     assert other_long_running_agent.num_calls == 1
+
+
+@pytest.mark.asyncio
+async def test_run_loop_waits_when_idle(monkeypatch: pytest.MonkeyPatch) -> None:
+    runtime = SingleThreadedAgentRuntime()
+    await LoopbackAgentWithDefaultSubscription.register(runtime, "name", LoopbackAgentWithDefaultSubscription)
+
+    process_next_calls = 0
+    process_next = runtime.process_next
+
+    async def counting_process_next() -> None:
+        nonlocal process_next_calls
+        process_next_calls += 1
+        await process_next()
+
+    monkeypatch.setattr(runtime, "process_next", counting_process_next)
+
+    runtime.start()
+    # An idle runtime should not poll the empty queue.
+    await asyncio.sleep(0.1)
+    assert process_next_calls == 0
+
+    # A queued message wakes the run loop up.
+    await runtime.publish_message(MessageType(), topic_id=DefaultTopicId())
+    await runtime.stop_when_idle()
+    assert process_next_calls == 1
+
+    agent = await runtime.try_get_underlying_agent_instance(AgentId("name", key="default"), type=LoopbackAgent)
+    assert agent.num_calls == 1
+
+
+@pytest.mark.asyncio
+async def test_stop_when_condition_on_outside_state() -> None:
+    runtime = SingleThreadedAgentRuntime()
+    runtime.start()
+    # The condition changes without any message being queued.
+    deadline = asyncio.get_running_loop().time() + 0.1
+    await asyncio.wait_for(runtime.stop_when(lambda: asyncio.get_running_loop().time() >= deadline), timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_process_next_batch() -> None:
+    with pytest.raises(ValueError):
+        SingleThreadedAgentRuntime(message_batch_size=0)
+
+    runtime = SingleThreadedAgentRuntime(message_batch_size=3)
+    await LoopbackAgentWithDefaultSubscription.register(runtime, "name", LoopbackAgentWithDefaultSubscription)
+    for _ in range(5):
+        await runtime.publish_message(MessageType(), topic_id=DefaultTopicId())
+
+    await runtime.process_next()
+    assert len(runtime.unprocessed_messages) == 2
+    await runtime.process_next()
+    assert len(runtime.unprocessed_messages) == 0
+
+    runtime.start()
+    await runtime.stop_when_idle()
+    agent = await runtime.try_get_underlying_agent_instance(AgentId("name", key="default"), type=LoopbackAgent)
+    assert agent.num_calls == 5
+
+
+@pytest.mark.asyncio
+async def test_delivery_events_logged(caplog: pytest.LogCaptureFixture) -> None:
+    runtime = SingleThreadedAgentRuntime()
+    await LoopbackAgentWithDefaultSubscription.register(runtime, "name", LoopbackAgentWithDefaultSubscription)
+    runtime.start()
+    with caplog.at_level(logging.INFO, logger=EVENT_LOGGER_NAME):
+        await runtime.publish_message(MessageType(), topic_id=DefaultTopicId())
+        await runtime.send_message(MessageType(), AgentId("name", "default"))
+        await runtime.stop_when_idle()
+
+    events = [record.msg for record in caplog.records if isinstance(record.msg, MessageEvent)]
+    stages = [(event.kwargs["kind"], event.kwargs["delivery_stage"]) for event in events]
+    assert (MessageKind.PUBLISH, DeliveryStage.SEND) in stages
+    assert (MessageKind.PUBLISH, DeliveryStage.DELIVER) in stages
+    assert (MessageKind.DIRECT, DeliveryStage.SEND) in stages
+    assert (MessageKind.DIRECT, DeliveryStage.DELIVER) in stages
+    assert (MessageKind.RESPOND, DeliveryStage.SEND) in stages
+    assert (MessageKind.RESPOND, DeliveryStage.DELIVER) in stages
+    # Payloads are only rendered when the record is formatted.
+    assert all(json.loads(str(event))["type"] == "Message" for event in events)
+
+
+@pytest.mark.asyncio
+async def test_delivery_events_not_rendered_when_disabled(caplog: pytest.LogCaptureFixture) -> None:
+    runtime = SingleThreadedAgentRuntime()
+    await LoopbackAgentWithDefaultSubscription.register(runtime, "name", LoopbackAgentWithDefaultSubscription)
+    runtime.start()
+    with caplog.at_level(logging.WARNING, logger=EVENT_LOGGER_NAME):
+        await runtime.publish_message(MessageType(), topic_id=DefaultTopicId())
+        await runtime.stop_when_idle()
+
+    assert not any(isinstance(record.msg, MessageEvent) for record in caplog.records)
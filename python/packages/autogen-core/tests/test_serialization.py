@@ -4,12 +4,22 @@
 import pytest
 from autogen_core.base import (
     JSON_DATA_CONTENT_TYPE,
+    MSGPACK_DATA_CONTENT_TYPE,
+    PROTOBUF_DATA_CONTENT_TYPE,
     MessageSerializer,
     SerializationRegistry,
+    UnknownPayload,
     try_get_known_serializers_for_type,
 )
-from autogen_core.base._serialization import DataclassJsonMessageSerializer, PydanticJsonMessageSerializer
+from autogen_core.base._serialization import (
+    DataclassJsonMessageSerializer,
+    DataclassMsgpackMessageSerializer,
+    ProtobufMessageSerializer,
+    PydanticJsonMessageSerializer,
+    PydanticMsgpackMessageSerializer,
+)
 from autogen_core.components import Image
+from google.protobuf.wrappers_pb2 import StringValue
 from PIL import Image as PILImage
 from pydantic import BaseModel
 
@@ -159,3 +169,63 @@ class PydanticImageMessage(BaseModel):
     assert deserialized.image.image.size == (100, 100)
     assert deserialized.image.image.mode == "RGB"
     assert deserialized.image.image == image.image
+
+
+def test_msgpack() -> None:
+    pytest.importorskip("msgpack")
+    serde = SerializationRegistry()
+    serde.add_serializer(try_get_known_serializers_for_type(DataclassMessage))
+    serde.add_serializer(try_get_known_serializers_for_type(NestingPydanticMessage))
+    serde.add_serializer(PydanticMsgpackMessageSerializer(NestingPydanticMessage))
+
+    for message in [
+        DataclassMessage(message="hello"),
+        NestingPydanticMessage(message="hello", nested=PydanticMessage(message="world")),
+    ]:
+        name = serde.type_name(message)
+        json = serde.serialize(message, type_name=name, data_content_type=JSON_DATA_CONTENT_TYPE)
+        packed = serde.serialize(message, type_name=name, data_content_type=MSGPACK_DATA_CONTENT_TYPE)
+        assert len(packed) < len(json)
+        assert serde.deserialize(packed, type_name=name, data_content_type=MSGPACK_DATA_CONTENT_TYPE) == message
+
+    assert isinstance(try_get_known_serializers_for_type(DataclassMessage)[1], DataclassMsgpackMessageSerializer)
+    assert len(try_get_known_serializers_for_type(PydanticMessage)) == 1
+    with pytest.raises(ValueError):
+        DataclassMsgpackMessageSerializer(NestingDataclassMessage)
+
+
+def test_protobuf() -> None:
+    serde = SerializationRegistry()
+    serializers = try_get_known_serializers_for_type(StringValue)
+    assert len(serializers) == 1 and isinstance(serializers[0], ProtobufMessageSerializer)
+    serde.add_serializer(serializers)
+
+    message = StringValue(value="hello")
+    name = serde.type_name(message)
+    assert name == "google.protobuf.StringValue"
+    data = serde.serialize(message, type_name=name, data_content_type=PROTOBUF_DATA_CONTENT_TYPE)
+    assert data == message.SerializeToString()
+    assert serde.deserialize(data, type_name=name, data_content_type=PROTOBUF_DATA_CONTENT_TYPE) == message
+
+
+def test_unknown_payload_is_passed_on_as_is() -> None:
+    serde = SerializationRegistry()
+    message = serde.deserialize(
+        b'{"message": "hello"}', type_name="DataclassMessage", data_content_type=JSON_DATA_CONTENT_TYPE
+    )
+    assert isinstance(message, UnknownPayload)
+    name = serde.type_name(message)
+    assert name == "DataclassMessage"
+    assert serde.serialize(message, type_name=name, data_content_type=JSON_DATA_CONTENT_TYPE) == message.payload
+
+    # The payload is passed on as is even if the type is known.
+    serde.add_serializer(try_get_known_serializers_for_type(DataclassMessage))
+    assert serde.serialize(message, type_name=name, data_content_type=JSON_DATA_CONTENT_TYPE) == message.payload
+    assert serde.type_name(DataclassMessage(message="hello")) == "DataclassMessage"
+
+
+def test_known_type_in_unknown_content_type() -> None:
+    serde = SerializationRegistry()
+    serde.add_serializer(DataclassJsonMessageSerializer(DataclassMessage))
+    with pytest.raises(ValueError, match="cannot be deserialized from content type application/x-protobuf"):
+        serde.deserialize(b"hello", type_name="DataclassMessage", data_content_type=PROTOBUF_DATA_CONTENT_TYPE)
@@ -1,7 +1,18 @@
+import asyncio
+from pathlib import Path
 from typing import Any, Mapping
 
 import pytest
-from autogen_core.application import SingleThreadedAgentRuntime
+from autogen_core.application import (
+    AgentPassivationPolicy,
+    AgentStateUpdate,
+    ETagMismatchError,
+    FileHostStateStore,
+    InMemoryAgentStateStore,
+    InMemoryHostStateStore,
+    SingleThreadedAgentRuntime,
+    SqliteHostStateStore,
+)
 from autogen_core.base import AgentId, BaseAgent, MessageContext
 
 
@@ -10,8 +21,9 @@ def __init__(self) -> None:
         super().__init__("A stateful agent")
         self.state = 0
 
-    async def on_message(self, message: Any, ctx: MessageContext) -> None:
-        raise NotImplementedError
+    async def on_message(self, message: Any, ctx: MessageContext) -> int:
+        self.state += 1
+        return self.state
 
     def save_state(self) -> Mapping[str, Any]:
         return {"state": self.state}
@@ -60,3 +72,186 @@ async def test_runtime_can_save_state() -> None:
 
     await runtime2.load_state(runtime_state)
     assert agent2.state == 1
+
+
+@pytest.mark.asyncio
+async def test_agents_are_passivated_when_over_limit() -> None:
+    store = InMemoryAgentStateStore()
+    runtime = SingleThreadedAgentRuntime(
+        passivation_policy=AgentPassivationPolicy(max_live_agents=1, state_store=store)
+    )
+    await runtime.register("name1", StatefulAgent)
+    agent1_id = AgentId("name1", key="1")
+    agent2_id = AgentId("name1", key="2")
+
+    runtime.start()
+    assert await runtime.send_message("increment", agent1_id) == 1
+    assert await runtime.send_message("increment", agent2_id) == 1
+    # The first agent was passivated to make room for the second one.
+    assert await store.load(agent1_id) == {"state": 1}
+    # Sending to the first agent again restores its state.
+    assert await runtime.send_message("increment", agent1_id) == 2
+    assert await store.load(agent2_id) == {"state": 1}
+    await runtime.stop_when_idle()
+
+    # The runtime state includes the passivated agent, which stays passivated.
+    assert await runtime.save_state() == {str(agent1_id): {"state": 2}, str(agent2_id): {"state": 1}}
+    assert len(runtime._instantiated_agents) == 1  # type: ignore[reportPrivateUsage]
+
+
+@pytest.mark.asyncio
+async def test_idle_agents_are_passivated() -> None:
+    store = InMemoryAgentStateStore()
+    runtime = SingleThreadedAgentRuntime(passivation_policy=AgentPassivationPolicy(idle_ttl=0.05, state_store=store))
+    await runtime.register("name1", StatefulAgent)
+    agent1_id = AgentId("name1", key="1")
+    agent2_id = AgentId("name1", key="2")
+
+    runtime.start()
+    assert await runtime.send_message("increment", agent1_id) == 1
+    await asyncio.sleep(0.1)
+    assert await runtime.send_message("increment", agent2_id) == 1
+    assert await store.load(agent1_id) == {"state": 1}
+    assert await store.load(agent2_id) is None
+    assert await runtime.send_message("increment", agent1_id) == 2
+    await runtime.stop_when_idle()
+
+
+class YieldingAgentStateStore(InMemoryAgentStateStore):
+    """A store that yields to other tasks while saving and loading, as stores doing I/O do."""
+
+    async def save(self, agent_id: AgentId, state: Mapping[str, Any]) -> None:
+        await asyncio.sleep(0.01)
+        await super().save(agent_id, state)
+
+    async def load(self, agent_id: AgentId) -> Mapping[str, Any] | None:
+        await asyncio.sleep(0.01)
+        return await super().load(agent_id)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_passivation_with_yielding_store() -> None:
+    store = YieldingAgentStateStore()
+    runtime = SingleThreadedAgentRuntime(passivation_policy=AgentPassivationPolicy(idle_ttl=0.05, state_store=store))
+    await runtime.register("name1", StatefulAgent)
+    agent_ids = [AgentId("name1", key=str(i)) for i in range(3)]
+    for agent_id in agent_ids:
+        await runtime.try_get_underlying_agent_instance(agent_id, type=StatefulAgent)
+    await asyncio.sleep(0.1)
+
+    # Concurrent passivations each passivate the agents the others did not, once.
+    agents = runtime._instantiated_agents  # type: ignore[reportPrivateUsage]
+    results = await asyncio.gather(agents.passivate(), agents.passivate(), return_exceptions=True)
+    assert list(results) == [None, None]
+    assert len(agents) == 0
+    assert [await store.load(agent_id) for agent_id in agent_ids] == [{"state": 0}] * 3
+
+    # The agents handling messages stay live while other deliveries passivate agents.
+    runtime = SingleThreadedAgentRuntime(
+        passivation_policy=AgentPassivationPolicy(max_live_agents=1, state_store=YieldingAgentStateStore())
+    )
+    await runtime.register("name1", StatefulAgent)
+    runtime.start()
+    for expected in (1, 2):
+        responses = await asyncio.gather(*(runtime.send_message("increment", agent_id) for agent_id in agent_ids))
+        assert responses == [expected] * 3
+    await runtime.stop_when_idle()
+    assert await runtime.save_state() == {str(agent_id): {"state": 2} for agent_id in agent_ids}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("store_type", ["memory", "sqlite", "file"])
+async def test_host_state_store(store_type: str, tmp_path: Path) -> None:
+    def open_store() -> InMemoryHostStateStore | SqliteHostStateStore | FileHostStateStore:
+        if store_type == "sqlite":
+            return SqliteHostStateStore(tmp_path / "states.db")
+        if store_type == "file":
+            return FileHostStateStore(tmp_path / "states.log")
+        return InMemoryHostStateStore()
+
+    store = open_store()
+    agent1, agent2 = AgentId("type", "1"), AgentId("type", "2")
+    assert await store.get([agent1, agent2]) == [None, None]
+
+    # A batch is saved all at once, and every state gets a new eTag.
+    etags = await store.save([AgentStateUpdate(agent1, b"a"), AgentStateUpdate(agent2, b"b")])
+    states = await store.get([agent1, agent2])
+    assert [state.data for state in states if state is not None] == [b"a", b"b"]
+    assert [state.etag for state in states if state is not None] == etags
+
+    # A state is only saved if its eTag matches, otherwise none of the batch is saved.
+    new_etags = await store.save([AgentStateUpdate(agent1, b"a2", etags[0])])
+    assert new_etags[0] != etags[0]
+    with pytest.raises(ETagMismatchError) as e:
+        await store.save([AgentStateUpdate(agent1, b"a3", etags[0]), AgentStateUpdate(agent2, b"b3", etags[1])])
+    assert e.value.agent_ids == [agent1]
+    with pytest.raises(ETagMismatchError):
+        await store.save([AgentStateUpdate(AgentId("type", "3"), b"c", "1")])
+    with pytest.raises(ValueError):
+        await store.save([AgentStateUpdate(agent1, b"a3"), AgentStateUpdate(agent1, b"a4")])
+    assert [state.data for state in await store.get([agent1, agent2]) if state is not None] == [b"a2", b"b"]
+
+    if isinstance(store, InMemoryHostStateStore):
+        return
+    # The states are kept when the store is opened again.
+    store.close()
+    store = open_store()
+    assert not isinstance(store, InMemoryHostStateStore)
+    states = await store.get([agent1, agent2])
+    assert [state.data for state in states if state is not None] == [b"a2", b"b"]
+    assert states[0] is not None and states[0].etag == new_etags[0]
+    if isinstance(store, FileHostStateStore):
+        await store.compact()
+        await store.save([AgentStateUpdate(agent2, b"b2", etags[1])])
+    store.close()
+
+
+def test_file_host_state_store_discards_torn_frame(tmp_path: Path) -> None:
+    path = tmp_path / "states.log"
+    store = FileHostStateStore(path, fsync=False)
+    agent_id = AgentId("type", "1")
+    asyncio.run(store.save([AgentStateUpdate(agent_id, b"saved")]))
+    asyncio.run(store.save([AgentStateUpdate(agent_id, b"torn")]))
+    store.close()
+    path.write_bytes(path.read_bytes()[:-2])
+
+    store = FileHostStateStore(path, fsync=False)
+    states = asyncio.run(store.get([agent_id]))
+    assert states[0] is not None and states[0].data == b"saved"
+    asyncio.run(store.save([AgentStateUpdate(agent_id, b"appended", states[0].etag)]))
+    store.close()
+    store = FileHostStateStore(path, fsync=False)
+    states = asyncio.run(store.get([agent_id]))
+    assert states[0] is not None and states[0].data == b"appended"
+    store.close()
+
+
+def test_file_host_state_store_removes_failed_frame(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    path = tmp_path / "states.log"
+    store = FileHostStateStore(path, fsync=False)
+    agent_id = AgentId("type", "1")
+    etags = asyncio.run(store.save([AgentStateUpdate(agent_id, b"saved")]))
+
+    def fail_partway(f: Any, records: Any) -> None:
+        f.write(b"\xff" * 16)
+        f.flush()
+        raise OSError("No space left on device")
+
+    # The frame is removed, so that the frames saved after it are kept when the log is opened again.
+    with monkeypatch.context() as m:
+        m.setattr(store, "_write_frame", fail_partway)
+        with pytest.raises(OSError):
+            asyncio.run(store.save([AgentStateUpdate(agent_id, b"failed", etags[0])]))
+    asyncio.run(store.save([AgentStateUpdate(agent_id, b"appended", etags[0])]))
+    store.close()
+    store = FileHostStateStore(path, fsync=False)
+    states = asyncio.run(store.get([agent_id]))
+    assert states[0] is not None and states[0].data == b"appended"
+    store.close()
+
+    # An invalid frame followed by others is not a torn one, opening the log fails instead of dropping them.
+    log = bytearray(path.read_bytes())
+    log[10] ^= 0xFF
+    path.write_bytes(bytes(log))
+    with pytest.raises(ValueError, match="invalid frame at offset 0"):
+        FileHostStateStore(path, fsync=False)
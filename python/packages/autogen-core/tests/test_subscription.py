@@ -1,5 +1,6 @@
 import pytest
 from autogen_core.application import SingleThreadedAgentRuntime
+from autogen_core.application._helpers import SubscriptionManager
 from autogen_core.base import AgentId, TopicId
 from autogen_core.base.exceptions import CantHandleException
 from autogen_core.components import DefaultSubscription, DefaultTopicId, TypeSubscription
@@ -115,3 +116,57 @@ async def test_subscription_deduplication() -> None:
     default_subscription = DefaultSubscription(agent_type=agent_type)
     with pytest.raises(ValueError, match="Subscription already exists"):
         await runtime.add_subscription(default_subscription)
+
+
+@pytest.mark.asyncio
+async def test_subscription_manager_incremental_updates() -> None:
+    manager = SubscriptionManager(max_cached_topics=2)
+    sub_a = TypeSubscription("t1", "a")
+    await manager.add_subscription(sub_a)
+
+    assert await manager.get_subscribed_recipients(TopicId("t1", "s1")) == [AgentId("a", "s1")]
+    assert await manager.get_subscribed_recipients(TopicId("t2", "s1")) == []
+
+    # Adding a subscription updates cached topics of the same topic type.
+    await manager.add_subscription(TypeSubscription("t1", "b"))
+    assert await manager.get_subscribed_recipients(TopicId("t1", "s1")) == [AgentId("a", "s1"), AgentId("b", "s1")]
+
+    # Removing a subscription updates cached topics of the same topic type.
+    await manager.remove_subscription(sub_a.id)
+    assert await manager.get_subscribed_recipients(TopicId("t1", "s1")) == [AgentId("b", "s1")]
+
+    with pytest.raises(ValueError, match="Subscription does not exist"):
+        await manager.remove_subscription(sub_a.id)
+
+
+@pytest.mark.asyncio
+async def test_subscription_manager_cache_is_bounded() -> None:
+    manager = SubscriptionManager(max_cached_topics=2)
+    await manager.add_subscription(TypeSubscription("t1", "a"))
+
+    for i in range(10):
+        recipients = await manager.get_subscribed_recipients(TopicId("t1", f"s{i}"))
+        assert recipients == [AgentId("a", f"s{i}")]
+
+    assert len(manager._subscribed_recipients) == 2  # type: ignore[reportPrivateUsage]
+    assert set(manager._subscribed_recipients) == {TopicId("t1", "s8"), TopicId("t1", "s9")}  # type: ignore[reportPrivateUsage]
+
+    await manager.get_subscribed_recipients(TopicId("t1", "s9"))
+    stats = manager.cache_stats
+    assert (stats.hits, stats.misses, stats.evictions) == (1, 10, 8)
+    assert (stats.size, stats.capacity) == (2, 2)
+
+
+@pytest.mark.asyncio
+async def test_runtime_subscription_cache_stats() -> None:
+    runtime = SingleThreadedAgentRuntime(max_cached_topics=1)
+    await runtime.register("MyAgent", LoopbackAgent, lambda: [TypeSubscription("default", "MyAgent")])
+
+    runtime.start()
+    for source in ["s1", "s1", "s2"]:
+        await runtime.publish_message(MessageType(), topic_id=DefaultTopicId(source=source))
+    await runtime.stop_when_idle()
+
+    stats = runtime.subscription_cache_stats
+    assert (stats.hits, stats.misses, stats.evictions) == (1, 2, 1)
+    assert (stats.size, stats.capacity) == (1, 1)
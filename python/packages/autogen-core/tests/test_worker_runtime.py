@@ -1,22 +1,64 @@
 import asyncio
 import logging
 import os
-from typing import List
+import threading
+from collections import Counter
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, List, Mapping, Tuple
 
+import grpc
 import pytest
-from autogen_core.application import WorkerAgentRuntime, WorkerAgentRuntimeHost
+from autogen_core.application import (
+    AgentPassivationPolicy,
+    MessageBatchingConfig,
+    PayloadCompressionConfig,
+    ReconnectConfig,
+    SharedMemoryConfig,
+    WorkerAgentRuntime,
+    WorkerAgentRuntimeHost,
+)
+from autogen_core.application._consistent_hashing import ConsistentHashRing
+from autogen_core.application._flow_control import SendQueue, SendQueueClosedError, SendQueueStats
+from autogen_core.application._message_batching import (
+    CoalescingQueueAsyncIterable,
+    OutgoingMessage,
+    SerializedMessage,
+    serialize_frame,
+    unpack_messages,
+)
+from autogen_core.application._payload_compression import PayloadCompressionAlgorithm, compress, decompress
+from autogen_core.application._reconnect import ReplayBuffer
+from autogen_core.application._shared_memory import SharedMemorySegments, read_shared_memory
+from autogen_core.application._timer_wheel import TimerWheel
+from autogen_core.application._worker_runtime import HostConnection
+from autogen_core.application._worker_runtime_host_servicer import (
+    WorkerAgentRuntimeHostServicer,
+    add_servicer_to_server,
+)
+from autogen_core.application.protos import agent_worker_pb2, agent_worker_pb2_grpc
 from autogen_core.base import (
+    JSON_DATA_CONTENT_TYPE,
+    MSGPACK_DATA_CONTENT_TYPE,
+    PROTOBUF_DATA_CONTENT_TYPE,
     AgentId,
     AgentType,
+    BaseAgent,
+    MessageContext,
     TopicId,
+    UnknownPayload,
     try_get_known_serializers_for_type,
 )
+from autogen_core.base._serialization import DataclassJsonMessageSerializer
 from autogen_core.base._subscription import Subscription
 from autogen_core.components import (
     DefaultTopicId,
+    RoutedAgent,
     TypeSubscription,
+    default_subscription,
+    message_handler,
     type_subscription,
 )
+from google.protobuf.wrappers_pb2 import StringValue
 from test_utils import (
     CascadingAgent,
     CascadingMessageType,
@@ -51,7 +93,7 @@ async def test_agent_types_must_be_unique_single_worker() -> None:
 
 
 @pytest.mark.asyncio
-async def test_agent_types_must_be_unique_multiple_workers() -> None:
+async def test_agent_types_can_be_shared_by_multiple_workers() -> None:
     host_address = "localhost:50052"
     host = WorkerAgentRuntimeHost(address=host_address)
     host.start()
@@ -62,11 +104,7 @@ async def test_agent_types_must_be_unique_multiple_workers() -> None:
     worker2.start()
 
     await worker1.register_factory(type=AgentType("name1"), agent_factory=lambda: NoopAgent(), expected_class=NoopAgent)
-
-    with pytest.raises(RuntimeError):
-        await worker2.register_factory(
-            type=AgentType("name1"), agent_factory=lambda: NoopAgent(), expected_class=NoopAgent
-        )
+    await worker2.register_factory(type=AgentType("name1"), agent_factory=lambda: NoopAgent(), expected_class=NoopAgent)
 
     await worker2.register_factory(type=AgentType("name4"), agent_factory=lambda: NoopAgent(), expected_class=NoopAgent)
 
@@ -81,7 +119,7 @@ async def test_register_receives_publish() -> None:
     host = WorkerAgentRuntimeHost(address=host_address)
     host.start()
 
-    worker1 = WorkerAgentRuntime(host_address=host_address)
+    worker1 = WorkerAgentRuntime(host_address=host_address, max_cached_topics=16)
     worker1.start()
     worker1.add_message_serializer(try_get_known_serializers_for_type(MessageType))
     await worker1.register_factory(
@@ -106,6 +144,8 @@ async def test_register_receives_publish() -> None:
     # Agents in default topic source should have received the message.
     worker1_agent = await worker1.try_get_underlying_agent_instance(AgentId("name1", "default"), LoopbackAgent)
     assert worker1_agent.num_calls == 1
+    stats = worker1.subscription_cache_stats
+    assert (stats.misses, stats.size, stats.capacity) == (1, 1, 16)
     worker2_agent = await worker2.try_get_underlying_agent_instance(AgentId("name2", "default"), LoopbackAgent)
     assert worker2_agent.num_calls == 1
 
@@ -318,9 +358,8 @@ async def test_duplicate_subscription() -> None:
 
         worker1_2.start()
 
-        # Note: This passes because worker1 is still running
-        with pytest.raises(RuntimeError, match="Agent type worker1 already registered"):
-            await NoopAgent.register(worker1_2, "worker1", lambda: NoopAgent())
+        # Both workers serve the agent type.
+        await NoopAgent.register(worker1_2, "worker1", lambda: NoopAgent())
 
         # This is somehow covered in test_disconnected_agent as well as a stop will also disconnect the agent.
         #  Will keep them both for now as we might replace the way we simulate a disconnect
@@ -401,6 +440,934 @@ async def get_subscribed_recipients() -> List[AgentId]:
         await worker1_2.stop()
 
 
+def _event(topic_type: str) -> agent_worker_pb2.Message:
+    return agent_worker_pb2.Message(event=agent_worker_pb2.Event(topic_type=topic_type))
+
+
+def _as_message(frame: agent_worker_pb2.Message | bytes | SerializedMessage) -> agent_worker_pb2.Message:
+    if isinstance(frame, SerializedMessage):
+        frame = frame.data
+    if isinstance(frame, bytes):
+        return agent_worker_pb2.Message.FromString(frame)
+    return frame
+
+
+@pytest.mark.asyncio
+async def test_coalescing_queue_async_iterable() -> None:
+    queue: asyncio.Queue[agent_worker_pb2.Message] = asyncio.Queue()
+    iterable = CoalescingQueueAsyncIterable(queue, MessageBatchingConfig(max_batch_size=3))
+    for i in range(4):
+        queue.put_nowait(agent_worker_pb2.Message(event=agent_worker_pb2.Event(topic_type=str(i))))
+
+    # Messages are sent one by one until batching is negotiated.
+    assert _as_message(await anext(iterable)).event.topic_type == "0"
+
+    iterable.batching = True
+    batch = _as_message(await anext(iterable))
+    assert [message.event.topic_type for message in unpack_messages(batch)] == ["1", "2", "3"]
+
+    # A single queued message is not wrapped in a batch.
+    queue.put_nowait(agent_worker_pb2.Message(event=agent_worker_pb2.Event(topic_type="4")))
+    assert _as_message(await anext(iterable)).WhichOneof("message") == "event"
+
+
+@pytest.mark.asyncio
+async def test_message_batching_with_peer_without_batching() -> None:
+    host_address = "localhost:50062"
+    host = WorkerAgentRuntimeHost(address=host_address)
+    host.start()
+
+    # worker2 does not advertise batching, like a runtime that does not know about batches.
+    worker1 = WorkerAgentRuntime(host_address=host_address)
+    worker2 = WorkerAgentRuntime(host_address=host_address, message_batching=None)
+    try:
+        worker1.start()
+        worker2.start()
+        await LoopbackAgentWithDefaultSubscription.register(
+            worker1, "worker1", lambda: LoopbackAgentWithDefaultSubscription()
+        )
+        await LoopbackAgentWithDefaultSubscription.register(
+            worker2, "worker2", lambda: LoopbackAgentWithDefaultSubscription()
+        )
+
+        await asyncio.gather(*[worker1.publish_message(MessageType(), DefaultTopicId()) for _ in range(100)])
+        await asyncio.sleep(2)
+
+        worker1_agent = await worker1.try_get_underlying_agent_instance(AgentId("worker1", "default"), LoopbackAgent)
+        worker2_agent = await worker2.try_get_underlying_agent_instance(AgentId("worker2", "default"), LoopbackAgent)
+        assert worker1_agent.num_calls == 100
+        assert worker2_agent.num_calls == 100
+    finally:
+        await worker1.stop()
+        await worker2.stop()
+        await host.stop()
+
+
+@pytest.mark.asyncio
+async def test_coalescing_serialized_messages() -> None:
+    queue: asyncio.Queue[agent_worker_pb2.Message | SerializedMessage] = asyncio.Queue()
+    iterable = CoalescingQueueAsyncIterable(queue, MessageBatchingConfig())
+    iterable.batching = True
+    queue.put_nowait(SerializedMessage.from_message(_event("0")))
+    queue.put_nowait(_event("1"))
+    queue.put_nowait(SerializedMessage.from_message(_event("2")))
+
+    # A batch containing serialized messages is assembled without parsing them.
+    frame = await anext(iterable)
+    assert isinstance(frame, bytes)
+    assert serialize_frame(frame) is frame
+    assert [message.event.topic_type for message in unpack_messages(_as_message(frame))] == ["0", "1", "2"]
+
+    queue.put_nowait(SerializedMessage.from_message(_event("3")))
+    assert _as_message(await anext(iterable)).event.topic_type == "3"
+
+
+def test_add_servicer_to_server_registers_every_rpc() -> None:
+    class RecordingServer:
+        handlers: Tuple[Any, ...] = ()
+
+        def add_generic_rpc_handlers(self, handlers: Tuple[Any, ...]) -> None:
+            self.handlers = handlers
+
+    server = RecordingServer()
+    add_servicer_to_server(WorkerAgentRuntimeHostServicer(), server)  # type: ignore[arg-type]
+    (handler,) = server.handlers
+    service = agent_worker_pb2.DESCRIPTOR.services_by_name["AgentRpc"]
+    for method in service.methods:
+        method_handler = handler.service(SimpleNamespace(method=f"/{service.full_name}/{method.name}"))
+        assert method_handler is not None
+        assert method_handler.request_streaming == method.client_streaming
+        assert method_handler.response_streaming == method.server_streaming
+        assert method_handler.response_serializer(b"frame") == b"frame"
+
+
+@pytest.mark.asyncio
+async def test_send_queue_overflow_policies() -> None:
+    dropped: List[str] = []
+    queue = SendQueue(
+        maxsize=2, overflow_policy="drop_oldest", on_drop=lambda m: dropped.append(_as_message(m).event.topic_type)
+    )
+    for i in range(3):
+        await queue.put(_event(str(i)))
+    assert queue.stats == SendQueueStats(depth=2, capacity=2, dropped=1, credits=None)
+    assert dropped == ["0"]
+    assert _as_message(queue.get_nowait()).event.topic_type == "1"
+
+    queue = SendQueue(maxsize=1, overflow_policy="disconnect")
+    await queue.put(_event("0"))
+    await queue.put(_event("1"))
+    assert queue.overflowed
+    queue.get_nowait()
+    with pytest.raises(SendQueueClosedError):
+        await queue.get()
+
+    queue = SendQueue(maxsize=1, overflow_policy="block")
+    await queue.put(_event("0"))
+    blocked_put = asyncio.create_task(queue.put(_event("1")))
+    await asyncio.sleep(0)
+    assert not blocked_put.done()
+    assert _as_message(await queue.get()).event.topic_type == "0"
+    await blocked_put
+    assert _as_message(await queue.get()).event.topic_type == "1"
+
+
+def _requests(target_type: str, count: int) -> List[agent_worker_pb2.Message]:
+    target = agent_worker_pb2.AgentId(type=target_type, key="default")
+    return [
+        agent_worker_pb2.Message(request=agent_worker_pb2.RpcRequest(request_id=str(i), target=target))
+        for i in range(count)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_host_fails_dropped_requests() -> None:
+    servicer = WorkerAgentRuntimeHostServicer(max_send_queue_size=1, send_queue_overflow_policy="drop_oldest")
+    sender_queue = servicer._add_send_queue(1)  # type: ignore[reportPrivateUsage]
+    target_queue = servicer._add_send_queue(2)  # type: ignore[reportPrivateUsage]
+    clients = ConsistentHashRing()
+    clients.add(2)
+    servicer._agent_type_to_clients["target"] = clients  # type: ignore[reportPrivateUsage]
+
+    async def frames() -> AsyncIterator[agent_worker_pb2.Message]:
+        for message in _requests("target", 2):
+            yield message
+
+    await servicer._receive_messages(1, frames())  # type: ignore[reportPrivateUsage]
+    # The first request is dropped to make room for the second, and its sender receives an error response.
+    response = _as_message(await asyncio.wait_for(sender_queue.get(), timeout=1)).response
+    assert response.request_id == "0"
+    assert "dropped" in response.error
+    assert _as_message(target_queue.get_nowait()).request.request_id == "1"
+    servicer.close()
+
+
+@pytest.mark.asyncio
+async def test_host_stops_reading_while_send_queue_is_full() -> None:
+    servicer = WorkerAgentRuntimeHostServicer(max_send_queue_size=1)
+    servicer._add_send_queue(1)  # type: ignore[reportPrivateUsage]
+    target_queue = servicer._add_send_queue(2)  # type: ignore[reportPrivateUsage]
+    clients = ConsistentHashRing()
+    clients.add(2)
+    servicer._agent_type_to_clients["target"] = clients  # type: ignore[reportPrivateUsage]
+    read = 0
+
+    async def frames() -> AsyncIterator[agent_worker_pb2.Message]:
+        nonlocal read
+        for message in _requests("target", 10):
+            read += 1
+            yield message
+
+    receive_task = asyncio.create_task(servicer._receive_messages(1, frames()))  # type: ignore[reportPrivateUsage]
+    await asyncio.sleep(0.1)
+    # One request is queued and one waits for room, the next one is not handed on until the queue has room.
+    assert read == 3
+    assert target_queue.stats.depth == 1
+    target_queue.get_nowait()
+    await asyncio.sleep(0.1)
+    assert read == 4
+    receive_task.cancel()
+    servicer.close()
+
+
+@pytest.mark.asyncio
+async def test_send_queue_credits() -> None:
+    queue = SendQueue()
+    queue.enable_flow_control()
+    await queue.put(_event("0"))
+    await queue.put(agent_worker_pb2.Message(response=agent_worker_pb2.RpcResponse(request_id="1")))
+
+    # Responses are sent without credits, events wait for them.
+    assert _as_message(queue.get_nowait()).WhichOneof("message") == "response"
+    assert queue.empty()
+    queue.grant(1)
+    assert _as_message(queue.get_nowait()).event.topic_type == "0"
+    assert queue.stats.credits == 0
+
+
+@pytest.mark.asyncio
+async def test_flow_control() -> None:
+    host_address = "localhost:50063"
+    host = WorkerAgentRuntimeHost(address=host_address, max_send_queue_size=5)
+    host.start()
+
+    worker1 = WorkerAgentRuntime(host_address=host_address, flow_control_window=2)
+    worker2 = WorkerAgentRuntime(host_address=host_address)
+    try:
+        worker1.start()
+        worker2.start()
+        await LoopbackAgentWithDefaultSubscription.register(
+            worker1, "worker1", lambda: LoopbackAgentWithDefaultSubscription()
+        )
+        await LoopbackAgentWithDefaultSubscription.register(
+            worker2, "worker2", lambda: LoopbackAgentWithDefaultSubscription()
+        )
+
+        await asyncio.gather(*[worker2.publish_message(MessageType(), DefaultTopicId()) for _ in range(50)])
+        await asyncio.sleep(2)
+
+        worker1_agent = await worker1.try_get_underlying_agent_instance(AgentId("worker1", "default"), LoopbackAgent)
+        worker2_agent = await worker2.try_get_underlying_agent_instance(AgentId("worker2", "default"), LoopbackAgent)
+        assert worker1_agent.num_calls == 50
+        assert worker2_agent.num_calls == 50
+
+        # Only the worker that advertised flow control has credits, and every queue was drained.
+        stats = sorted(host.send_queue_stats.values(), key=lambda stats: stats.credits is None)
+        assert stats[0].credits is not None and stats[0].credits > 0
+        assert stats[1].credits is None
+        assert all(queue_stats.depth == 0 and queue_stats.dropped == 0 for queue_stats in stats)
+    finally:
+        await worker1.stop()
+        await worker2.stop()
+        await host.stop()
+
+
+def test_consistent_hash_ring() -> None:
+    ring = ConsistentHashRing()
+    assert ring.get("key") is None
+    for node in [1, 2, 3]:
+        ring.add(node)
+    keys = [f"key{i}" for i in range(3000)]
+    before = {key: ring.get(key) for key in keys}
+    counts = Counter(before.values())
+    assert all(count > 500 for count in counts.values())
+
+    # Only keys moving to the new node change nodes.
+    ring.add(4)
+    after = {key: ring.get(key) for key in keys}
+    moved = [key for key in keys if after[key] != before[key]]
+    assert all(after[key] == 4 for key in moved)
+    assert 500 < len(moved) < 1250
+
+    ring.remove(4)
+    assert {key: ring.get(key) for key in keys} == before
+    with pytest.raises(ValueError):
+        ring.add(1)
+
+
+@default_subscription
+class RecordingAgent(RoutedAgent):
+    def __init__(self, worker: str, calls: List[Tuple[str, str]]) -> None:
+        super().__init__("An agent recording the worker handling each message.")
+        self._worker = worker
+        self._calls = calls
+
+    @message_handler
+    async def on_content(self, message: ContentMessage, ctx: MessageContext) -> ContentMessage:
+        self._calls.append((self._worker, self.id.key))
+        return message
+
+
+@pytest.mark.asyncio
+async def test_agent_type_scaled_across_workers() -> None:
+    host_address = "localhost:50064"
+    host = WorkerAgentRuntimeHost(address=host_address)
+    host.start()
+    calls: List[Tuple[str, str]] = []
+    worker1 = WorkerAgentRuntime(host_address=host_address)
+    worker2 = WorkerAgentRuntime(host_address=host_address)
+    publisher = WorkerAgentRuntime(host_address=host_address)
+    keys = [f"key{i}" for i in range(20)]
+    try:
+        worker1.start()
+        worker2.start()
+        publisher.start()
+        publisher.add_message_serializer(try_get_known_serializers_for_type(ContentMessage))
+        await RecordingAgent.register(worker1, "scaled", lambda: RecordingAgent("worker1", calls))
+        await RecordingAgent.register(worker2, "scaled", lambda: RecordingAgent("worker2", calls))
+
+        for key in keys:
+            await publisher.send_message(ContentMessage(content="request"), AgentId("scaled", key))
+            await publisher.publish_message(ContentMessage(content="event"), TopicId("default", key))
+        await asyncio.sleep(1)
+
+        # Every message is handled once, and messages for the same agent are handled by the same worker.
+        assert len(calls) == 2 * len(keys)
+        workers_by_key = {key: {worker for worker, call_key in calls if call_key == key} for key in keys}
+        assert all(len(workers) == 1 for workers in workers_by_key.values())
+        assert {worker for worker, _ in calls} == {"worker1", "worker2"}
+
+        # The agents of a worker that leaves move to the remaining worker.
+        await worker2.stop()
+        await asyncio.sleep(1)
+        calls.clear()
+        for key in keys:
+            await publisher.send_message(ContentMessage(content="request"), AgentId("scaled", key))
+        assert sorted(calls) == sorted(("worker1", key) for key in keys)
+    finally:
+        await worker1.stop()
+        await publisher.stop()
+        await host.stop()
+
+
+def test_request_ids_are_unique_across_workers() -> None:
+    workers = [WorkerAgentRuntime(host_address="localhost:50066") for _ in range(2)]
+    request_ids = [worker._get_new_request_id() for worker in workers for _ in range(3)]  # type: ignore[reportPrivateUsage]
+    assert len(set(request_ids)) == len(request_ids)
+
+
+@pytest.mark.asyncio
+async def test_timer_wheel() -> None:
+    wheel = TimerWheel(tick=0.01, slots=4)
+    fired: List[str] = []
+    wheel.schedule(0.05, lambda: fired.append("second"))
+    wheel.schedule(0.01, lambda: fired.append("first"))
+    cancelled = wheel.schedule(0.02, lambda: fired.append("cancelled"))
+    cancelled.cancel()
+    assert len(wheel) == 2
+    await asyncio.sleep(0.2)
+    assert fired == ["first", "second"]
+    assert len(wheel) == 0
+
+
+class BlockingAgent(RoutedAgent):
+    def __init__(self, release: asyncio.Event) -> None:
+        super().__init__("An agent that responds once released.")
+        self._release = release
+
+    @message_handler
+    async def on_content(self, message: ContentMessage, ctx: MessageContext) -> ContentMessage:
+        await self._release.wait()
+        return message
+
+
+@pytest.mark.asyncio
+async def test_rpc_timeout() -> None:
+    host_address = "localhost:50065"
+    host = WorkerAgentRuntimeHost(address=host_address, rpc_timeout=0.3)
+    host.start()
+    release = asyncio.Event()
+    worker1 = WorkerAgentRuntime(host_address=host_address)
+    worker2 = WorkerAgentRuntime(host_address=host_address, rpc_timeout=0.2)
+    try:
+        worker1.start()
+        worker2.start()
+        worker2.add_message_serializer(try_get_known_serializers_for_type(ContentMessage))
+        await BlockingAgent.register(worker1, "blocking", lambda: BlockingAgent(release))
+
+        # The default timeout of the worker.
+        with pytest.raises(TimeoutError):
+            await worker2.send_message(ContentMessage(content="Hello!"), AgentId("blocking", "default"))
+        # A timeout for this call.
+        with pytest.raises(TimeoutError):
+            await worker2.send_message(ContentMessage(content="Hello!"), AgentId("blocking", "default"), timeout=0.1)
+        assert worker2.timed_out_requests == 2
+        assert len(worker2._pending_requests) == 0  # type: ignore[reportPrivateUsage]
+
+        # The default timeout of the host, for requests without a timeout.
+        worker3 = WorkerAgentRuntime(host_address=host_address)
+        worker3.start()
+        worker3.add_message_serializer(try_get_known_serializers_for_type(ContentMessage))
+        try:
+            with pytest.raises(Exception, match="timed out"):
+                await worker3.send_message(ContentMessage(content="Hello!"), AgentId("blocking", "default"))
+            assert worker3.timed_out_requests == 0
+        finally:
+            release.set()
+            await worker3.stop()
+        assert host.timed_out_requests == 3
+    finally:
+        release.set()
+        await worker1.stop()
+        await worker2.stop()
+        await host.stop()
+
+
+@pytest.mark.asyncio
+async def test_content_type_negotiation() -> None:
+    pytest.importorskip("msgpack")
+    host_address = "localhost:50067"
+    host = WorkerAgentRuntimeHost(address=host_address)
+    host.start()
+    worker1 = WorkerAgentRuntime(host_address=host_address, preferred_content_type=MSGPACK_DATA_CONTENT_TYPE)
+    worker2 = WorkerAgentRuntime(host_address=host_address, preferred_content_type=MSGPACK_DATA_CONTENT_TYPE)
+    worker3 = WorkerAgentRuntime(host_address=host_address)
+    try:
+        worker1.start()
+        worker2.start()
+        worker1.add_message_serializer(try_get_known_serializers_for_type(ContentMessage))
+        await LoopbackAgent.register(worker2, "worker2", lambda: LoopbackAgent())
+        recipient = AgentId("worker2", "default")
+        await asyncio.sleep(0.5)
+
+        # Every client accepts msgpack.
+        assert worker1._get_data_content_type("ContentMessage") == MSGPACK_DATA_CONTENT_TYPE  # type: ignore[reportPrivateUsage]
+        assert await worker1.send_message(ContentMessage(content="msgpack"), recipient) == ContentMessage(
+            content="msgpack"
+        )
+
+        # A client that does not advertise its content types only accepts JSON.
+        legacy_connection = HostConnection.from_host_address(host_address)
+        await asyncio.sleep(0.5)
+        assert worker1._get_data_content_type("ContentMessage") == JSON_DATA_CONTENT_TYPE  # type: ignore[reportPrivateUsage]
+        assert await worker1.send_message(ContentMessage(content="json"), recipient) == ContentMessage(content="json")
+
+        try:
+            await legacy_connection.close()
+        except asyncio.CancelledError:
+            pass
+        await asyncio.sleep(0.5)
+        assert worker1._get_data_content_type("ContentMessage") == MSGPACK_DATA_CONTENT_TYPE  # type: ignore[reportPrivateUsage]
+
+        # A client that knows the type but cannot deserialize its content type fails the request.
+        worker3.start()
+        worker3.add_message_serializer(DataclassJsonMessageSerializer(ContentMessage))
+        await CounterAgent.register(worker3, "json_only", CounterAgent)
+        await asyncio.sleep(0.5)
+        with pytest.raises(Exception, match="cannot be deserialized from content type application/vnd.msgpack"):
+            await worker1.send_message(ContentMessage(content="msgpack"), AgentId("json_only", "default"))
+    finally:
+        await worker1.stop()
+        await worker2.stop()
+        await worker3.stop()
+        await host.stop()
+
+
+class ProtobufEchoAgent(RoutedAgent):
+    def __init__(self) -> None:
+        super().__init__("An agent echoing protobuf messages.")
+
+    @message_handler
+    async def on_string(self, message: StringValue, ctx: MessageContext) -> StringValue:
+        return StringValue(value=message.value.upper())
+
+
+@pytest.mark.asyncio
+async def test_protobuf_messages() -> None:
+    host_address = "localhost:50068"
+    host = WorkerAgentRuntimeHost(address=host_address)
+    host.start()
+    worker1 = WorkerAgentRuntime(host_address=host_address)
+    worker2 = WorkerAgentRuntime(host_address=host_address)
+    try:
+        worker1.start()
+        worker2.start()
+        # The serializer of the handled protobuf type is registered with the agent type.
+        await ProtobufEchoAgent.register(worker1, "echo", ProtobufEchoAgent)
+        worker2.add_message_serializer(try_get_known_serializers_for_type(StringValue))
+        assert worker2._get_data_content_type("google.protobuf.StringValue") == PROTOBUF_DATA_CONTENT_TYPE  # type: ignore[reportPrivateUsage]
+
+        response = await worker2.send_message(StringValue(value="hello"), AgentId("echo", "default"))
+        assert response == StringValue(value="HELLO")
+    finally:
+        await worker1.stop()
+        await worker2.stop()
+        await host.stop()
+
+
+def test_payload_compression() -> None:
+    data = b"chat history " * 1000
+    assert decompress(compress(data, "gzip"), "gzip") == data
+    with pytest.raises(ValueError):
+        decompress(data, "br")
+    with pytest.raises(ValueError):
+        PayloadCompressionConfig(threshold=-1)
+    pytest.importorskip("zstandard")
+    assert decompress(compress(data, "zstd", level=1), "zstd") == data
+
+
+@pytest.mark.asyncio
+async def test_payload_compression_negotiation(monkeypatch: pytest.MonkeyPatch) -> None:
+    host_address = "localhost:50069"
+    host = WorkerAgentRuntimeHost(address=host_address)
+    host.start()
+    compression = PayloadCompressionConfig(algorithm="gzip", threshold=1024, offload_threshold=64 * 1024)
+    worker1 = WorkerAgentRuntime(host_address=host_address, payload_compression=compression)
+    worker2 = WorkerAgentRuntime(host_address=host_address, payload_compression=compression)
+    try:
+        worker1.start()
+        worker2.start()
+        worker1.add_message_serializer(try_get_known_serializers_for_type(ContentMessage))
+        await LoopbackAgent.register(worker2, "worker2", lambda: LoopbackAgent())
+        recipient = AgentId("worker2", "default")
+        await asyncio.sleep(0.5)
+
+        # Payloads above the threshold are compressed once every client accepts the algorithm.
+        large_message = ContentMessage(content="chat history " * 1000)
+        payload = await worker1._serialize_payload(large_message, "ContentMessage")  # type: ignore[reportPrivateUsage]
+        assert payload.content_encoding == "gzip"
+        assert (
+            await worker1._serialize_payload(ContentMessage(content="small"), "ContentMessage")
+        ).content_encoding == ""  # type: ignore[reportPrivateUsage]
+        # The host passes the compressed payloads through, and the responses are compressed too.
+        assert await worker1.send_message(large_message, recipient) == large_message
+
+        # Payloads above the offload threshold are compressed in a worker thread.
+        compressing_threads: List[int] = []
+
+        def record_thread(data: bytes, algorithm: PayloadCompressionAlgorithm, level: int | None) -> bytes:
+            compressing_threads.append(threading.get_ident())
+            return compress(data, algorithm, level)
+
+        monkeypatch.setattr("autogen_core.application._worker_runtime.compress", record_thread)
+        await worker1._serialize_payload(large_message, "ContentMessage")  # type: ignore[reportPrivateUsage]
+        await worker1._serialize_payload(ContentMessage(content="chat history " * 10000), "ContentMessage")  # type: ignore[reportPrivateUsage]
+        assert compressing_threads[0] == threading.get_ident()
+        assert compressing_threads[1] != threading.get_ident()
+        monkeypatch.undo()
+
+        # A client that does not advertise content encodings cannot decompress payloads.
+        legacy_connection = HostConnection.from_host_address(host_address)
+        await asyncio.sleep(0.5)
+        assert (await worker1._serialize_payload(large_message, "ContentMessage")).content_encoding == ""  # type: ignore[reportPrivateUsage]
+        assert await worker1.send_message(large_message, recipient) == large_message
+
+        try:
+            await legacy_connection.close()
+        except asyncio.CancelledError:
+            pass
+        await asyncio.sleep(0.5)
+        assert (await worker1._serialize_payload(large_message, "ContentMessage")).content_encoding == "gzip"  # type: ignore[reportPrivateUsage]
+    finally:
+        await worker1.stop()
+        await worker2.stop()
+        await host.stop()
+
+
+@pytest.mark.asyncio
+async def test_shared_memory_segments(monkeypatch: pytest.MonkeyPatch) -> None:
+    segments = SharedMemorySegments(retention=0.2, max_bytes=20)
+    handle = segments.write(b"large payload")
+    assert handle is not None
+    assert read_shared_memory(handle) == b"large payload"
+    assert len(segments) == 1
+    assert segments.retained_bytes == len(b"large payload")
+    # Payloads that would exceed the size of the segments kept are not written.
+    assert segments.write(b"another payload") is None
+    # The segment is unlinked once its retention passed.
+    await asyncio.sleep(1)
+    assert len(segments) == 0
+    assert segments.retained_bytes == 0
+    with pytest.raises(RuntimeError):
+        read_shared_memory(handle)
+    assert segments.write(b"another payload") is not None
+
+    # Payloads are not written if the segment cannot be created.
+    def fail(*args: Any, **kwargs: Any) -> None:
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr("autogen_core.application._shared_memory.SharedMemory", fail)
+    assert segments.write(b"large payload") is None
+    segments.close()
+    assert len(segments) == 0
+
+
+@pytest.mark.asyncio
+async def test_shared_memory_transport() -> None:
+    host_address = "localhost:50070"
+    host = WorkerAgentRuntimeHost(address=host_address)
+    host.start()
+    shared_memory = SharedMemoryConfig(threshold=1024)
+    worker1 = WorkerAgentRuntime(host_address=host_address, shared_memory=shared_memory)
+    worker2 = WorkerAgentRuntime(host_address=host_address, shared_memory=shared_memory)
+    try:
+        worker1.start()
+        worker2.start()
+        worker1.add_message_serializer(try_get_known_serializers_for_type(ContentMessage))
+        await LoopbackAgent.register(worker2, "worker2", lambda: LoopbackAgent())
+        recipient = AgentId("worker2", "default")
+        await asyncio.sleep(0.5)
+
+        # Payloads above the threshold are passed in shared memory once every client runs on this machine.
+        large_message = ContentMessage(content="." * 2048)
+        payload = await worker1._serialize_payload(large_message, "ContentMessage")  # type: ignore[reportPrivateUsage]
+        assert payload.HasField("shared_memory") and payload.data == b""
+        assert not (await worker1._serialize_payload(ContentMessage(content="small"), "ContentMessage")).HasField(  # type: ignore[reportPrivateUsage]
+            "shared_memory"
+        )
+        assert await worker1.send_message(large_message, recipient) == large_message
+
+        # Payloads are sent inline if a client may run on another machine.
+        remote_connection = HostConnection.from_host_address(host_address)
+        await asyncio.sleep(0.5)
+        assert not (await worker1._serialize_payload(large_message, "ContentMessage")).HasField("shared_memory")  # type: ignore[reportPrivateUsage]
+        assert await worker1.send_message(large_message, recipient) == large_message
+
+        try:
+            await remote_connection.close()
+        except asyncio.CancelledError:
+            pass
+        await asyncio.sleep(0.5)
+        assert (await worker1._serialize_payload(large_message, "ContentMessage")).HasField("shared_memory")  # type: ignore[reportPrivateUsage]
+    finally:
+        await worker1.stop()
+        await worker2.stop()
+        await host.stop()
+
+
+class ForwardingAgent(BaseAgent):
+    lazy_deserialization = True
+
+    def __init__(self) -> None:
+        super().__init__("An agent forwarding messages to another agent.")
+        self.received: List[Any] = []
+
+    async def on_message(self, message: Any, ctx: MessageContext) -> Any:
+        self.received.append(message)
+        return await self.send_message(message, AgentId("loopback", "default"))
+
+
+class DecodingForwardingAgent(ForwardingAgent):
+    lazy_deserialization = False
+
+
+@pytest.mark.asyncio
+async def test_lazy_deserialization() -> None:
+    host_address = "localhost:50071"
+    host = WorkerAgentRuntimeHost(address=host_address)
+    host.start()
+    worker1 = WorkerAgentRuntime(host_address=host_address)
+    worker2 = WorkerAgentRuntime(host_address=host_address)
+    worker3 = WorkerAgentRuntime(host_address=host_address)
+    try:
+        worker1.start()
+        worker2.start()
+        worker3.start()
+        worker1.add_message_serializer(try_get_known_serializers_for_type(ContentMessage))
+        # The forwarding agent does not declare handling the type, so it is not decoded although it is known.
+        worker2.add_message_serializer(try_get_known_serializers_for_type(ContentMessage))
+        forwarder = AgentId("forwarder", "default")
+        await ForwardingAgent.register(worker2, "forwarder", ForwardingAgent)
+        await LoopbackAgent.register(worker3, "loopback", LoopbackAgent)
+
+        response = await worker1.send_message(ContentMessage(content="hello"), forwarder)
+        assert response == ContentMessage(content="hello")
+        forwarding_agent = await worker2.try_get_underlying_agent_instance(forwarder, type=ForwardingAgent)
+        assert forwarding_agent.received == [
+            UnknownPayload("ContentMessage", JSON_DATA_CONTENT_TYPE, b'{"content": "hello"}')
+        ]
+
+        # Agents declaring the type receive it decoded.
+        await LoopbackAgent.register(worker2, "local_loopback", LoopbackAgent)
+        response = await worker1.send_message(ContentMessage(content="hello"), AgentId("local_loopback", "default"))
+        assert response == ContentMessage(content="hello")
+
+        # Agents without lazy deserialization receive every type they know decoded.
+        await DecodingForwardingAgent.register(worker2, "decoding_forwarder", DecodingForwardingAgent)
+        decoding_forwarder = AgentId("decoding_forwarder", "default")
+        response = await worker1.send_message(ContentMessage(content="hello"), decoding_forwarder)
+        assert response == ContentMessage(content="hello")
+        decoding_agent = await worker2.try_get_underlying_agent_instance(
+            decoding_forwarder, type=DecodingForwardingAgent
+        )
+        assert decoding_agent.received == [ContentMessage(content="hello")]
+    finally:
+        await worker1.stop()
+        await worker2.stop()
+        await worker3.stop()
+        await host.stop()
+
+
+class CounterAgent(BaseAgent):
+    def __init__(self) -> None:
+        super().__init__("An agent counting messages.")
+        self.count = 0
+
+    async def on_message(self, message: Any, ctx: MessageContext) -> Any:
+        self.count += 1
+        return message
+
+    def save_state(self) -> Mapping[str, Any]:
+        return {"count": self.count}
+
+    def load_state(self, state: Mapping[str, Any]) -> None:
+        self.count = state["count"]
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_and_restore() -> None:
+    host_address = "localhost:50072"
+    host = WorkerAgentRuntimeHost(address=host_address)
+    host.start()
+    # Most agents of worker1 are passivated, and saved from the passivation state store.
+    worker1 = WorkerAgentRuntime(
+        host_address=host_address, passivation_policy=AgentPassivationPolicy(max_live_agents=10)
+    )
+    worker2 = WorkerAgentRuntime(host_address=host_address)
+    try:
+        worker1.start()
+        worker2.start()
+        await CounterAgent.register(worker1, "counter", CounterAgent)
+        await CounterAgent.register(worker2, "counter", CounterAgent)
+        agent_ids = [AgentId("counter", str(i)) for i in range(100)]
+        for agent_id in agent_ids:
+            (await worker1.try_get_underlying_agent_instance(agent_id, CounterAgent)).count = int(agent_id.key)
+        assert await worker1.save_state() == {str(agent_id): {"count": int(agent_id.key)} for agent_id in agent_ids}
+
+        # The states of all agents are saved and restored in one call each.
+        await worker1.checkpoint()
+        await worker2.restore(agent_ids)
+        for agent_id in agent_ids:
+            assert (await worker2.try_get_underlying_agent_instance(agent_id, CounterAgent)).count == int(agent_id.key)
+
+        # Saving a state fails if another runtime saved it since it was restored.
+        await worker2.agent_load_state(agent_ids[0], {"count": 1000})
+        await worker2.checkpoint([agent_ids[0]])
+        with pytest.raises(RuntimeError, match="eTag"):
+            await worker1.checkpoint()
+        await worker1.restore([agent_ids[0]])
+        assert await worker1.agent_save_state(agent_ids[0]) == {"count": 1000}
+        await worker1.checkpoint()
+
+        # The single agent RPCs.
+        async with grpc.aio.insecure_channel(host_address) as channel:
+            stub = agent_worker_pb2_grpc.AgentRpcStub(channel)  # type: ignore[no-untyped-call]
+            response = await stub.GetState(agent_worker_pb2.AgentId(type="counter", key="1"))
+            assert response.success and response.agent_state.text_data == '{"count": 1}'
+            save_response = await stub.SaveState(response.agent_state)
+            assert save_response.success and save_response.eTag != response.agent_state.eTag
+            save_response = await stub.SaveState(response.agent_state)
+            assert not save_response.success
+            response = await stub.GetState(agent_worker_pb2.AgentId(type="counter", key="missing"))
+            assert response.success and not response.HasField("agent_state")
+    finally:
+        await worker1.stop()
+        await worker2.stop()
+        await host.stop()
+
+
+class ChannelBreaker:
+    """A TCP proxy to the host whose connections can be broken, as by a network outage."""
+
+    def __init__(self, host_port: int) -> None:
+        self._host_port = host_port
+        self._writers: List[asyncio.StreamWriter] = []
+        self._server: asyncio.Server | None = None
+        self._dropping = False
+
+    async def start(self, port: int) -> None:
+        self._server = await asyncio.start_server(self._proxy, "localhost", port)
+
+    def drop_from_host(self) -> None:
+        """Drop what the host sends until the connections are broken, as it is lost when they break."""
+        self._dropping = True
+
+    def break_connections(self) -> None:
+        for writer in self._writers:
+            writer.transport.abort()
+        self._writers.clear()
+        self._dropping = False
+
+    async def stop(self) -> None:
+        self.break_connections()
+        if self._server is not None:
+            self._server.close()
+
+    async def _proxy(self, client_reader: asyncio.StreamReader, client_writer: asyncio.StreamWriter) -> None:
+        host_reader, host_writer = await asyncio.open_connection("localhost", self._host_port)
+        self._writers += [client_writer, host_writer]
+
+        async def pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, from_host: bool) -> None:
+            try:
+                while data := await reader.read(65536):
+                    if from_host and self._dropping:
+                        continue
+                    writer.write(data)
+                    await writer.drain()
+            except ConnectionError:
+                pass
+            writer.transport.abort()
+
+        await asyncio.gather(pipe(client_reader, host_writer, False), pipe(host_reader, client_writer, True))
+
+
+class SlowAgent(RoutedAgent):
+    def __init__(self) -> None:
+        super().__init__("An agent that takes a while to respond.")
+
+    @message_handler
+    async def on_new_message(self, message: ContentMessage, ctx: MessageContext) -> ContentMessage:
+        await asyncio.sleep(1)
+        return message
+
+
+def test_replay_buffer() -> None:
+    buffer = ReplayBuffer[agent_worker_pb2.Message](maxsize=3)
+    messages = [agent_worker_pb2.Message(event=agent_worker_pb2.Event(topic_type=str(i))) for i in range(5)]
+    for message in messages[:2]:
+        buffer.append(message)
+    assert buffer.unreceived(2) == []
+    assert buffer.unreceived(1) == messages[1:2]
+    for message in messages[2:]:
+        buffer.append(message)
+    # Only the last messages are buffered.
+    assert buffer.sent == 5 and len(buffer) == 3
+    assert buffer.unreceived(3) == messages[3:]
+    assert buffer.unreceived(0) == messages[2:]
+    buffer.reset()
+    assert buffer.sent == 0 and buffer.unreceived(0) == []
+
+
+@pytest.mark.asyncio
+async def test_send_queue_resends_unreceived() -> None:
+    queue = SendQueue(replay_buffer=ReplayBuffer[OutgoingMessage](maxsize=10))
+    queue.enable_flow_control()
+    queue.grant(2)
+    for i in range(3):
+        await queue.put(_event(str(i)))
+    assert [_as_message(queue.get_nowait()).event.topic_type for _ in range(2)] == ["0", "1"]
+
+    # The client reconnected having received the first event, the second is sent again first, without credits.
+    queue.enable_flow_control()
+    queue.resend_unreceived(1)
+    assert queue.stats.depth == 2
+    assert _as_message(queue.get_nowait()).event.topic_type == "1"
+    assert queue.empty()
+    queue.grant(1)
+    assert _as_message(queue.get_nowait()).event.topic_type == "2"
+
+
+@pytest.mark.asyncio
+async def test_reconnect() -> None:
+    host_address = "localhost:50073"
+    host = WorkerAgentRuntimeHost(address=host_address)
+    host.start()
+    breaker = ChannelBreaker(50073)
+    await breaker.start(50074)
+    worker1 = WorkerAgentRuntime(host_address="localhost:50074", reconnect=ReconnectConfig(initial_backoff=0.05))
+    worker2 = WorkerAgentRuntime(host_address=host_address)
+    worker1_stopped = False
+    try:
+        worker1.start()
+        worker2.start()
+        worker2.add_message_serializer(try_get_known_serializers_for_type(ContentMessage))
+        await LoopbackAgentWithDefaultSubscription.register(worker1, "loopback", LoopbackAgentWithDefaultSubscription)
+        await SlowAgent.register(worker1, "slow", SlowAgent)
+        recipient = AgentId("loopback", "default")
+        assert await worker2.send_message(ContentMessage(content="before"), recipient) == ContentMessage(
+            content="before"
+        )
+
+        # A request that is being processed while the channel breaks is answered once the worker reconnected.
+        slow_response = asyncio.create_task(worker2.send_message(ContentMessage(content="slow"), AgentId("slow", "1")))
+        await asyncio.sleep(0.2)
+        breaker.break_connections()
+        assert await asyncio.wait_for(slow_response, 10) == ContentMessage(content="slow")
+
+        # The host kept the agent types and subscriptions of the worker, which kept its client id.
+        assert await worker2.send_message(ContentMessage(content="after"), recipient) == ContentMessage(content="after")
+
+        # A request the host sent that was lost with the channel is sent again once the worker reconnected.
+        breaker.drop_from_host()
+        lost_response = asyncio.create_task(worker2.send_message(ContentMessage(content="lost"), recipient))
+        await asyncio.sleep(0.2)
+        breaker.break_connections()
+        assert await asyncio.wait_for(lost_response, 10) == ContentMessage(content="lost")
+
+        await worker2.publish_message(ContentMessage(content="event"), DefaultTopicId())
+        await asyncio.sleep(0.5)
+        loopback = await worker1.try_get_underlying_agent_instance(recipient, LoopbackAgentWithDefaultSubscription)
+        assert loopback.num_calls == 4
+        assert len(host.send_queue_stats) == 2
+
+        # Stopping the worker ends its session, the host does not keep it.
+        await worker1.stop()
+        worker1_stopped = True
+        await asyncio.sleep(0.5)
+        assert len(host.send_queue_stats) == 1
+    finally:
+        if not worker1_stopped:
+            await worker1.stop()
+        await worker2.stop()
+        await breaker.stop()
+        await host.stop()
+
+
+@pytest.mark.asyncio
+async def test_reconnect_max_attempts() -> None:
+    host_address = "localhost:50075"
+    host = WorkerAgentRuntimeHost(address=host_address)
+    host.start()
+    breaker = ChannelBreaker(50075)
+    await breaker.start(50076)
+    worker1 = WorkerAgentRuntime(
+        host_address="localhost:50076", reconnect=ReconnectConfig(initial_backoff=0.05, max_attempts=2)
+    )
+    worker2 = WorkerAgentRuntime(host_address=host_address)
+    try:
+        worker1.start()
+        worker2.start()
+        worker1.add_message_serializer(try_get_known_serializers_for_type(ContentMessage))
+        await SlowAgent.register(worker2, "slow", SlowAgent)
+        pending = asyncio.create_task(worker1.send_message(ContentMessage(content="pending"), AgentId("slow", "1")))
+        await asyncio.sleep(0.2)
+
+        # The host can no longer be reached, the worker gives up reconnecting and fails the pending request.
+        await breaker.stop()
+        with pytest.raises(ConnectionError, match="Failed to reconnect to the host after 2 attempts"):
+            await asyncio.wait_for(pending, 10)
+
+        # Later requests and events fail too.
+        with pytest.raises(ConnectionError):
+            await worker1.send_message(ContentMessage(content="after"), AgentId("slow", "1"))
+        with pytest.raises(ConnectionError):
+            await worker1.publish_message(ContentMessage(content="after"), DefaultTopicId())
+    finally:
+        await worker1.stop()
+        await worker2.stop()
+        await breaker.stop()
+        await host.stop()
+
+
 @pytest.mark.asyncio
 async def test_grpc_max_message_size() -> None:
     default_max_size = 2**22
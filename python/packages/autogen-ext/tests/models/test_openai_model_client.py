@@ -281,6 +281,46 @@ def tool2(test1: int, test2: List[int]) -> str:
     assert remaining_tokens
 
 
+@pytest.mark.asyncio
+async def test_openai_chat_completion_client_count_tokens_memoized(monkeypatch: pytest.MonkeyPatch) -> None:
+    client = OpenAIChatCompletionClient(model="gpt-4o", api_key="api_key")
+    image_message = UserMessage(
+        content=[
+            "str1",
+            Image.from_base64(
+                "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAIAAACQd1PeAAAADElEQVR4nGP4z8AAAAMBAQDJ/pLvAAAAAElFTkSuQmCC"
+            ),
+        ],
+        source="user",
+    )
+    messages: List[LLMMessage] = [SystemMessage(content="Hello"), image_message]
+
+    def tool1(test: str, test2: str) -> str:
+        return test + test2
+
+    tools = [FunctionTool(tool1, description="example tool 1")]
+
+    mockcalculate_vision_tokens = MagicMock(side_effect=calculate_vision_tokens)
+    monkeypatch.setattr(
+        "autogen_ext.models._openai._openai_client.calculate_vision_tokens", mockcalculate_vision_tokens
+    )
+
+    num_tokens = client.count_tokens(messages, tools=tools)
+    assert client.count_tokens(messages, tools=tools) == num_tokens
+    assert client.count_tokens(messages, tools=[tool.schema for tool in tools]) == num_tokens
+    mockcalculate_vision_tokens.assert_called_once()
+
+    # Appending a message only counts the new message.
+    new_message = AssistantMessage(content="Hello", source="assistant")
+    new_message_tokens = client.count_tokens([new_message]) - client.count_tokens([])
+    assert client.count_tokens([*messages, new_message], tools=tools) == num_tokens + new_message_tokens
+    mockcalculate_vision_tokens.assert_called_once()
+
+    # Replacing the content of a message counts it again.
+    image_message.content = "str1"
+    assert client.count_tokens(messages, tools=tools) < num_tokens
+
+
 @pytest.mark.parametrize(
     "mock_size, expected_num_tokens",
     [